@@ -0,0 +1,31 @@
+# coding=utf-8
+""" Compares parsing of UTC timestamps with parse_utc_array() and with iso8601.
+
+@author: Marcel Stefko
+"""
+import sys
+import time
+
+import iso8601
+import numpy as np
+
+from mapps_tools.timecodec import format_utc_array, parse_utc_array
+
+# Number of timestamps, e.g. 'python timecodec_benchmark.py 100000'
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+times = np.datetime64('2031-01-01T00:00:00', 'us') + np.arange(n, dtype=np.int64) * 37 * 1000000
+timestamps = format_utc_array(times, z=True)
+
+t0 = time.perf_counter()
+parsed = parse_utc_array(timestamps)
+t1 = time.perf_counter()
+reference = [iso8601.parse_date(timestamp) for timestamp in timestamps.tolist()]
+t2 = time.perf_counter()
+
+if not (parsed == times).all() or \
+        reference[-1].replace(tzinfo=None) != parsed[-1].astype(object):
+    raise RuntimeError("parse_utc_array() and iso8601 disagree.")
+print(f"Parsing {n} UTC timestamps:")
+print(f"  parse_utc_array: {t1 - t0:.3f} s")
+print(f"  iso8601:         {t2 - t1:.3f} s")
+print(f"  speedup:         {(t2 - t1) / (t1 - t0):.1f}x")
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+""" Index of the events of MAPPS event (EVF) files, for expressing absolute timestamps
+relative to any event of the mission.
+
+@author: Marcel Stefko
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .timecodec import _EPOCH, _MONTH_NUMBERS, format_delta, parse_utc
+from .timestamps import TimestampProcessor
+
+# Event line of an EVF file, with an ISO or a MAPPS timestamp, the event name and an
+# optional count, e.g.
+#  2031-04-25T22:40:47.000Z  CLS_APP_CAL  (COUNT = 1)
+#  25-Apr-2031_22:40:47  CLS_APP_CAL  (COUNT = 1)
+_EVENT_RE = re.compile(
+    r'^\s*(?:(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})'
+    r'|(?P<mday>\d{2})-(?P<mon>[A-Za-z]{3})-(?P<myear>\d{4}))[T_ ]'
+    r'(?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})(?:\.(?P<fraction>\d+))?Z?'
+    r'\s+(?P<name>[A-Za-z_]\w*)(?:\s*\(\s*COUNT\s*=\s*(?P<count>\d+)\s*\))?')
+
+
+class Event(NamedTuple):
+    """ Occurrence of an event in an EVF file. """
+    name: str
+    # Occurrence of the event, starting at 1
+    count: int
+    time: datetime
+
+
+def read_evf(evf_path: str) -> List[Event]:
+    """ Parses the events of an EVF file. Comments and other lines are skipped. Events
+    without a count are counted in the order of the file.
+
+    :param evf_path: Path to the EVF file
+    :return: Events in the order of the file
+    """
+    events = []
+    counts: Dict[str, int] = {}
+    with open(evf_path) as f:
+        for line in f:
+            match = _EVENT_RE.match(line.split('#', 1)[0])
+            if match is None:
+                continue
+            if match.group('year') is not None:
+                year, month, day = (int(match.group(key)) for key in ('year', 'month', 'day'))
+            else:
+                month = _MONTH_NUMBERS.get(match.group('mon').upper())
+                if month is None:
+                    raise ValueError(f"Unknown month in EVF line: '{line.strip()}'.")
+                year, day = int(match.group('myear')), int(match.group('mday'))
+            fraction = match.group('fraction') or ''
+            time = datetime(year, month, day, int(match.group('hour')),
+                            int(match.group('minute')), int(match.group('second')),
+                            int(fraction[:6].ljust(6, '0')), tzinfo=timezone.utc)
+            name = match.group('name')
+            count = int(match.group('count')) if match.group('count') is not None \
+                else counts.get(name, 0) + 1
+            counts[name] = count
+            events.append(Event(name, count, time))
+    return events
+
+
+def _to_us(time: datetime) -> int:
+    """ Microseconds since the Unix epoch of an aware datetime. """
+    delta = time - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+class EventIndex:
+    """ Events sorted by time, overall and for each event name, so that the event
+    preceding any timestamp is found by binary search, and each occurrence by its
+    name and count in constant time. """
+
+    def __init__(self, events: Iterable[Event]) -> None:
+        """ Sorts the events by time.
+
+        :param events: Events in any order
+        """
+        self.events: List[Event] = sorted(events, key=lambda event: event.time)
+        self._times_us = np.array([_to_us(event.time) for event in self.events],
+                                  dtype=np.int64)
+        self._by_key: Dict[Tuple[str, int], Event] = {}
+        # Positions in self.events of the events of each name, in order of time
+        positions: Dict[str, List[int]] = {}
+        for idx, event in enumerate(self.events):
+            self._by_key[(event.name, event.count)] = event
+            positions.setdefault(event.name, []).append(idx)
+        self._positions = {name: np.array(idxs, dtype=np.int64)
+                           for name, idxs in positions.items()}
+        self._name_times_us = {name: self._times_us[idxs]
+                               for name, idxs in self._positions.items()}
+
+    @classmethod
+    def from_evf(cls, evf_path: str) -> 'EventIndex':
+        """ Reads and indexes the events of an EVF file. """
+        return cls(read_evf(evf_path))
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def names(self) -> List[str]:
+        """ Names of the events, in order of their first occurrence. """
+        return list(self._positions)
+
+    def get_event(self, name: str, count: int = 1) -> Event:
+        """ Occurrence of an event by its name and count.
+
+        :param name: Name of the event, e.g. 'CLS_APP_CAL'
+        :param count: Occurrence of the event, starting at 1
+        :return: The event
+        """
+        try:
+            return self._by_key[(name, count)]
+        except KeyError:
+            raise KeyError(f"Event {name} with count {count} is not in the index.") from None
+
+    def get_times(self, name: str) -> List[datetime]:
+        """ Times of all occurrences of an event, sorted. """
+        return [self.events[idx].time for idx in self._positions.get(name, [])]
+
+    def get_event_times(self, count: int = 1) -> Dict[str, datetime]:
+        """ Time of the given occurrence of each event, e.g. for
+        TimestampProcessor.relative_to_absolute_timestamps_itl(). """
+        return {name: event.time for (name, event_count), event in self._by_key.items()
+                if event_count == count}
+
+    def preceding(self, utc_timestamp: Union[str, datetime],
+                  name: str = None) -> Optional[Event]:
+        """ Last event at or before a timestamp, found by binary search.
+
+        :param utc_timestamp: Absolute UTC timestamp or datetime
+        :param name: Only consider events of this name, default all events
+        :return: The event, None if there is no such event
+        """
+        time_us = _to_us(self._parse(utc_timestamp))
+        times_us = self._times_us if name is None else self._name_times_us.get(name)
+        if times_us is None:
+            return None
+        idx = int(np.searchsorted(times_us, time_us, side='right')) - 1
+        if idx < 0:
+            return None
+        return self.events[idx if name is None else self._positions[name][idx]]
+
+    def relative(self, utc_timestamp: Union[str, datetime], name: str = None,
+                 count: int = None) -> Tuple[Event, str]:
+        """ Express an absolute timestamp relative to an event.
+
+        :param utc_timestamp: Absolute UTC timestamp or datetime
+        :param name: Name of the event, default the preceding event of any name
+        :param count: Occurrence of the event, default the last one at or before the
+        timestamp (or the first one, if the timestamp is before all of them)
+        :return: The event, and the relative timestamp '[+-]HH:MM:SS'
+        """
+        time = self._parse(utc_timestamp)
+        if count is not None:
+            event = self.get_event(name, count)
+        else:
+            event = self.preceding(time, name)
+            if event is None:
+                if name is not None and name not in self._positions:
+                    raise KeyError(f"Event {name} is not in the index.")
+                if not self.events:
+                    raise ValueError("The index contains no events.")
+                event = self.events[0 if name is None else self._positions[name][0]]
+        delta_us = _to_us(time) - _to_us(event.time)
+        return event, format_delta(delta_us / 1e6, digits=6 if delta_us % 1000000 else 0)
+
+    def processor(self, name: str, count: int = 1) -> TimestampProcessor:
+        """ Timestamp processor with the time of an event as zero-time. """
+        return TimestampProcessor(self.get_event(name, count).time.isoformat())
+
+    @staticmethod
+    def _parse(utc_timestamp: Union[str, datetime]) -> datetime:
+        if isinstance(utc_timestamp, datetime):
+            return utc_timestamp if utc_timestamp.tzinfo is not None \
+                else utc_timestamp.replace(tzinfo=timezone.utc)
+        return parse_utc(utc_timestamp)
@@ -0,0 +1,37 @@
+# coding=utf-8
+""" Resource analysis module: Tools for analyzing spacecraft resources consumed
+during a flyby, from MAPPS resources datapacks.
+
+- Datapack: Header and numeric contents of a datapack, read from disk only once.
+- DatapackCache: On-disk cache of parsed datapacks.
+- PowerConsumptionGraph: Power consumption timeline of the instruments.
+- DataConsumptionGraph: Data acquisition timeline of the instruments.
+- ResourceSummary: Totals, instrument shares and limit margin returned by summary() of
+  the graphs, serializable to JSON and CSV.
+- PacketStore, DownlinkWindow: Mass memory model for DataConsumptionGraph.simulate_ssmm().
+- SyntheticInstrument: Instrument not modelled by MAPPS, added to the analysis manually.
+- StreamingPowerConsumption, StreamingDataConsumption: Totals of long datapacks,
+  which are read in chunks instead of being loaded into memory at once.
+- LivePowerConsumptionGraph, LiveDataConsumptionGraph: Graphs of datapacks which are
+  still being written by MAPPS, refreshed with only the newly appended rows.
+- DatapackDiff: Differences of power and data between two datapacks, e.g. of two
+  iterations of a timeline.
+- CommandAttribution: Energy and data of each instrument attributed to the commands and
+  modes of an ITL timeline.
+- Flyby, analyze_flybys, render_flybys: Parallel analysis and plot rendering of many
+  flybys, also available from the command line as `python -m mapps_tools.resource_analysis`.
+"""
+
+from mapps_tools.resource_analysis.cache import DatapackCache
+from mapps_tools.resource_analysis.datapack import Datapack
+from mapps_tools.resource_analysis.summary import ResourceSummary
+from mapps_tools.resource_analysis.ssmm import PacketStore, DownlinkWindow
+from mapps_tools.resource_analysis.synthetic import SyntheticInstrument, HAA
+from mapps_tools.resource_analysis.graphs import PowerConsumptionGraph, DataConsumptionGraph
+from mapps_tools.resource_analysis.streaming import StreamingPowerConsumption, \
+    StreamingDataConsumption
+from mapps_tools.resource_analysis.diff import DatapackDiff
+from mapps_tools.resource_analysis.live import LivePowerConsumptionGraph, \
+    LiveDataConsumptionGraph
+from mapps_tools.resource_analysis.attribution import CommandAttribution
+from mapps_tools.resource_analysis.batch import Flyby, analyze_flybys, render_flybys
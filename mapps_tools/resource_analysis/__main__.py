@@ -0,0 +1,7 @@
+# coding=utf-8
+""" Batch resource analysis of many flybys, see `python -m mapps_tools.resource_analysis -h`. """
+
+from mapps_tools.resource_analysis.batch import main
+
+if __name__ == '__main__':
+    main()
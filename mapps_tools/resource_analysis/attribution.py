@@ -0,0 +1,171 @@
+# coding=utf-8
+""" Attribution of instrument power and data to the commands of an ITL timeline, e.g. how
+much energy a MAJIS SWITCH_MODE to SCI_PB_NAD_20pct is responsible for.
+
+@author: Marcel Stefko
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Union
+
+import re
+import numpy as np
+import pandas as pd
+
+from .datapack import Datapack
+from .graphs import PowerConsumptionGraph, DataConsumptionGraph
+from .intervals import PrefixSums
+from .synthetic import SyntheticInstrument
+from ..timecodec import parse_utc
+
+# Command line of an ITL file, with either an absolute UTC timestamp, or an event name and
+# a time relative to it, followed by the instrument and the command, e.g.
+#  2031-04-25T20:50:47Z MAJIS  * SWITCH_MODE  (CURRENT_MODE=STBY_20pct  [ENG])
+#  CLS_APP_CAL  -01:10:00 MAJIS  * SWITCH_MODE  (CURRENT_MODE=STBY_20pct  [ENG])
+_COMMAND_RE = re.compile(
+    r'^\s*(?:(?P<utc>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?)Z?'
+    r'|(?P<event>[A-Za-z_]\w*)\s+(?P<sign>[+-]?)(?P<hours>\d+):(?P<minutes>\d{2}):'
+    r'(?P<seconds>\d{2}(?:\.\d+)?))'
+    r'\s+(?P<instrument>\w+)\s+\*\s+(?P<command>\w+)(?P<parameters>.*)$')
+_MODE_RE = re.compile(r'CURRENT_MODE\s*=\s*(\w+)')
+
+
+class ITLCommand(NamedTuple):
+    """ Command of an ITL timeline. """
+    time_h: float
+    instrument: str
+    command: str
+    # Mode of the instrument after the command. Commands which don't switch the mode keep
+    # the previous one, None if it is not known.
+    mode: Optional[str]
+    # Line number in the ITL file, starting at 1
+    line: int
+
+
+def read_itl_commands(itl_path: str, CA_timestamp: str,
+                      event_times_h: Dict[str, float] = None) -> List[ITLCommand]:
+    """ Parses the commands of an ITL file. Commented out lines are skipped.
+
+    :param itl_path: Path to the ITL file
+    :param CA_timestamp: UTC timestamp of closest approach, e.g. '2031-04-25T22:40:47'
+    :param event_times_h: Times of the events of relative timestamps in hours from CA,
+    default all events are at CA (as in TimestampProcessor)
+    :return: Commands in the order of the file
+    """
+    CA = parse_utc(CA_timestamp)
+    commands = []
+    modes: Dict[str, Optional[str]] = {}
+    with open(itl_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            match = _COMMAND_RE.match(line.split('#', 1)[0])
+            if match is None:
+                continue
+            if match.group('utc') is not None:
+                time_h = (parse_utc(match.group('utc')) - CA).total_seconds() / 3600.0
+            else:
+                event = match.group('event')
+                if event_times_h is not None and event not in event_times_h:
+                    raise ValueError(f"Unknown time of event {event} on line {line_number}.")
+                delta_h = int(match.group('hours')) + int(match.group('minutes')) / 60.0 \
+                    + float(match.group('seconds')) / 3600.0
+                time_h = (-delta_h if match.group('sign') == '-' else delta_h) \
+                    + (event_times_h[event] if event_times_h is not None else 0.0)
+            instrument = match.group('instrument')
+            mode = _MODE_RE.search(match.group('parameters'))
+            if mode is not None:
+                modes[instrument] = mode.group(1)
+            commands.append(ITLCommand(time_h, instrument, match.group('command'),
+                                       modes.get(instrument), line_number))
+    return commands
+
+
+def command_intervals(commands: Sequence[ITLCommand]) -> pd.DataFrame:
+    """ Intervals [start_h, end_h) from each command until the next command of the same
+    instrument. The interval of the last command of each instrument does not end.
+
+    :param commands: ITL commands
+    :return: Dataframe with columns 'instrument', 'command', 'mode', 'start_h' and 'end_h',
+    sorted by instrument and time and indexed by ITL line
+    """
+    df = pd.DataFrame(list(commands), columns=ITLCommand._fields)
+    df = df.sort_values(['instrument', 'time_h'], kind='mergesort')
+    start_h = df['time_h'].values
+    same_instrument = df['instrument'].values[1:] == df['instrument'].values[:-1]
+    end_h = np.append(np.where(same_instrument, start_h[1:], np.inf), np.inf) \
+        if len(df) else start_h
+    return pd.DataFrame({'instrument': df['instrument'].values, 'command': df['command'].values,
+                         'mode': df['mode'].values, 'start_h': start_h, 'end_h': end_h},
+                        index=pd.Index(df['line'].values, name="Line"))
+
+
+class CommandAttribution:
+    """ Energy and data of each instrument attributed to the intervals between its ITL
+    commands. All intervals of an instrument are summed at once from the cumulative sums
+    of the timeline, instead of filtering the timeline for each command. """
+
+    def __init__(self, CA_timestamp: str, itl_path: str, sheet_path: Union[str, Datapack],
+                 add_HAA: bool = False, event_times_h: Dict[str, float] = None,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None) -> None:
+        """ Parses the ITL file and reads the datapack.
+
+        :param CA_timestamp: UTC timestamp of closest approach, e.g. '2031-04-25T22:40:47'
+        :param itl_path: Path to the ITL file
+        :param sheet_path: Path to .csv MAPPS datapack, or an already loaded Datapack
+        :param add_HAA: Whether to manually add HAA power and data
+        :param event_times_h: Times of the events of relative timestamps in hours from CA,
+        default all events are at CA
+        :param synthetic_instruments: Other instruments not modelled by MAPPS to add manually
+        """
+        datapack = sheet_path if isinstance(sheet_path, Datapack) \
+            else Datapack(sheet_path, prefixes=("Power ", "Data Rate ", "Data Accumulated "))
+        self.commands = read_itl_commands(itl_path, CA_timestamp, event_times_h)
+        kwargs = dict(add_HAA=add_HAA, synthetic_instruments=synthetic_instruments)
+        self._power = PowerConsumptionGraph("ITL", CA_timestamp, datapack, **kwargs)
+        self._data: Optional[DataConsumptionGraph] = None
+        if any(col.startswith("Data Rate ") for col in datapack.columns):
+            self._data = DataConsumptionGraph("ITL", CA_timestamp, datapack, **kwargs)
+        self._table: Optional[pd.DataFrame] = None
+
+    def get_command_table(self) -> pd.DataFrame:
+        """ Energy and data of the instrument from each command until its next command.
+        Intervals are limited to the time covered by the datapack.
+
+        :return: Dataframe indexed by ITL line, with columns 'instrument', 'command', 'mode',
+        'start_h', 'end_h', 'energy_Wh' and 'data_Mbits'. Values of instruments not in the
+        datapack are NaN.
+        """
+        if self._table is None:
+            table = command_intervals(self.commands)
+            time_h = self._power._get_only_instrument_dataframe().index.values
+            table['start_h'] = table['start_h'].clip(lower=time_h[0])
+            table['end_h'] = table['end_h'].clip(upper=time_h[-1] + self._power.time_step_s
+                                                 / 3600.0)
+            table = table[table['start_h'] < table['end_h']].copy()
+            table['energy_Wh'] = self._attribute(table, self._power._get_energy_prefix_sums())
+            table['data_Mbits'] = np.nan if self._data is None \
+                else self._attribute(table, self._data._get_data_prefix_sums())
+            self._table = table
+        return self._table
+
+    def get_mode_table(self) -> pd.DataFrame:
+        """ Total duration, energy and data of each instrument in each mode.
+
+        :return: Dataframe indexed by instrument and mode, with columns 'duration_h',
+        'energy_Wh' and 'data_Mbits'
+        """
+        table = self.get_command_table().assign(
+            duration_h=lambda df: df['end_h'] - df['start_h'])
+        return table.groupby(['instrument', 'mode'], sort=False, dropna=False)[
+            ['duration_h', 'energy_Wh', 'data_Mbits']].sum(min_count=1)
+
+    @staticmethod
+    def _attribute(table: pd.DataFrame, prefix_sums: PrefixSums) -> np.ndarray:
+        """ Sums of the column of each interval's instrument over the interval. """
+        values = np.full(len(table), np.nan)
+        instruments = table['instrument'].values
+        for instrument in pd.unique(instruments):
+            if instrument not in prefix_sums.columns:
+                continue
+            rows = np.flatnonzero(instruments == instrument)
+            column = prefix_sums.columns.index(instrument)
+            values[rows] = prefix_sums.interval_sums(table['start_h'].values[rows],
+                                                     table['end_h'].values[rows])[:, column]
+        return values
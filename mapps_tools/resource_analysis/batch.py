@@ -0,0 +1,200 @@
+# coding=utf-8
+""" Resource analysis of many flybys at once, e.g. all flybys of a trajectory.
+
+@author: Marcel Stefko
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, TypeVar
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+from .datapack import Datapack
+from .graphs import PowerConsumptionGraph, DataConsumptionGraph
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class Flyby(NamedTuple):
+    """ Flyby to analyze, with its MAPPS resources datapack and resource limits. """
+    name: str
+    CA_timestamp: str
+    sheet_path: str
+    power_limit_Wh: Optional[float] = None
+    data_limit_Mbits: Optional[float] = None
+
+
+def analyze_flyby(flyby: Flyby, add_HAA: bool = False) -> Dict[str, float]:
+    """ Calculates power and data totals of a single flyby. The datapack is parsed only once
+    for both analyses. If it doesn't contain data columns, data values are NaN.
+
+    :param flyby: Flyby to analyze
+    :param add_HAA: Whether to manually add HAA power and data (since MAPPS doesn't output it yet)
+    :return: Dictionary with totals, limit margins and percentage share of each instrument
+    """
+    datapack = Datapack(flyby.sheet_path, prefixes=("Power ", "Data Rate ", "Data Accumulated "))
+    power = PowerConsumptionGraph(flyby.name, flyby.CA_timestamp, datapack, add_HAA=add_HAA,
+                                  power_limit_Wh=flyby.power_limit_Wh).summary()
+    power_limit = np.nan if power.limit is None else power.limit
+    data_limit = np.nan if flyby.data_limit_Mbits is None else flyby.data_limit_Mbits
+
+    row = {'energy_Wh': power.total, 'power_limit_Wh': power_limit,
+           'power_margin_Wh': power_limit - power.total}
+    for inst, share in power.instrument_percentages.items():
+        row[f'energy_share_{inst}_%'] = share
+
+    data_shares = {}
+    if any(col.startswith("Data Accumulated ") for col in datapack.columns):
+        data = DataConsumptionGraph(flyby.name, flyby.CA_timestamp, datapack, add_HAA=add_HAA,
+                                    data_limit_Mbits=flyby.data_limit_Mbits).summary()
+        data_total = data.total
+        data_shares = data.instrument_percentages
+    else:
+        data_total = np.nan
+    row.update({'data_Mbits': data_total, 'data_limit_Mbits': data_limit,
+                'data_margin_Mbits': data_limit - data_total})
+    for inst in power.instrument_totals:
+        row[f'data_share_{inst}_%'] = data_shares.get(inst, np.nan)
+    return row
+
+
+def render_flyby(flyby: Flyby, output_dir: str, formats: Sequence[str] = ('png',),
+                 add_HAA: bool = False) -> List[str]:
+    """ Renders the power and data plots of a single flyby into files named
+    '<name>_power.<format>' and '<name>_data.<format>'. The datapack is parsed only once.
+    If it doesn't contain data columns, only the power plot is rendered.
+
+    :param flyby: Flyby to render
+    :param output_dir: Directory of the output files
+    :param formats: Output formats, e.g. 'png', 'svg' or 'pdf'
+    :param add_HAA: Whether to manually add HAA power and data (since MAPPS doesn't output it yet)
+    :return: Paths of the rendered files
+    """
+    datapack = Datapack(flyby.sheet_path, prefixes=("Power ", "Data Rate ", "Data Accumulated "))
+    graphs = [('power', PowerConsumptionGraph(flyby.name, flyby.CA_timestamp, datapack,
+                                              add_HAA=add_HAA,
+                                              power_limit_Wh=flyby.power_limit_Wh))]
+    if any(col.startswith("Data Accumulated ") for col in datapack.columns):
+        graphs.append(('data', DataConsumptionGraph(flyby.name, flyby.CA_timestamp, datapack,
+                                                    add_HAA=add_HAA,
+                                                    data_limit_Mbits=flyby.data_limit_Mbits)))
+    paths = []
+    for kind, graph in graphs:
+        for fmt in formats:
+            path = os.path.join(output_dir, f"{flyby.name}_{kind}.{fmt}")
+            graph.render(path, fmt)
+            paths.append(path)
+    return paths
+
+
+def _map_parallel(func: Callable[[T], R], items: List[T], processes: Optional[int]) -> List[R]:
+    """ Applies a function to items in a pool of processes. If the pool can't be created,
+    the items are processed one after another. Exceptions of the function, and
+    BrokenProcessPool if a worker process terminates abruptly, are raised.
+
+    :param func: Picklable function
+    :param items: Items to process
+    :param processes: Number of processes, default number of CPU cores. Use 1 for serial
+    processing.
+    :return: Results in the order of items
+    """
+    processes = min(processes or os.cpu_count() or 1, len(items))
+    if processes > 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=processes)
+        except (OSError, NotImplementedError):
+            # Process pools are not available on every platform
+            executor = None
+        if executor is not None:
+            with executor:
+                return list(executor.map(func, items))
+    return [func(item) for item in items]
+
+
+def analyze_flybys(flybys: Sequence[Flyby], processes: int = None,
+                   add_HAA: bool = False) -> pd.DataFrame:
+    """ Analyzes flybys in parallel in a pool of processes. If the pool can't be used,
+    the flybys are analyzed one after another.
+
+    :param flybys: Flybys to analyze
+    :param processes: Number of processes, default number of CPU cores. Use 1 for serial
+    analysis.
+    :param add_HAA: Whether to manually add HAA power and data (since MAPPS doesn't output it yet)
+    :return: Table with one row for each flyby, indexed by flyby name
+    """
+    flybys = [Flyby(*flyby) for flyby in flybys]
+    rows = _map_parallel(partial(analyze_flyby, add_HAA=add_HAA), flybys, processes)
+    return pd.DataFrame(rows, index=pd.Index([flyby.name for flyby in flybys], name="Flyby"))
+
+
+def render_flybys(flybys: Sequence[Flyby], output_dir: str, formats: Sequence[str] = ('png',),
+                  processes: int = None, add_HAA: bool = False) -> List[str]:
+    """ Renders power and data plots of flybys in parallel in a pool of processes,
+    without a display. If the pool can't be used, the flybys are rendered one after another.
+
+    :param flybys: Flybys to render
+    :param output_dir: Directory of the output files, created if it doesn't exist
+    :param formats: Output formats, e.g. 'png', 'svg' or 'pdf'
+    :param processes: Number of processes, default number of CPU cores. Use 1 for serial
+    rendering.
+    :param add_HAA: Whether to manually add HAA power and data (since MAPPS doesn't output it yet)
+    :return: Paths of all rendered files
+    """
+    flybys = [Flyby(*flyby) for flyby in flybys]
+    os.makedirs(output_dir, exist_ok=True)
+    render = partial(render_flyby, output_dir=output_dir, formats=tuple(formats),
+                     add_HAA=add_HAA)
+    return [path for paths in _map_parallel(render, flybys, processes) for path in paths]
+
+
+def read_flyby_list(list_path: str) -> List[Flyby]:
+    """ Reads a .csv list of flybys, with columns 'name', 'CA', 'datapack', and optionally
+    'power_limit_Wh' and 'data_limit_Mbits'. Relative datapack paths are relative to the list.
+
+    :param list_path: Path to the list of flybys
+    :return: List of flybys
+    """
+    df = pd.read_csv(list_path, dtype={'name': str, 'CA': str, 'datapack': str})
+    base_dir = os.path.dirname(os.path.abspath(list_path))
+    flybys = []
+    for _, row in df.iterrows():
+        power_limit = row.get('power_limit_Wh', np.nan)
+        data_limit = row.get('data_limit_Mbits', np.nan)
+        flybys.append(Flyby(row['name'], row['CA'], os.path.join(base_dir, row['datapack']),
+                            None if pd.isnull(power_limit) else float(power_limit),
+                            None if pd.isnull(data_limit) else float(data_limit)))
+    return flybys
+
+
+def main(argv: Sequence[str] = None) -> pd.DataFrame:
+    """ Command line interface of the batch analysis. """
+    parser = argparse.ArgumentParser(
+        prog='python -m mapps_tools.resource_analysis',
+        description='Analyze power and data resources of many flybys in parallel.')
+    parser.add_argument('flyby_list', help="CSV list of flybys with columns 'name', 'CA', "
+                                           "'datapack', 'power_limit_Wh', 'data_limit_Mbits'")
+    parser.add_argument('-o', '--output', help='Path of the output CSV table, default stdout')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='Number of parallel processes, default number of CPU cores')
+    parser.add_argument('--HAA', dest='add_HAA', action='store_true',
+                        help='Add HAA power and data manually')
+    parser.add_argument('--plots', metavar='DIR', default=None,
+                        help='Also render power and data plots of each flyby into DIR')
+    parser.add_argument('--formats', nargs='+', default=['png'], choices=['png', 'svg', 'pdf'],
+                        help='Formats of the rendered plots, default png')
+    args = parser.parse_args(argv)
+
+    flybys = read_flyby_list(args.flyby_list)
+    table = analyze_flybys(flybys, processes=args.processes, add_HAA=args.add_HAA)
+    if args.plots is not None:
+        render_flybys(flybys, args.plots, formats=args.formats, processes=args.processes,
+                      add_HAA=args.add_HAA)
+    if args.output is None:
+        print(table.to_csv(float_format='%.3f'))
+    else:
+        table.to_csv(args.output, float_format='%.3f')
+    return table
@@ -0,0 +1,155 @@
+# coding=utf-8
+""" On-disk cache of parsed MAPPS datapacks.
+
+@author: Marcel Stefko
+"""
+from typing import Dict, Iterable, Optional
+
+import hashlib
+import os
+import numpy as np
+
+
+class DatapackCache:
+    """ Stores parsed datapack contents in binary columnar (.npz) files, so that repeated
+    opening of the same datapack does not need to parse the text again.
+
+    Every column is stored as a separate array. Entries are keyed by the path, size,
+    modification time and a content hash of the datapack, so a modified datapack is
+    parsed again and its stale entry is removed. When the total size of the cache
+    directory exceeds the limit, least recently used entries are evicted.
+    """
+
+    default_dir_name = '.datapack_cache'
+    # Number of bytes hashed from the beginning and from the end of the datapack
+    hashed_block_size = 1024 * 1024
+
+    def __init__(self, cache_dir: str = None, max_size_bytes: int = 1024 ** 3) -> None:
+        """ Creates the cache.
+
+        :param cache_dir: Directory to store cache entries in. Default is a
+        '.datapack_cache' directory next to each datapack.
+        :param max_size_bytes: Maximum total size of entries in the cache directory
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+
+    def load(self, sheet_path: str, keys: Iterable[str] = None) -> Optional[Dict[str, np.ndarray]]:
+        """ Loads cached contents of the datapack. Since every array is stored separately,
+        only the requested arrays are read from disk.
+
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param keys: Names of arrays to load, default all
+        :return: Dictionary of stored arrays, or None if the datapack or any of
+        the requested arrays is not cached
+        """
+        entry_path = self._entry_path(sheet_path)
+        if not os.path.isfile(entry_path):
+            return None
+        try:
+            with np.load(entry_path, allow_pickle=False) as npz:
+                keys = npz.files if keys is None else list(keys)
+                if any(key not in npz.files for key in keys):
+                    return None
+                arrays = {key: npz[key] for key in keys}
+        except (OSError, ValueError):
+            # Corrupted or partially written entry, it will be overwritten
+            return None
+        # Mark the entry as recently used. Another process sharing the cache directory
+        # may have evicted it in the meantime.
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return arrays
+
+    def store(self, sheet_path: str, arrays: Dict[str, np.ndarray]) -> None:
+        """ Stores the contents of the datapack, removes its stale entries and
+        evicts old entries if the cache is too large. Arrays already stored in a valid
+        entry of the same datapack are kept. Failures to write are ignored, since the
+        cache is only an optimization.
+
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param arrays: Dictionary of arrays to store
+        """
+        entry_path = self._entry_path(sheet_path)
+        cache_dir = os.path.dirname(entry_path)
+        stored = self.load(sheet_path)
+        if stored is not None:
+            stored.update(arrays)
+            arrays = stored
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temporary file first, so that readers never see a partial entry
+            temporary_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temporary_path, entry_path)
+        except OSError:
+            return
+        self._remove_stale_entries(entry_path)
+        self._evict(cache_dir)
+
+    def _directory(self, sheet_path: str) -> str:
+        if self.cache_dir is not None:
+            return self.cache_dir
+        return os.path.join(os.path.dirname(os.path.abspath(sheet_path)), self.default_dir_name)
+
+    def _entry_path(self, sheet_path: str) -> str:
+        """ Path of the cache entry, '<name>.<path hash>.<content key>.npz'. """
+        abs_path = os.path.abspath(sheet_path)
+        path_hash = hashlib.blake2b(abs_path.encode(), digest_size=4).hexdigest()
+        file_name = f"{os.path.basename(abs_path)}.{path_hash}.{self.key(abs_path)}.npz"
+        return os.path.join(self._directory(sheet_path), file_name)
+
+    def key(self, sheet_path: str) -> str:
+        """ Calculates the cache key of a datapack from its path, size, modification time
+        and a hash of its contents. Only the first and the last block of the datapack
+        are hashed, so that the key is cheap to calculate also for large datapacks.
+
+        :param sheet_path: Path to .csv MAPPS datapack
+        :return: Hexadecimal cache key
+        """
+        stat = os.stat(sheet_path)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{os.path.abspath(sheet_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+        with open(sheet_path, 'rb') as f:
+            h.update(f.read(self.hashed_block_size))
+            if stat.st_size > 2 * self.hashed_block_size:
+                f.seek(-self.hashed_block_size, os.SEEK_END)
+            h.update(f.read(self.hashed_block_size))
+        return h.hexdigest()
+
+    @staticmethod
+    def _remove_stale_entries(entry_path: str) -> None:
+        """ Remove entries of the same datapack with a different key. """
+        cache_dir, file_name = os.path.split(entry_path)
+        prefix = file_name.rsplit('.', 2)[0] + '.'
+        for other in os.listdir(cache_dir):
+            if other.startswith(prefix) and other != file_name and other.endswith('.npz'):
+                try:
+                    os.remove(os.path.join(cache_dir, other))
+                except OSError:
+                    pass
+
+    def _evict(self, cache_dir: str) -> None:
+        """ Remove least recently used entries until the cache fits into the size limit. """
+        entries = []
+        for file_name in os.listdir(cache_dir):
+            if file_name.endswith('.npz'):
+                try:
+                    stat = os.stat(os.path.join(cache_dir, file_name))
+                except OSError:
+                    # Removed by another process sharing the cache directory
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+        total_size = sum(size for _, size, _ in entries)
+        # Newest entry is never evicted, even if it alone exceeds the limit
+        for _, size, file_name in sorted(entries)[:-1]:
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(os.path.join(cache_dir, file_name))
+                total_size -= size
+            except OSError:
+                pass
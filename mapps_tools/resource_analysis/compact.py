@@ -0,0 +1,147 @@
+# coding=utf-8
+""" Compact storage of resource timelines whose columns are piecewise constant,
+e.g. instrument power, which is zero or constant for most of a flyby.
+
+@author: Marcel Stefko
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .intervals import interval_slice
+
+
+class RunLengthTimeline:
+    """ Timeline whose columns are stored as runs of constant values. Sums over any time
+    interval and cumulative sums are calculated directly from the runs, without expanding
+    the timeline. A uniform time index is stored as its first time and time step only. """
+
+    # Tolerance of the uniform time index, as a fraction of the time step
+    TIME_TOLERANCE = 1e-6
+
+    def __init__(self, time_h: np.ndarray, values: np.ndarray, columns: Sequence[str],
+                 dtype: type = np.float64) -> None:
+        """ Encodes the timeline.
+
+        :param time_h: Sorted time index in hours from CA
+        :param values: 2D array of values, with one row for each time
+        :param columns: Names of the columns of values
+        :param dtype: Type in which the run values are stored, e.g. np.float32 to halve
+        the memory use at the cost of precision. Sums are always accumulated in float64.
+        """
+        values = np.asarray(values)
+        time_h = np.asarray(time_h, dtype=np.float64)
+        self._n_rows = len(time_h)
+        self._start_h = time_h[0] if len(time_h) else 0.0
+        self._step_h = (time_h[-1] - time_h[0]) / (len(time_h) - 1) if len(time_h) > 1 else 1.0
+        uniform = self._start_h + np.arange(len(time_h)) * self._step_h
+        # Time index, only kept if it is not uniform
+        self._time_h: Optional[np.ndarray] = None
+        if self._step_h <= 0 or not np.allclose(time_h, uniform, rtol=0.0,
+                                                atol=self.TIME_TOLERANCE * self._step_h):
+            self._time_h = time_h
+        self.columns = list(columns)
+        # For each column: row index of the start of each run, and value of the run
+        self._starts: List[np.ndarray] = []
+        self._values: List[np.ndarray] = []
+        # For each column: sum of all rows before the start of each run, and the total
+        self._run_sums: List[np.ndarray] = []
+        for column in values.T:
+            starts = np.concatenate([[0], np.flatnonzero(column[1:] != column[:-1]) + 1]) \
+                if len(column) else np.empty(0, dtype=np.int64)
+            run_values = column[starts].astype(dtype)
+            lengths = np.diff(np.append(starts, len(column)))
+            self._starts.append(starts.astype(np.int32 if len(column) < 2**31 else np.int64))
+            self._values.append(run_values)
+            self._run_sums.append(np.concatenate([[0.0], np.cumsum(
+                run_values.astype(np.float64) * lengths)]))
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, dtype: type = np.float64) -> 'RunLengthTimeline':
+        """ Encodes a dataframe indexed by time in hours from CA. """
+        return cls(df.index.values, df.values, df.columns, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    @property
+    def time_h(self) -> np.ndarray:
+        """ Time index in hours from CA. """
+        return self._times(np.arange(self._n_rows))
+
+    @property
+    def nbytes(self) -> int:
+        """ Memory used by the timeline arrays, in bytes. """
+        time_nbytes = 0 if self._time_h is None else self._time_h.nbytes
+        return time_nbytes + sum(a.nbytes for arrays in
+                                 (self._starts, self._values, self._run_sums) for a in arrays)
+
+    def _times(self, rows: np.ndarray) -> np.ndarray:
+        """ Times of given rows in hours from CA. """
+        if self._time_h is not None:
+            return self._time_h[rows]
+        return self._start_h + rows * self._step_h
+
+    def _interval_rows(self, start_h: float = None, end_h: float = None) -> slice:
+        """ Rows within the closed interval [start_h, end_h]. """
+        if self._time_h is not None:
+            return interval_slice(self._time_h, start_h, end_h)
+        lo, hi = 0, self._n_rows
+        if start_h is not None:
+            lo = int(np.ceil((start_h - self._start_h) / self._step_h - self.TIME_TOLERANCE))
+        if end_h is not None:
+            hi = int(np.floor((end_h - self._start_h) / self._step_h + self.TIME_TOLERANCE)) + 1
+        lo, hi = min(max(lo, 0), self._n_rows), min(max(hi, 0), self._n_rows)
+        return slice(lo, max(lo, hi))
+
+    def column_values(self, column: str) -> np.ndarray:
+        """ Expands one column to one value for each row. """
+        idx = self.columns.index(column)
+        lengths = np.diff(np.append(self._starts[idx], len(self)))
+        return np.repeat(self._values[idx].astype(np.float64), lengths)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """ Expands the timeline to a dataframe with one row for each time. """
+        return pd.DataFrame({column: self.column_values(column) for column in self.columns},
+                            index=pd.Index(self.time_h, name="Time [h]"), columns=self.columns)
+
+    def _rows_sum(self, idx: int, rows: np.ndarray) -> np.ndarray:
+        """ Sums of the column idx over the first `rows` rows, for each value of rows. """
+        starts = self._starts[idx]
+        run = np.searchsorted(starts, rows, side='right') - 1
+        run = np.maximum(run, 0)
+        return self._run_sums[idx][run] + self._values[idx][run] * (rows - starts[run])
+
+    def sum(self, start_h: float = None, end_h: float = None) -> np.ndarray:
+        """ Sums of all columns over rows within the closed interval [start_h, end_h].
+
+        :param start_h: Start of the interval, default from the first row
+        :param end_h: End of the interval, default until the last row
+        :return: Array with the sum of each column
+        """
+        rows = self._interval_rows(start_h, end_h)
+        bounds = np.array([rows.start, rows.stop])
+        sums = np.array([self._rows_sum(idx, bounds) for idx in range(len(self.columns))])
+        return (sums[:, 1] - sums[:, 0]) if len(sums) else np.empty(0)
+
+    def column_sum(self, column: str, start_h: float = None, end_h: float = None) -> float:
+        """ Sum of one column over rows within the closed interval [start_h, end_h]. """
+        return self.sum(start_h, end_h)[self.columns.index(column)]
+
+    def cumulative_sum(self) -> pd.Series:
+        """ Cumulative sum over time of all columns together. Between the returned points,
+        the cumulative sum is linear, so it is only evaluated at the first and last row
+        of each run.
+
+        :return: Cumulative sum at the ends of the runs, indexed by time in hours from CA
+        """
+        if len(self) == 0:
+            return pd.Series(np.empty(0), index=pd.Index(np.empty(0), name="Time [h]"))
+        starts = np.concatenate(self._starts + [np.array([len(self)])])
+        rows = np.unique(np.concatenate([starts, starts - 1]))
+        rows = rows[(rows >= 0) & (rows < len(self))]
+        cumulative = np.zeros(len(rows))
+        for idx in range(len(self.columns)):
+            cumulative += self._rows_sum(idx, rows + 1)
+        return pd.Series(cumulative, index=pd.Index(self._times(rows), name="Time [h]"))
@@ -0,0 +1,267 @@
+# coding=utf-8
+""" Reading of MAPPS resources datapacks.
+
+@author: Marcel Stefko
+"""
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from datetime import datetime, timezone
+import pandas as pd
+import numpy as np
+import re
+
+from .cache import DatapackCache
+from ..timecodec import parse_header_time, parse_utc_array
+
+
+class Datapack:
+    """ Contents of a MAPPS resources datapack (.csv), read from disk in a single pass.
+
+    The same instance can be passed to several analysis graphs, which then do not
+    need to touch the disk again.
+    """
+
+    # Header entries which point to the inputs MAPPS used to generate the datapack
+    source_keys = ('Orbit definition file', 'Orbit data file', 'Attitude data source',
+                   'Timeline data source', 'Event file')
+
+    def __init__(self, sheet_path: str, prefixes: Sequence[str] = None,
+                 use_cache: bool = False, cache: DatapackCache = None) -> None:
+        """ Reads the header block and the numeric body of a MAPPS datapack.
+
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param prefixes: If given, only columns whose labels start with one of the
+        prefixes (e.g. 'Power ') are read. Default reads all columns.
+        :param use_cache: Whether to use the on-disk cache of parsed datapacks, stored in a
+        directory next to the datapack. Default False
+        :param cache: Cache to use, if given the cache is used regardless of use_cache
+        """
+        self.path = sheet_path
+        arrays = None
+        use_cache = use_cache or cache is not None
+        if use_cache:
+            cache = cache if cache is not None else DatapackCache()
+            arrays = self._load_cached_arrays(cache, sheet_path, prefixes)
+        if arrays is None:
+            arrays = self._read_arrays(sheet_path, prefixes)
+            if use_cache:
+                cache.store(sheet_path, arrays)
+
+        self._set_arrays(arrays, prefixes)
+
+    def _set_arrays(self, arrays: Dict[str, np.ndarray], prefixes: Optional[Sequence[str]]) -> None:
+        """ Sets the attributes of the datapack from the parsed or cached arrays. """
+        self.header: Dict[str, str] = dict(zip(arrays['header_keys'], arrays['header_values']))
+        # Datapacks with event-driven output have no constant step, use the typical one
+        self.time_step_s: float = self._parse_time_step(self.header['Output step']) \
+            if 'Output step' in self.header else self._median_time_step(arrays['timestamps'])
+        self.start_time: datetime = self._parse_header_time(self.header['Start time'])
+        self.end_time: datetime = self._parse_header_time(self.header['End time'])
+        self.sources: Dict[str, str] = {key: self.header[key] for key in self.source_keys
+                                        if key in self.header}
+
+        labels = list(arrays['labels'])
+        indices = self._column_indices(labels, prefixes)
+        self.columns: List[str] = [labels[idx] for idx in indices]
+        self.units: Dict[str, str] = {labels[idx]: arrays['units'][idx] for idx in indices}
+        self.timestamps: np.ndarray = arrays['timestamps']
+        self.values: np.ndarray = np.column_stack(
+            [arrays[f'column_{idx}'] for idx in indices]) \
+            if indices else np.empty((len(self.timestamps), 0))
+
+    @classmethod
+    def iter_chunks(cls, sheet_path: str, prefixes: Sequence[str] = None,
+                    chunk_size: int = 100000) -> Iterator['Datapack']:
+        """ Reads the datapack in chunks of rows, without holding the whole body in memory.
+        The on-disk cache is not used.
+
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param prefixes: If given, only columns whose labels start with one of the
+        prefixes are read. Default reads all columns.
+        :param chunk_size: Number of rows in each chunk
+        :return: Iterator over datapacks, each containing one chunk of rows
+        """
+        with open(sheet_path) as f:
+            metadata, indices = cls._read_preamble(f, prefixes)
+            for body in cls._read_body(f, indices, chunk_size):
+                yield cls._from_arrays(sheet_path, {**metadata, **cls._body_arrays(body, indices)},
+                                       prefixes)
+
+    @classmethod
+    def _from_arrays(cls, sheet_path: str, arrays: Dict[str, np.ndarray],
+                     prefixes: Optional[Sequence[str]]) -> 'Datapack':
+        """ Creates a datapack from already parsed arrays, e.g. of a chunk of rows. """
+        datapack = cls.__new__(cls)
+        datapack.path = sheet_path
+        datapack._set_arrays(arrays, prefixes)
+        return datapack
+
+    # Arrays describing the whole datapack, as opposed to arrays of individual columns
+    _metadata_keys = ('header_keys', 'header_values', 'labels', 'units', 'timestamps')
+
+    @staticmethod
+    def _column_indices(labels: Sequence[str], prefixes: Optional[Sequence[str]]) -> List[int]:
+        """ Indices of numeric column labels which start with one of the prefixes. """
+        if prefixes is None:
+            return list(range(len(labels)))
+        return [idx for idx, label in enumerate(labels)
+                if any(label.startswith(prefix) for prefix in prefixes)]
+
+    @classmethod
+    def _load_cached_arrays(cls, cache: DatapackCache, sheet_path: str,
+                            prefixes: Optional[Sequence[str]]) -> Optional[Dict[str, np.ndarray]]:
+        """ Loads the metadata and only the required columns from the cache.
+
+        :return: Dictionary of arrays, or None if some of them are not cached
+        """
+        arrays = cache.load(sheet_path, cls._metadata_keys)
+        if arrays is None:
+            return None
+        indices = cls._column_indices(arrays['labels'], prefixes)
+        columns = cache.load(sheet_path, [f'column_{idx}' for idx in indices])
+        if columns is None:
+            return None
+        arrays.update(columns)
+        return arrays
+
+    @classmethod
+    def _read_arrays(cls, sheet_path: str,
+                     prefixes: Optional[Sequence[str]]) -> Dict[str, np.ndarray]:
+        """ Parses the datapack into arrays, with one array for each column. Only
+        the required columns are parsed.
+
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param prefixes: Prefixes of labels of required columns, None for all columns
+        :return: Dictionary of arrays
+        """
+        with open(sheet_path) as f:
+            metadata, indices = cls._read_preamble(f, prefixes)
+            body = cls._read_body(f, indices)
+        return {**metadata, **cls._body_arrays(body, indices)}
+
+    @classmethod
+    def _read_preamble(cls, f: TextIO, prefixes: Optional[Sequence[str]]) \
+            -> Tuple[Dict[str, np.ndarray], List[int]]:
+        """ Reads the header block, the column labels and units, leaving the file
+        positioned at the first row of the body.
+
+        :param f: Datapack file opened for reading
+        :param prefixes: Prefixes of labels of required columns, None for all columns
+        :return: Dictionary of metadata arrays, and indices of required columns
+        """
+        header_lines = []
+        line = f.readline()
+        while line.startswith('#'):
+            header_lines.append(line)
+            line = f.readline()
+        # First non-comment line contains column labels, the next one contains units
+        # The first column contains the timestamps, all others the numeric values
+        labels = cls._split_csv_line(line)[1:]
+        units = cls._split_csv_line(f.readline())[1:len(labels) + 1]
+        header = cls._parse_header(header_lines)
+        metadata = {'header_keys': np.array(list(header.keys()), dtype=str),
+                    'header_values': np.array(list(header.values()), dtype=str),
+                    'labels': np.array(labels, dtype=str),
+                    'units': np.array(units, dtype=str)}
+        return metadata, cls._column_indices(labels, prefixes)
+
+    @staticmethod
+    def _read_body(f: TextIO, indices: List[int], chunk_size: int = None):
+        """ Parses the required columns of the body, optionally as an iterator of chunks. """
+        # Field 0 of each row is the timestamp, field idx+1 is the numeric column idx
+        return pd.read_csv(f, header=None, usecols=[0] + [idx + 1 for idx in indices],
+                           dtype={**{0: str}, **{idx + 1: np.float64 for idx in indices}},
+                           chunksize=chunk_size)
+
+    @staticmethod
+    def _body_arrays(body: pd.DataFrame, indices: List[int]) -> Dict[str, np.ndarray]:
+        """ Converts the parsed body into a timestamp array and one array for each column. """
+        arrays = {'timestamps': parse_utc_array(body[0].values.astype(str))}
+        for idx in indices:
+            arrays[f'column_{idx}'] = body[idx + 1].values
+        return arrays
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def hours_from_CA(self, CA: datetime) -> np.ndarray:
+        """ Calculates delta times in hours from CA for all rows of the datapack.
+
+        :param CA: Timezone-aware datetime of closest approach
+        :return: Array of delta times from CA in hours
+        """
+        CA_naive = np.datetime64(CA.astimezone(timezone.utc).replace(tzinfo=None), 'us')
+        # Same arithmetic as timedelta.total_seconds() to keep the values bit-identical
+        return ((self.timestamps - CA_naive).astype(np.int64) / 1e6) / 3600.0
+
+    def select(self, prefix: str, CA: datetime) -> pd.DataFrame:
+        """ Creates a dataframe with all columns whose label starts with given prefix.
+
+        :param prefix: Column label prefix, e.g. 'Power ', which is stripped from the labels
+        :param CA: Timezone-aware datetime of closest approach
+        :return: New dataframe indexed by time from CA in hours
+        """
+        indices = [idx for idx, col in enumerate(self.columns) if col.startswith(prefix)]
+        df = pd.DataFrame(self.values[:, indices], index=self.hours_from_CA(CA),
+                          columns=[self.columns[idx][len(prefix):] for idx in indices])
+        return df.rename_axis("Time [h]")
+
+    @staticmethod
+    def _split_csv_line(line: str) -> List[str]:
+        """ Splits a line of the datapack, dropping the empty trailing field. """
+        return line.rstrip('\r\n').rstrip(',').split(',')
+
+    @staticmethod
+    def _parse_header(header_lines: List[str]) -> Dict[str, str]:
+        """ Parse the 'Key : value' entries of the comment block at the top of the datapack.
+
+        :param header_lines: Comment lines of the datapack
+        :return: Dictionary of header entries
+        """
+        header = {}
+        for line in header_lines:
+            content = line.lstrip('#').rstrip('\r\n').rstrip(',')
+            if ':' not in content:
+                continue
+            key, value = content.split(':', 1)
+            if key.strip():
+                header[key.strip()] = value.strip()
+        return header
+
+    @staticmethod
+    def _parse_time_step(step_entry: str) -> float:
+        """ Parse the floating number and the unit of the 'Output step' header entry.
+
+        :param step_entry: Value of the header entry, e.g. '1.00 Minutes'
+        :return: Time step value in seconds
+        """
+        float_strings = re.findall(r"\d+\.\d+", step_entry)
+        if len(float_strings) != 1:
+            raise ValueError("Output step of sheet doesn't contain exactly 1 float.")
+        value = float(float_strings[0])
+        if "Seconds" in step_entry:
+            value = value
+        elif "Minutes" in step_entry:
+            value *= 60
+        elif "Hours" in step_entry:
+            value *= 3600
+        else:
+            raise ValueError("Unable to parse time unit from output step of sheet.")
+        return value
+
+    @staticmethod
+    def _median_time_step(timestamps: np.ndarray) -> float:
+        """ Median time between rows in seconds, NaN if there are less than two rows. """
+        if len(timestamps) < 2:
+            return np.nan
+        return float(np.median(np.diff(timestamps).astype('timedelta64[us]').astype(np.int64))
+                     / 1e6)
+
+    @staticmethod
+    def _parse_header_time(header_time: str) -> datetime:
+        """ Parse a header timestamp, e.g. '03-Oct-2030_00:00:00'.
+
+        :param header_time: Timestamp as written in the datapack header
+        :return: Timezone-aware UTC datetime
+        """
+        return parse_header_time(header_time)
@@ -0,0 +1,171 @@
+# coding=utf-8
+""" Comparison of two MAPPS resources datapacks, e.g. of two iterations of a timeline.
+
+@author: Marcel Stefko
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .datapack import Datapack
+from .graphs import PowerConsumptionGraph, DataConsumptionGraph
+from .integration import row_durations_s, weighted
+from .intervals import interval_slice
+from .limits import _run_maxima, _true_runs
+from .synthetic import SyntheticInstrument
+
+
+class ChangedInterval(NamedTuple):
+    """ Interval during which the total power differs between the datapacks. """
+    start_h: float
+    end_h: float
+    # Largest absolute difference of new and old total power [W]
+    peak_change_W: float
+    # Difference of new and old consumed energy over the interval [Wh]
+    energy_change_Wh: float
+
+
+def _align(old: pd.DataFrame, new: pd.DataFrame, old_step_s: float,
+           new_step_s: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """ Aligns two timelines on the time grid of the coarser one, within their common
+    time interval. Values of the other timeline are linearly interpolated, unless it has
+    the same grid. Columns missing in one of the timelines are zero.
+
+    :return: Common time grid, old values, new values, and column names
+    """
+    columns = list(new.columns) + [col for col in old.columns if col not in new.columns]
+    start_h = max(old.index.values[0], new.index.values[0])
+    end_h = min(old.index.values[-1], new.index.values[-1])
+    if start_h > end_h:
+        raise ValueError("Datapacks have no common time interval.")
+    grid_df = old if old_step_s >= new_step_s else new
+    grid = grid_df.index.values[interval_slice(grid_df.index.values, start_h, end_h)]
+
+    def values_on_grid(df: pd.DataFrame) -> np.ndarray:
+        time_h = df.index.values
+        rows = interval_slice(time_h, start_h, end_h)
+        same_grid = np.array_equal(time_h[rows], grid)
+        aligned = np.zeros((len(grid), len(columns)))
+        for idx, col in enumerate(columns):
+            if col in df:
+                aligned[:, idx] = df[col].values[rows] if same_grid \
+                    else np.interp(grid, time_h, df[col].values)
+        return aligned
+
+    return grid, values_on_grid(old), values_on_grid(new), columns
+
+
+def _changed_rows(grid: np.ndarray, difference: np.ndarray, columns: List[str],
+                  tolerance: float, prefix: str) -> pd.DataFrame:
+    """ Summary of rows in which each column differs by more than the tolerance. """
+    changed = np.abs(difference) > tolerance
+    any_changed = changed.any(axis=0)
+    first = np.where(any_changed, grid[changed.argmax(axis=0)], np.nan)
+    last = np.where(any_changed, grid[len(grid) - 1 - changed[::-1].argmax(axis=0)], np.nan)
+    return pd.DataFrame({f'{prefix}_changed_rows': changed.sum(axis=0),
+                         f'{prefix}_first_change_h': first,
+                         f'{prefix}_last_change_h': last,
+                         f'{prefix}_max_change': np.abs(difference).max(axis=0, initial=0.0)},
+                        index=pd.Index(columns, name="Instrument"))
+
+
+class DatapackDiff:
+    """ Differences of instrument power and data rates between an old and a new datapack,
+    aligned on a common time grid. """
+
+    def __init__(self, CA_timestamp: str, old_sheet_path: Union[str, Datapack],
+                 new_sheet_path: Union[str, Datapack], add_HAA: bool = False,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None) -> None:
+        """ Reads both datapacks and aligns them. If the time steps differ, the datapack
+        with the finer step is interpolated to the grid of the other one.
+
+        :param CA_timestamp: UTC timestamp of closest approach, e.g. '2031-04-25T22:40:47'
+        :param old_sheet_path: Path to the old .csv MAPPS datapack, or an already loaded Datapack
+        :param new_sheet_path: Path to the new .csv MAPPS datapack, or an already loaded Datapack
+        :param add_HAA: Whether to manually add HAA power and data to both datapacks
+        :param synthetic_instruments: Other instruments not modelled by MAPPS to add manually
+        """
+        prefixes = ("Power ", "Data Rate ", "Data Accumulated ")
+        old, new = (path if isinstance(path, Datapack) else Datapack(path, prefixes=prefixes)
+                    for path in (old_sheet_path, new_sheet_path))
+        kwargs = dict(add_HAA=add_HAA, synthetic_instruments=synthetic_instruments)
+        old_power = PowerConsumptionGraph("old", CA_timestamp, old, **kwargs)
+        new_power = PowerConsumptionGraph("new", CA_timestamp, new, **kwargs)
+        self.time_step_s = max(old.time_step_s, new.time_step_s)
+        self.time_h, self.old_power_W, self.new_power_W, self.instruments = _align(
+            old_power._get_only_instrument_dataframe(), new_power._get_only_instrument_dataframe(),
+            old.time_step_s, new.time_step_s)
+        # Step-hold integration weights of the grid rows, None if they are equally spaced
+        self._durations_s = row_durations_s(self.time_h, self.time_step_s)
+
+        # Data rates, only if both datapacks contain data columns
+        self.old_data_rate_kbps: Optional[np.ndarray] = None
+        self.new_data_rate_kbps: Optional[np.ndarray] = None
+        self.data_instruments: List[str] = []
+        if all(any(col.startswith("Data Rate ") for col in datapack.columns)
+               for datapack in (old, new)):
+            old_data = DataConsumptionGraph("old", CA_timestamp, old, **kwargs)
+            new_data = DataConsumptionGraph("new", CA_timestamp, new, **kwargs)
+            _, self.old_data_rate_kbps, self.new_data_rate_kbps, self.data_instruments = _align(
+                old_data._get_only_instrument_dataframe(old_data.data_rate),
+                new_data._get_only_instrument_dataframe(new_data.data_rate),
+                old.time_step_s, new.time_step_s)
+
+    def get_energy_delta_Wh(self) -> pd.Series:
+        """ Difference of new and old consumed energy of each instrument over the common
+        time interval.
+
+        :return: Energy differences in Wh, indexed by instrument
+        """
+        delta = self._integrate_s(self.new_power_W - self.old_power_W).sum(axis=0) / 3600.0
+        return pd.Series(delta, index=pd.Index(self.instruments, name="Instrument"))
+
+    def get_data_delta_Mbits(self) -> pd.Series:
+        """ Difference of new and old acquired data of each instrument over the common
+        time interval, integrated from the data rates. Empty if a datapack has no data columns.
+
+        :return: Data differences in Mbits, indexed by instrument
+        """
+        if self.old_data_rate_kbps is None:
+            return pd.Series([], dtype=np.float64, index=pd.Index([], name="Instrument"))
+        delta = self._integrate_s(
+            self.new_data_rate_kbps - self.old_data_rate_kbps).sum(axis=0) / 1000.0
+        return pd.Series(delta, index=pd.Index(self.data_instruments, name="Instrument"))
+
+    def get_changed_intervals(self, tolerance_W: float = 1e-6) -> List[ChangedInterval]:
+        """ Finds intervals in which the total power differs by more than the tolerance.
+
+        :param tolerance_W: Largest difference of total power considered unchanged
+        :return: List of changed intervals in time order
+        """
+        difference = (self.new_power_W - self.old_power_W).sum(axis=1)
+        starts, ends = _true_runs(np.abs(difference) > tolerance_W)
+        if len(starts) == 0:
+            return []
+        sums = np.concatenate([[0.0], np.cumsum(self._integrate_s(difference))]) / 3600.0
+        peaks = _run_maxima(np.abs(difference), starts, ends)
+        return [ChangedInterval(*values) for values in
+                zip(self.time_h[starts], self.time_h[ends], peaks, sums[ends + 1] - sums[starts])]
+
+    def _integrate_s(self, values: np.ndarray) -> np.ndarray:
+        """ Multiplies each row of the grid by its duration in seconds. """
+        if self._durations_s is None:
+            return values * self.time_step_s
+        return weighted(values, self._durations_s)
+
+    def get_changed_rows(self, tolerance: float = 1e-6) -> pd.DataFrame:
+        """ Summary of rows in which the power [W] or data rate [kbps] of each instrument
+        differs by more than the tolerance: number of changed rows, times of the first and
+        last change, and the largest absolute change.
+
+        :param tolerance: Largest difference considered unchanged
+        :return: Dataframe indexed by instrument, with 'power_...' and 'data_rate_...' columns
+        """
+        summary = _changed_rows(self.time_h, self.new_power_W - self.old_power_W,
+                                self.instruments, tolerance, 'power')
+        if self.old_data_rate_kbps is not None:
+            summary = pd.concat([summary, _changed_rows(
+                self.time_h, self.new_data_rate_kbps - self.old_data_rate_kbps,
+                self.data_instruments, tolerance, 'data_rate')], axis=1, sort=False)
+        return summary
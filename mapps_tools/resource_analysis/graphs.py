@@ -0,0 +1,678 @@
+# coding=utf-8
+""" Tools for analyzing power consumption over a flyby.
+
+@author: Marcel Stefko
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from datetime import datetime
+from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import NullLocator
+import pandas as pd
+import numpy as np
+
+from .compact import RunLengthTimeline
+from .datapack import Datapack
+from .integration import check_integration_method, is_uniform, row_durations_s, weighted
+from .intervals import PrefixSums, interval_slice
+from .limits import Violation, evaluate_profile, find_violations, find_cumulative_violations
+from .power_statistics import PowerStatistics, power_statistics
+from .pyramid import TimePyramid, axis_width_px
+from .ssmm import PacketStore, DownlinkWindow, SSMMFill, simulate_ssmm
+from .summary import ResourceSummary
+from .synthetic import SyntheticInstrument, HAA
+from ..timecodec import parse_utc
+
+# Instruments in the order in which they are listed and plotted
+INSTRUMENTS = ['JMAG', 'PEP', '3GM', 'RPWI', 'SWI',
+               'RIME', 'JANUS', 'MAJIS', 'GALA', 'UVS']
+
+
+def _instrument_columns(df: pd.DataFrame, synthetic_names: Sequence[str] = ()) -> List[str]:
+    """ Instrument columns of a dataframe, with manually added instruments listed first. """
+    return [name for name in synthetic_names if name in df] + INSTRUMENTS
+
+
+def _total(cumulative: pd.Series) -> float:
+    """ Last value of a cumulative timeline, zero if no rows are in the analyzed interval. """
+    return cumulative.values[-1] if len(cumulative) else 0.0
+
+
+def _synthetic_instruments(add_HAA: bool, synthetic_instruments: Optional[
+        Sequence[SyntheticInstrument]]) -> List[SyntheticInstrument]:
+    """ List of manually added instruments, with HAA first if requested. """
+    return ([HAA] if add_HAA else []) + list(synthetic_instruments or [])
+
+
+def _check_time_interval(time_interval_h: Tuple[float, float]) -> None:
+    if len(time_interval_h) != 2 or any([not isinstance(n, (int, float)) for n in time_interval_h]):
+        raise ValueError(f"Invalid time_interval_h: {time_interval_h}")
+
+
+def _render_figure(draw: Callable[[Figure], None], path: str, fmt: Optional[str]) -> None:
+    """ Draws a figure without pyplot and saves it, so that it works without a display
+    and in parallel processes.
+
+    :param draw: Function drawing into the figure
+    :param path: Output file path
+    :param fmt: Output format, e.g. 'png', 'svg' or 'pdf', default from the path extension
+    """
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    draw(fig)
+    fig.savefig(path, format=fmt)
+
+
+def _format_total_power(consumed: float, power_limit_Wh: Optional[float]) -> str:
+    message = f"Total power consumed: {consumed:.1f}"
+    if power_limit_Wh is not None:
+        message += f" ({100*consumed/power_limit_Wh:.1f}% of limit)."
+    return message
+
+
+def _format_instrument_power(consumptions: Dict[str, float], total: float) -> str:
+    message = "Consumption by instrument:\n"
+    for inst, consumed in consumptions.items():
+        message += f" - {inst: <5}: {consumed: 7.1f} Wh - {100*consumed/total:4.1f}%\n"
+    return message
+
+
+def _format_total_data(acquired: float, data_limit_Mbits: Optional[float]) -> str:
+    message = f"Total data acquired: {acquired:.1f} Mbits"
+    if data_limit_Mbits is not None:
+        message += f" ({100*acquired/data_limit_Mbits:.1f}% of limit)."
+    return message
+
+
+def _format_instrument_data(acquisitions: Dict[str, float], total: float) -> str:
+    message = "Consumption by instrument:\n"
+    for inst, acquired in acquisitions.items():
+        message += f" - {inst: <5}: {acquired: 7.1f} Mbits - {100*acquired/total:4.1f}%\n"
+    return message
+
+
+class PowerConsumptionGraph:
+    """Contains information about power consumption timeline during a specified flyby."""
+
+    def __init__(self, name: str, CA_timestamp: str, sheet_path: Union[str, Datapack],
+                 add_HAA: bool = False, power_limit_Wh: float = None,
+                 time_interval_h: Tuple[float, float] = None,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None,
+                 compact: bool = False, integration: str = 'step') -> None:
+        """ Creates a power consumption analysis graph from a MAPPS resources datapack.
+
+        :param name: Name of analysis (or flyby)
+        :param CA_timestamp: UTC timestamp of closest approach, e.g. '2031-04-25T22:40:47'
+        :param sheet_path: Path to .csv MAPPS datapack, or an already loaded Datapack
+        :param add_HAA: Whether to manually add HAA data (since MAPPS doesn't output it yet)
+        Default False
+        :param power_limit_Wh: limit on total power consumed during flyby in Watt-hours
+        :param time_interval_h: 2-tuple defining a time interval on which to perform analysis,
+        in hours
+        :param synthetic_instruments: Other instruments not modelled by MAPPS to add manually
+        :param compact: Whether to store the instrument power run-length encoded in
+        self.timeline instead of in self.data, which uses much less memory for long datapacks.
+        The cumulative power is then only evaluated at the ends of the constant runs.
+        :param integration: Integration of power into energy if the rows are not equally
+        spaced: 'step' (each value holds until the next row) or 'trapezoid' (linear
+        interpolation between rows). Default 'step', which for equally spaced rows gives
+        power times the time step of the datapack.
+        """
+        check_integration_method(integration)
+        self.name = name
+        self.CA = parse_utc(CA_timestamp)
+        datapack = sheet_path if isinstance(sheet_path, Datapack) \
+            else Datapack(sheet_path, prefixes=("Power ",))
+        self.time_step_s = datapack.time_step_s
+        self.power_limit_Wh = power_limit_Wh
+        self.integration = integration
+
+        # Only keep the power columns, with the string "Power " stripped from column names,
+        # and with row indexes in hours from CA
+        df = datapack.select("Power ", self.CA)
+        self.synthetic_instruments = _synthetic_instruments(add_HAA, synthetic_instruments)
+        self._add_synthetic_instruments(df, self.synthetic_instruments)
+        self.data = df
+
+        if time_interval_h is not None:
+            _check_time_interval(time_interval_h)
+            # Slicing of rows found by binary search gives a view without copying the data
+            self.data = df.iloc[interval_slice(df.index.values, *time_interval_h)]
+
+        self.timeline: Optional[RunLengthTimeline] = None
+        if compact:
+            if self._row_durations_s(self.data) is not None:
+                raise ValueError("Compact mode requires equally spaced rows and 'step' "
+                                 "integration.")
+            self.timeline = RunLengthTimeline.from_dataframe(self._get_only_instrument_dataframe())
+            self.data = None
+
+        # Derived timelines, computed when first needed for the current self.data
+        self._cache_source: Optional[pd.DataFrame] = None
+        self._cumulative_power: Optional[pd.Series] = None
+        self._energy_prefix_sums: Optional[PrefixSums] = None
+        self._summary: Optional[ResourceSummary] = None
+        self._pyramid: Optional[TimePyramid] = None
+        self._cumulative_pyramid: Optional[TimePyramid] = None
+
+    def summary(self) -> ResourceSummary:
+        """ Calculates the total consumed energy, the energy of each instrument with its
+        percentage of the total, and the margin to power_limit_Wh. The result is cached
+        until the data is replaced, the margin is updated if power_limit_Wh changes.
+
+        :return: Summary of energy consumption in Wh
+        """
+        self._update_cache()
+        if self._summary is None:
+            total = _total(self.get_cumulative_power())
+            df = None if self.timeline is not None else self._get_only_instrument_dataframe()
+            durations = None if df is None else self._row_durations_s(df)
+            if durations is not None:
+                consumptions = dict(zip(df.columns,
+                                        weighted(df.values, durations).sum(axis=0) / 3600.0))
+            else:
+                if df is None:
+                    sums = dict(zip(self.timeline.columns, self.timeline.sum()))
+                else:
+                    sums = {inst: df[inst].sum() for inst in df}
+                consumptions = {inst: value / (3600.0 / self.time_step_s)
+                                for inst, value in sums.items()}
+            self._summary = ResourceSummary.from_totals(self.name, 'Wh', total, consumptions,
+                                                        self.power_limit_Wh)
+        if self._summary.limit != self.power_limit_Wh:
+            self._summary = self._summary.with_limit(self.power_limit_Wh)
+        return self._summary
+
+    def print_total_power_consumed(self) -> str:
+        """ Prints the total consumed power during the flyby.
+        """
+        message = _format_total_power(self.summary().total, self.power_limit_Wh)
+        print(message)
+        return message
+
+    def print_individual_instrument_consumption(self) -> str:
+        """ Prints a list of individual instrument power consumptions, and the percentage
+        of the total power consumption for each instrument.
+        """
+        summary = self.summary()
+        message = _format_instrument_power(summary.instrument_totals, summary.total)
+        print(message)
+        return message
+
+    def plot(self, plot_outline: bool = True, x_limits_h: Tuple[float, float] = None) -> None:
+        """ Generate stacked power consumption plot.
+
+        :param plot_outline: Whether to plot the required power profile
+        :param x_limits_h: Visible time interval in hours from CA, default (-15, 15)
+        """
+        self._draw(plt.gcf(), plot_outline, x_limits_h)
+        plt.show()
+
+    def render(self, path: str, fmt: str = None, plot_outline: bool = True,
+               x_limits_h: Tuple[float, float] = None) -> None:
+        """ Save the stacked power consumption plot to a file, without displaying it.
+
+        :param path: Output file path
+        :param fmt: Output format, e.g. 'png', 'svg' or 'pdf', default from the path extension
+        :param plot_outline: Whether to plot the required power profile
+        :param x_limits_h: Visible time interval in hours from CA, default (-15, 15)
+        """
+        _render_figure(lambda fig: self._draw(fig, plot_outline, x_limits_h), path, fmt)
+
+    def _draw(self, fig: Figure, plot_outline: bool = True,
+              x_limits_h: Tuple[float, float] = None) -> None:
+        """ Draw the stacked power consumption plot into a figure. """
+        X_LIMIT_H = [-15.0, 15.0] if x_limits_h is None else list(x_limits_h)
+        # Create pandas stacked plot and format the axis limits
+        ax_left = fig.gca()
+
+        ax_right: plt.Axes = ax_left.twinx()
+        # Plot only about as many samples as there are pixels in the visible interval, taken
+        # from the pyramid level of matching resolution. Numeric results use all samples.
+        n_bins = axis_width_px(ax_left)
+        self.get_pyramid().envelope(*X_LIMIT_H, n_bins).plot.area(stacked=True, ax=ax_left)
+        ax_left.set_xlim(left=X_LIMIT_H[0], right=X_LIMIT_H[1])
+        ax_left.set_ylabel('Power [W]')
+        # Plot the black power requirement line
+        if plot_outline:
+            ax_left.plot(*self._get_power_profile(), label='LIMIT', c='k', lw=3)
+        ax_left.set_title(f'{self.name} - power consumption')
+        # Reverse the up-down order of labels in the legend because it looks better
+        handles, labels = ax_left.get_legend_handles_labels()
+        ax_left.grid()
+
+        cumulative_power = self._get_cumulative_pyramid().envelope(*X_LIMIT_H, n_bins).iloc[:, 0]
+        # Plot the cumulative power consumption on the right side
+        ax_right.set_ylabel('Total consumed power [Wh]')
+        ax_right.set_xlim(left=X_LIMIT_H[0], right=X_LIMIT_H[1])
+        ax_right.plot(cumulative_power.index, cumulative_power,
+                      label='CONSUMED', c='g', lw=3)
+        ax_right.set_ylim(bottom=0.0)
+        if self.power_limit_Wh is not None:
+            ax_right.plot(X_LIMIT_H, [self.power_limit_Wh] * 2, label='LIMIT', c='r', lw=3)
+
+        # hack to get the left legend displayed on top on a third axis
+        ax_left.legend().set_visible(False)
+        ax3 = ax_left.twinx()
+        ax3.legend(handles[::-1], labels[::-1], loc='upper left')
+        ax3.yaxis.set_major_locator(NullLocator())
+
+        ax_right.legend(loc='upper right')
+
+    @staticmethod
+    def _get_power_profile() -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the black curve for plotting required power profile.
+        :return: Curve profile
+        """
+        x = np.array([-12.0, -12.0, -8.0, -8.0, -0.25, -0.25,
+                      0.25, 0.25, 8.0, 8.0, 12.0, 12.0])
+        y = np.array([0.0, 80.0, 80.0, 230.0, 230.0, 360.0,
+                      360.0, 230.0, 230.0, 80.0, 80.0, 0.0])
+        return (x, y)
+
+    def _get_only_instrument_dataframe(self) -> pd.DataFrame:
+        """
+
+        :return: Dataframe with only instrument power consumption entries
+        """
+        if self.timeline is not None:
+            return self.timeline.to_dataframe()
+        synthetic_names = [inst.name for inst in self.synthetic_instruments]
+        return self.data[_instrument_columns(self.data, synthetic_names)]
+
+    def get_pyramid(self) -> TimePyramid:
+        """ Minimum, maximum and mean power of each instrument at power-of-two time
+        resolutions, built when first needed. Plots and interval queries at any zoom level
+        use the coarsest sufficient level, in time independent of the length of the datapack.
+
+        :return: Pyramid of instrument power in W
+        """
+        self._update_cache()
+        if self._pyramid is None:
+            self._pyramid = TimePyramid.from_dataframe(self._get_only_instrument_dataframe())
+        return self._pyramid
+
+    def _get_cumulative_pyramid(self) -> TimePyramid:
+        """ Pyramid of the cumulative power consumption, for plotting. """
+        self._update_cache()
+        if self._cumulative_pyramid is None:
+            self._cumulative_pyramid = TimePyramid.from_dataframe(self.get_cumulative_power())
+        return self._cumulative_pyramid
+
+    def get_cumulative_power(self) -> pd.Series:
+        """ Calculate cumulative power consumption:
+         - Sum all instruments
+         - Do a cumulative sum along the time axis
+         - Renormalize by time step to get values in Wh
+
+        :return: Cumulative power consumption
+        """
+        self._update_cache()
+        if self._cumulative_power is None:
+            df = None if self.timeline is not None else self._get_only_instrument_dataframe()
+            durations = None if df is None else self._row_durations_s(df)
+            if durations is not None:
+                self._cumulative_power = (df.sum(axis=1) * durations).cumsum() / 3600.0
+            else:
+                cumulative = self.timeline.cumulative_sum() if df is None \
+                    else df.sum(axis=1).cumsum()
+                self._cumulative_power = cumulative / (3600.0 / self.time_step_s)
+        return self._cumulative_power
+
+    def get_energy_Wh(self, start_h: float = None, end_h: float = None,
+                      instrument: str = None) -> float:
+        """ Calculate power consumed within a time interval, using precomputed
+        cumulative sums of each instrument, in O(log n). Each row within the interval counts
+        for its whole duration, also if the rows are not equally spaced.
+
+        :param start_h: Start of the interval in hours from CA, default from the start
+        :param end_h: End of the interval in hours from CA, default until the end
+        :param instrument: Instrument name, e.g. 'JANUS', default all instruments
+        :return: Consumed power in Wh
+        """
+        if self.timeline is not None:
+            sums = self.timeline.sum(start_h, end_h) / (3600.0 / self.time_step_s)
+            if instrument is None:
+                return sums.sum()
+            return sums[self.timeline.columns.index(instrument)]
+        prefix_sums = self._get_energy_prefix_sums()
+        if instrument is None:
+            return prefix_sums.sum(start_h, end_h).sum()
+        return prefix_sums.column_sum(instrument, start_h, end_h)
+
+    def _get_energy_prefix_sums(self) -> PrefixSums:
+        """ Cumulative sums of the energy of each instrument in Wh. """
+        self._update_cache()
+        if self._energy_prefix_sums is None:
+            df = self._get_only_instrument_dataframe()
+            durations = self._row_durations_s(df)
+            energy = df.values / (3600.0 / self.time_step_s) if durations is None \
+                else weighted(df.values, durations) / 3600.0
+            self._energy_prefix_sums = PrefixSums(df.index.values, energy, df.columns)
+        return self._energy_prefix_sums
+
+    def get_profile_violations(self, profile: Tuple[np.ndarray, np.ndarray] = None
+                               ) -> List[Violation]:
+        """ Finds all intervals in which the total power exceeds the power profile.
+
+        :param profile: (x, y) points of the power profile in hours from CA and Watts,
+        default the required power profile from _get_power_profile()
+        :return: List of violations, with peak excess in W and energy over the profile in Wh
+        """
+        if profile is None:
+            profile = self._get_power_profile()
+        df = self._get_only_instrument_dataframe()
+        time_h = df.index.values
+        total_power = df.sum(axis=1).values
+        durations = self._row_durations_s(df)
+        return find_violations(time_h, total_power, evaluate_profile(profile, time_h),
+                               self.time_step_s if durations is None else durations)
+
+    def get_power_statistics(self, windows_min: Sequence[float] = (1.0, 10.0, 60.0),
+                             on_threshold_W: float = 0.0) -> PowerStatistics:
+        """ Calculate the worst average power over windows of given lengths, and duty cycles
+        of the instruments, in O(n) regardless of the window lengths. The rows of the
+        datapack must be equally spaced.
+
+        :param windows_min: Lengths of the averaging windows in minutes
+        :param on_threshold_W: Power above which an instrument is considered on
+        :return: Peak average power of the total and of each instrument, and duty cycles
+        """
+        df = self._get_only_instrument_dataframe()
+        if self.timeline is None and not is_uniform(df.index.values, self.time_step_s):
+            raise ValueError("Power statistics require equally spaced rows.")
+        return power_statistics(df, self.time_step_s, windows_min, on_threshold_W)
+
+    def get_cumulative_limit_violations(self) -> List[Violation]:
+        """ Finds the interval in which the cumulative power exceeds power_limit_Wh.
+
+        :return: List of violations with peak excess in Wh, empty if there is no limit
+        """
+        if self.power_limit_Wh is None:
+            return []
+        cumulative = self.get_cumulative_power()
+        return find_cumulative_violations(cumulative.index.values, cumulative.values,
+                                          self.power_limit_Wh)
+
+    def _row_durations_s(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """ Integration weights of the rows of df, None if each row counts for
+        the time step. """
+        if self.timeline is not None:
+            return None
+        return row_durations_s(df.index.values, self.time_step_s, self.integration)
+
+    def _update_cache(self) -> None:
+        """ Drop the derived timelines if the data has been replaced. """
+        if self._cache_source is not self.data:
+            self._cache_source = self.data
+            self._cumulative_power = None
+            self._energy_prefix_sums = None
+            self._summary = None
+            self._pyramid = None
+            self._cumulative_pyramid = None
+
+    @staticmethod
+    def _add_synthetic_instruments(df: pd.DataFrame,
+                                   instruments: Sequence[SyntheticInstrument]) -> None:
+        """ Adds entries for power consumption of instruments not modelled by MAPPS,
+        e.g. the High-Accuracy Accelerometer.
+
+        :param df: Dataframe to add the entries to.
+        :param instruments: Instruments to add
+        """
+        for inst in instruments:
+            df[inst.name] = inst.power(df.index.values)
+
+
+class DataConsumptionGraph:
+    """Contains information about data consumption timeline during a specified flyby."""
+
+    def __init__(self, name: str, CA_timestamp: str, sheet_path: Union[str, Datapack],
+                 add_HAA: bool = True, data_limit_Mbits: float = None,
+                 time_interval_h: Tuple[float, float] = None,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None,
+                 integration: str = 'step') -> None:
+        """ Creates a powerdata consumption analysis graph from a MAPPS resources datapack.
+
+        :param name: Name of analysis (or flyby)
+        :param CA_timestamp: UTC timestamp of closest approach, e.g. '2031-04-25T22:40:47'
+        :param sheet_path: Path to .csv MAPPS datapack, or an already loaded Datapack
+        :param add_HAA: whether to manually add HAA data (since MAPPS doesn't output it yet)
+        :param data_limit_Mbits: limit on total data acquired during flyby
+        :param time_interval_h: 2-tuple defining a time interval on which to perform analysis
+        :param synthetic_instruments: Other instruments not modelled by MAPPS to add manually
+        :param integration: Integration of data rates into data volume if the rows are not
+        equally spaced: 'step' or 'trapezoid', see PowerConsumptionGraph
+        """
+        check_integration_method(integration)
+        self.name = name
+        self.CA: datetime = parse_utc(CA_timestamp)
+        datapack = sheet_path if isinstance(sheet_path, Datapack) \
+            else Datapack(sheet_path, prefixes=("Data Rate ", "Data Accumulated "))
+        self.time_step_s = datapack.time_step_s
+        self.data_limit_Mbits = data_limit_Mbits
+        self.integration = integration
+
+        # Strip the strings "Data Rate " and "Data Accumulated " from column names
+        data_rate = datapack.select("Data Rate ", self.CA)
+        data_accum = datapack.select("Data Accumulated ", self.CA)
+
+        rows = slice(0, len(data_rate))
+        if time_interval_h is not None:
+            _check_time_interval(time_interval_h)
+            rows = interval_slice(data_rate.index.values, *time_interval_h)
+
+        self.data_rate = data_rate
+        self.data_accum = data_accum
+        self.synthetic_instruments = _synthetic_instruments(add_HAA, synthetic_instruments)
+        self._add_synthetic_instruments(rows.start)
+        # Slicing of rows found by binary search gives a view without copying the data
+        self.data_rate = self.data_rate.iloc[rows]
+        self.data_accum = self.data_accum.iloc[rows]
+
+        self._cache_source: Optional[pd.DataFrame] = None
+        self._data_prefix_sums: Optional[PrefixSums] = None
+        self._summary_source: Optional[pd.DataFrame] = None
+        self._summary: Optional[ResourceSummary] = None
+        self._pyramid_source: Optional[pd.DataFrame] = None
+        self._pyramids: Optional[Tuple[TimePyramid, TimePyramid]] = None
+
+    def summary(self) -> ResourceSummary:
+        """ Calculates the total acquired data, the data of each instrument with its
+        percentage of the total, and the margin to data_limit_Mbits. The result is cached
+        until the data is replaced, the margin is updated if data_limit_Mbits changes.
+
+        :return: Summary of data acquisition in Mbits
+        """
+        if self._summary_source is not self.data_accum or self._summary is None:
+            self._summary_source = self.data_accum
+            total = _total(self.get_cumulative_data())
+            df = self._get_only_instrument_dataframe(self.data_accum)
+            acquisitions = {inst: _total(df[inst]) for inst in df}
+            self._summary = ResourceSummary.from_totals(self.name, 'Mbits', total, acquisitions,
+                                                        self.data_limit_Mbits)
+        if self._summary.limit != self.data_limit_Mbits:
+            self._summary = self._summary.with_limit(self.data_limit_Mbits)
+        return self._summary
+
+    def print_total_data_acquired(self) -> str:
+        """ Prints the total consumed power during the flyby.
+        """
+        message = _format_total_data(self.summary().total, self.data_limit_Mbits)
+        print(message)
+        return message
+
+    def print_individual_instrument_data(self) -> str:
+        """ Prints a list of individual instrument data consumptions, and the percentage
+        of the total data consumption for each instrument.
+        """
+        summary = self.summary()
+        message = _format_instrument_data(summary.instrument_totals, summary.total)
+        print(message)
+        return message
+
+    def plot(self, x_limits_h: Tuple[float, float] = None) -> None:
+        """ Generate stacked data acquisition plot.
+
+        :param x_limits_h: Visible time interval in hours from CA, default (-10, 10)
+        """
+        self._draw(plt.figure(), x_limits_h)
+        plt.show()
+
+    def render(self, path: str, fmt: str = None, x_limits_h: Tuple[float, float] = None) -> None:
+        """ Save the stacked data acquisition plot to a file, without displaying it.
+
+        :param path: Output file path
+        :param fmt: Output format, e.g. 'png', 'svg' or 'pdf', default from the path extension
+        :param x_limits_h: Visible time interval in hours from CA, default (-10, 10)
+        """
+        _render_figure(lambda fig: self._draw(fig, x_limits_h), path, fmt)
+
+    def _draw(self, fig: Figure, x_limits_h: Tuple[float, float] = None) -> None:
+        """ Draw the stacked data acquisition plot into a figure. """
+        X_LIMIT_H = [-10.0, 10.0] if x_limits_h is None else list(x_limits_h)
+        # Create pandas stacked plot and format the axis limits
+        ax: plt.Axes = fig.gca()
+        # Plot only about as many samples as there are pixels in the visible interval, taken
+        # from the pyramid level of matching resolution. Numeric results use all samples.
+        n_bins = axis_width_px(ax)
+        pyramid, cumulative_pyramid = self._get_pyramids()
+        pyramid.envelope(*X_LIMIT_H, n_bins).plot.area(stacked=True, ax=ax)
+        ax.set_xlim(left=X_LIMIT_H[0], right=X_LIMIT_H[1])
+        ax.set_ylabel('Total acquired data [Mbits]')
+        ax.set_title(f'{self.name} - data acquired')
+        # Reverse the up-down order of labels in the legend because it looks better
+        handles, labels = ax.get_legend_handles_labels()
+
+        ax.grid()
+
+        cumulative_data = cumulative_pyramid.envelope(*X_LIMIT_H, n_bins).iloc[:, 0]
+        ax.plot(cumulative_data.index, cumulative_data,
+                label='MEMORY', c='k', lw=3)
+        if self.data_limit_Mbits is not None:
+            ax.plot(X_LIMIT_H, [self.data_limit_Mbits] * 2, label='LIMIT', c='r', lw=3)
+            if ax.get_ylim()[1] < self.data_limit_Mbits:
+                ax.set_ylim(bottom=0.0, top=1.1*self.data_limit_Mbits)
+        ax.legend(handles[::-1], labels[::-1], loc='upper left')
+
+    def _get_only_instrument_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+
+        :param df: Dataframe from which to extract instrument entries
+        :return: Dataframe with only instrument entries
+        """
+        synthetic_names = [inst.name for inst in self.synthetic_instruments]
+        return df[_instrument_columns(df, synthetic_names)]
+
+    def get_cumulative_data(self) -> pd.Series:
+        """ Get accumulated data total
+        :return: Total accumulated data
+        """
+        return self.data_accum.sum(axis=1)
+
+    def get_pyramid(self) -> TimePyramid:
+        """ Minimum, maximum and mean accumulated data of each instrument at power-of-two
+        time resolutions, built when first needed. Plots and interval queries at any zoom
+        level use the coarsest sufficient level, in time independent of the length of
+        the datapack.
+
+        :return: Pyramid of accumulated data in Mbits
+        """
+        return self._get_pyramids()[0]
+
+    def _get_pyramids(self) -> Tuple[TimePyramid, TimePyramid]:
+        """ Pyramids of the accumulated data of each instrument, and of the total. """
+        if self._pyramid_source is not self.data_accum or self._pyramids is None:
+            self._pyramid_source = self.data_accum
+            self._pyramids = (TimePyramid.from_dataframe(
+                self._get_only_instrument_dataframe(self.data_accum)),
+                TimePyramid.from_dataframe(self.get_cumulative_data()))
+        return self._pyramids
+
+    def get_data_volume_Mbits(self, start_h: float = None, end_h: float = None,
+                              instrument: str = None) -> float:
+        """ Calculate data acquired within a time interval from the data rates, using
+        precomputed cumulative sums of each instrument, in O(log n).
+
+        :param start_h: Start of the interval in hours from CA, default from the start
+        :param end_h: End of the interval in hours from CA, default until the end
+        :param instrument: Instrument name, e.g. 'JANUS', default all instruments
+        :return: Acquired data in Mbits
+        """
+        prefix_sums = self._get_data_prefix_sums()
+        if instrument is None:
+            return prefix_sums.sum(start_h, end_h).sum()
+        return prefix_sums.column_sum(instrument, start_h, end_h)
+
+    def _get_data_prefix_sums(self) -> PrefixSums:
+        """ Cumulative sums of the data volume of each instrument in Mbits. """
+        if self._cache_source is not self.data_rate or self._data_prefix_sums is None:
+            df = self._get_only_instrument_dataframe(self.data_rate)
+            self._cache_source = self.data_rate
+            durations = self._row_durations_s(df)
+            volume = df.values * self.time_step_s / 1000.0 if durations is None \
+                else weighted(df.values, durations) / 1000.0
+            self._data_prefix_sums = PrefixSums(df.index.values, volume, df.columns)
+        return self._data_prefix_sums
+
+    def simulate_ssmm(self, downlink: Sequence[DownlinkWindow],
+                      stores: Sequence[PacketStore] = None) -> SSMMFill:
+        """ Simulate the fill level of the mass memory, with the data of each instrument
+        in its own packet store, drained by downlink in order of store priority.
+
+        :param downlink: Downlink windows in hours from CA, with downlink rates in kbps
+        :param stores: Packet stores in order of priority, default an unlimited store for
+        each instrument in the order in which they are listed
+        :return: Fill levels, downlinked and lost data of each store
+        """
+        data_rate = self._get_only_instrument_dataframe(self.data_rate)
+        if stores is None:
+            stores = [PacketStore(inst) for inst in data_rate]
+        durations = self._row_durations_s(data_rate)
+        return simulate_ssmm(data_rate, self.time_step_s if durations is None else durations,
+                             stores, downlink)
+
+    def _row_durations_s(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """ Integration weights of the rows of df, None if each row counts for
+        the time step. """
+        return row_durations_s(df.index.values, self.time_step_s, self.integration)
+
+    def _add_synthetic_instruments(self, start_idx: int = 0) -> None:
+        """ Adds entries for data rate and accumulated data of instruments not modelled
+        by MAPPS, e.g. the High-Accuracy Accelerometer.
+
+        :param start_idx: Row from which the data is accumulated
+        """
+        time_h = self.data_rate.index.values
+        durations = self._row_durations_s(self.data_rate)
+        for inst in self.synthetic_instruments:
+            rate = inst.data_rate(time_h)
+            self.data_rate[inst.name] = rate
+            accum = np.zeros(len(rate))
+            if durations is None:
+                accum[start_idx:] = rate[start_idx:].cumsum() * self.time_step_s / 1000.0
+            else:
+                accum[start_idx:] = weighted(rate, durations)[start_idx:].cumsum() / 1000.0
+            self.data_accum[inst.name] = accum
+
+
+if __name__ == '__main__':
+    datapack = Datapack(r"C:\MAPPS\JUICE_SO\MAPPS\OUTPUT_DATA\22c11_payload_resources.csv")
+    pcg = PowerConsumptionGraph("22C11", "2031-09-27T04:38:01", datapack,
+                                power_limit_Wh=3746.0)
+    dcg = DataConsumptionGraph("22C11", "2031-09-27T04:38:01", datapack,
+                               data_limit_Mbits=30000.0)
+
+    pcg.print_total_power_consumed()
+    pcg.print_individual_instrument_consumption()
+
+    dcg.print_total_data_acquired()
+    dcg.print_individual_instrument_data()
+
+    pcg.plot()
+    plt.show()
+
+    dcg.plot()
+    plt.show()
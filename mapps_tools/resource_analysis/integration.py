@@ -0,0 +1,69 @@
+# coding=utf-8
+""" Integration of power and data rate timelines whose rows are not equally spaced,
+e.g. datapacks with event-driven output steps.
+
+@author: Marcel Stefko
+"""
+from typing import Optional
+
+import numpy as np
+
+# Step-hold: each value holds until the next row, the last one for the nominal time step.
+# Trapezoid: values are linearly interpolated between the rows.
+INTEGRATION_METHODS = ('step', 'trapezoid')
+
+# Largest deviation of row time deltas from the nominal time step, relative to the step,
+# for which the rows are still considered equally spaced
+TIME_TOLERANCE = 1e-6
+
+
+def check_integration_method(method: str) -> None:
+    if method not in INTEGRATION_METHODS:
+        raise ValueError(f"Invalid integration method '{method}', "
+                         f"expected one of {INTEGRATION_METHODS}.")
+
+
+def is_uniform(time_h: np.ndarray, time_step_s: float) -> bool:
+    """ Whether the rows are spaced by the nominal time step.
+
+    :param time_h: Times of the rows in hours
+    :param time_step_s: Nominal time step in seconds
+    """
+    return bool(np.all(np.abs(np.diff(time_h) * 3600.0 - time_step_s)
+                       <= TIME_TOLERANCE * time_step_s))
+
+
+def row_durations_s(time_h: np.ndarray, time_step_s: float,
+                    method: str = 'step') -> Optional[np.ndarray]:
+    """ Integration weight of each row, i.e. the time in seconds for which its value counts.
+    With step-hold it is the time until the next row, and the nominal time step for the last
+    row. With the trapezoidal rule it is half of the time between the neighbouring rows.
+
+    :param time_h: Times of the rows in hours
+    :param time_step_s: Nominal time step in seconds
+    :param method: One of INTEGRATION_METHODS
+    :return: Array of durations, or None for step-hold of equally spaced rows, where the
+    duration of each row is the time step
+    """
+    check_integration_method(method)
+    time_h = np.asarray(time_h, dtype=np.float64)
+    if method == 'step' and is_uniform(time_h, time_step_s):
+        return None
+    deltas_s = np.diff(time_h) * 3600.0
+    if method == 'step':
+        return np.concatenate([deltas_s, [time_step_s]])
+    durations = np.zeros(len(time_h))
+    durations[:-1] += deltas_s / 2
+    durations[1:] += deltas_s / 2
+    return durations
+
+
+def weighted(values: np.ndarray, durations_s: np.ndarray) -> np.ndarray:
+    """ Multiplies each row by its duration, e.g. power in W into energy in Ws.
+
+    :param values: 1D array, or 2D array with one row for each time
+    :param durations_s: Durations of the rows from row_durations_s()
+    :return: Array of the same shape as values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return values * (durations_s if values.ndim == 1 else durations_s[:, np.newaxis])
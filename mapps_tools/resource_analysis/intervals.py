@@ -0,0 +1,67 @@
+# coding=utf-8
+""" Queries over time intervals of resource timelines.
+
+@author: Marcel Stefko
+"""
+from typing import List
+
+import numpy as np
+
+
+def interval_slice(time_h: np.ndarray, start_h: float = None, end_h: float = None) -> slice:
+    """ Finds the rows of a sorted time index which lie in the closed interval
+    [start_h, end_h], using binary search.
+
+    :param time_h: Sorted time index in hours from CA
+    :param start_h: Start of the interval, default from the first row
+    :param end_h: End of the interval, default until the last row
+    :return: Slice of the rows within the interval
+    """
+    lo = 0 if start_h is None else int(np.searchsorted(time_h, start_h, side='left'))
+    hi = len(time_h) if end_h is None else int(np.searchsorted(time_h, end_h, side='right'))
+    return slice(lo, max(lo, hi))
+
+
+class PrefixSums:
+    """ Cumulative sums of the columns of a timeline, which answer sums over any time
+    interval in O(log n) without copying the timeline. """
+
+    def __init__(self, time_h: np.ndarray, values: np.ndarray, columns: List[str]) -> None:
+        """ Precomputes the cumulative sums.
+
+        :param time_h: Sorted time index in hours from CA
+        :param values: 2D array of values, with one row for each time
+        :param columns: Names of the columns of values
+        """
+        self.time_h = np.asarray(time_h)
+        self.columns = list(columns)
+        self._sums = np.zeros((len(self.time_h) + 1, len(self.columns)))
+        np.cumsum(values, axis=0, out=self._sums[1:])
+
+    def sum(self, start_h: float = None, end_h: float = None) -> np.ndarray:
+        """ Sums of all columns over rows within the closed interval [start_h, end_h].
+
+        :param start_h: Start of the interval, default from the first row
+        :param end_h: End of the interval, default until the last row
+        :return: Array with the sum of each column
+        """
+        rows = interval_slice(self.time_h, start_h, end_h)
+        return self._sums[rows.stop] - self._sums[rows.start]
+
+    def column_sum(self, column: str, start_h: float = None, end_h: float = None) -> float:
+        """ Sum of one column over rows within the closed interval [start_h, end_h]. """
+        idx = self.columns.index(column)
+        rows = interval_slice(self.time_h, start_h, end_h)
+        return self._sums[rows.stop, idx] - self._sums[rows.start, idx]
+
+    def interval_sums(self, start_h: np.ndarray, end_h: np.ndarray) -> np.ndarray:
+        """ Sums of all columns over many half-open intervals [start_h, end_h) at once,
+        e.g. consecutive intervals which share their boundaries.
+
+        :param start_h: Array of starts of the intervals
+        :param end_h: Array of ends of the intervals
+        :return: 2D array with the sum of each column (columns) for each interval (rows)
+        """
+        lo = np.searchsorted(self.time_h, start_h, side='left')
+        hi = np.maximum(lo, np.searchsorted(self.time_h, end_h, side='left'))
+        return self._sums[hi] - self._sums[lo]
@@ -0,0 +1,152 @@
+# coding=utf-8
+""" Checking of resource timelines against limits.
+
+@author: Marcel Stefko
+"""
+from typing import List, NamedTuple, Tuple, Union
+
+import numpy as np
+
+
+class Violation(NamedTuple):
+    """ Interval during which a limit is exceeded. """
+    start_h: float
+    end_h: float
+    # Largest excess over the limit, in units of the checked values
+    peak_excess: float
+    # Excess integrated over the interval in Wh (for power), or the peak excess for
+    # cumulative limits, where the excess is already an energy
+    excess_energy_Wh: float
+
+
+def evaluate_profile(profile: Tuple[np.ndarray, np.ndarray], time_h: np.ndarray) -> np.ndarray:
+    """ Evaluates a limit profile at given times. The profile is a piecewise linear curve
+    given by its (x, y) points, as returned by PowerConsumptionGraph._get_power_profile().
+    Steps in the profile are given by two points with the same x, and at a step the higher
+    of the two values applies. Outside of the profile the limit is 0.
+
+    :param profile: (x, y) points of the profile, with x in hours from CA sorted ascending
+    :param time_h: Times in hours from CA
+    :return: Limit values at given times
+    """
+    x, y = (np.asarray(a, dtype=np.float64) for a in profile)
+    t = np.asarray(time_h, dtype=np.float64)
+    n = len(x)
+
+    # Value approaching from the right: segment starting at the last point with x <= t
+    i = np.searchsorted(x, t, side='right') - 1
+    right = np.zeros(len(t))
+    on_segment = (i >= 0) & (i < n - 1)
+    i0, i1 = i[on_segment], i[on_segment] + 1
+    right[on_segment] = y[i0] + (y[i1] - y[i0]) * (t[on_segment] - x[i0]) / (x[i1] - x[i0])
+    at_end = (i == n - 1) & (t == x[-1])
+    right[at_end] = y[-1]
+
+    # Value approaching from the left: segment ending at the first point with x >= t
+    j = np.searchsorted(x, t, side='left')
+    left = np.zeros(len(t))
+    on_segment = (j >= 1) & (j < n)
+    j0, j1 = j[on_segment] - 1, j[on_segment]
+    left[on_segment] = y[j0] + (y[j1] - y[j0]) * (t[on_segment] - x[j0]) / (x[j1] - x[j0])
+
+    return np.maximum(left, right)
+
+
+def _true_runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Finds runs of consecutive True values.
+
+    :param mask: Boolean array
+    :return: Indices of the first and of the last element of each run
+    """
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+
+def _run_maxima(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """ Maximum of values over each run given by indices of its first and last element. """
+    # Reduce over [start, end+1) boundaries, keeping every other result
+    boundaries = np.column_stack([starts, ends + 1]).ravel()
+    return np.maximum.reduceat(np.append(values, 0.0), boundaries)[::2]
+
+
+def find_violations(time_h: np.ndarray, values: np.ndarray, limit: Union[float, np.ndarray],
+                    time_step_s: Union[float, np.ndarray]) -> List[Violation]:
+    """ Finds all intervals in which values exceed the limit, in a single vectorized pass.
+
+    :param time_h: Times of the samples in hours from CA
+    :param values: Values of the samples, e.g. power in W
+    :param limit: Limit, either constant or one value for each sample
+    :param time_step_s: Time step of the samples, used to integrate the excess, or
+    the duration of each sample if they are not equally spaced
+    :return: List of violations in time order
+    """
+    excess = np.asarray(values, dtype=np.float64) - limit
+    starts, ends = _true_runs(excess > 0)
+    if len(starts) == 0:
+        return []
+    peaks = _run_maxima(excess, starts, ends)
+    positive = np.where(excess > 0, excess, 0.0)
+    if np.ndim(time_step_s) == 0:
+        sums = np.concatenate([[0.0], np.cumsum(positive)])
+        energies = (sums[ends + 1] - sums[starts]) * time_step_s / 3600.0
+    else:
+        sums = np.concatenate([[0.0], np.cumsum(positive * time_step_s)])
+        energies = (sums[ends + 1] - sums[starts]) / 3600.0
+    return [Violation(*values) for values in
+            zip(time_h[starts], time_h[ends], peaks, energies)]
+
+
+def find_cumulative_violations(time_h: np.ndarray, cumulative_Wh: np.ndarray,
+                               limit_Wh: float) -> List[Violation]:
+    """ Finds all intervals in which the cumulative consumption exceeds the limit.
+
+    :param time_h: Times of the samples in hours from CA
+    :param cumulative_Wh: Cumulative consumption in Wh
+    :param limit_Wh: Limit on the cumulative consumption in Wh
+    :return: List of violations in time order, with peak excess also as excess energy
+    """
+    return [violation._replace(excess_energy_Wh=violation.peak_excess) for violation in
+            find_violations(time_h, cumulative_Wh, limit_Wh, time_step_s=0.0)]
+
+
+def violates_limits(time_h: np.ndarray, power_W: np.ndarray, time_step_s: float,
+                    profile: Tuple[np.ndarray, np.ndarray] = None,
+                    power_limit_Wh: float = None) -> np.ndarray:
+    """ Checks many candidate power timelines against the limits at once, e.g. as a gate
+    in automated planning.
+
+    :param time_h: Times of the samples in hours from CA, common to all candidates
+    :param power_W: 2D array of total power, with one row for each candidate timeline
+    :param time_step_s: Time step of the samples
+    :param profile: (x, y) points of the power profile, as in evaluate_profile()
+    :param power_limit_Wh: Limit on the total consumed power in Wh
+    :return: Boolean array, True for each candidate which violates any of the limits
+    """
+    power_W = np.atleast_2d(power_W)
+    violating = np.zeros(power_W.shape[0], dtype=bool)
+    if profile is not None:
+        violating |= (power_W > evaluate_profile(profile, time_h)).any(axis=1)
+    if power_limit_Wh is not None:
+        # Cumulative power only grows, so it is enough to check the total
+        violating |= power_W.sum(axis=1) / (3600.0 / time_step_s) > power_limit_Wh
+    return violating
+
+
+def _extend_violations(violations: List[Violation], new: List[Violation],
+                       continues: bool, cumulative: bool = False) -> None:
+    """ Appends violations found in the next chunk of a timeline, merging the first one
+    with the last previous one if the violation continues across the chunk boundary.
+
+    :param violations: Violations found so far, extended in place
+    :param new: Violations found in the next chunk
+    :param continues: Whether the first sample of the chunk continues the last violation
+    :param cumulative: Whether the violations are of a cumulative limit
+    """
+    if continues and new and violations:
+        previous = violations.pop()
+        first = new[0]
+        peak = max(previous.peak_excess, first.peak_excess)
+        energy = peak if cumulative else previous.excess_energy_Wh + first.excess_energy_Wh
+        new = [Violation(previous.start_h, first.end_h, peak, energy)] + new[1:]
+    violations.extend(new)
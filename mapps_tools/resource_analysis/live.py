@@ -0,0 +1,300 @@
+# coding=utf-8
+""" Following of MAPPS resources datapacks which are still being written, e.g. during
+a long simulation, with analysis graphs updated as new rows are appended.
+
+@author: Marcel Stefko
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import io
+import os
+from matplotlib import pyplot as plt
+import numpy as np
+import pandas as pd
+
+from .datapack import Datapack
+from .graphs import PowerConsumptionGraph, DataConsumptionGraph, _instrument_columns
+from .integration import is_uniform
+from .intervals import interval_slice
+from .synthetic import SyntheticInstrument
+
+
+class DatapackFollower:
+    """ Reads rows appended to a datapack since the previous read. The number of bytes
+    already consumed is remembered, so each read only parses the new complete lines. """
+
+    def __init__(self, sheet_path: str, prefixes: Sequence[str] = None) -> None:
+        """ Prepares following of the datapack, without reading it yet.
+
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param prefixes: If given, only columns whose labels start with one of the
+        prefixes are read. Default reads all columns.
+        """
+        self.path = sheet_path
+        self.prefixes = prefixes
+        # Number of bytes of the datapack which were already parsed
+        self.offset = 0
+        self._metadata: Optional[Dict[str, np.ndarray]] = None
+        self._indices: Optional[List[int]] = None
+
+    def read_new(self) -> Optional[Datapack]:
+        """ Parses complete lines appended since the previous read. A partially written
+        last line is left for the next read.
+
+        :return: Datapack with the new rows (possibly none), or None if the header of
+        the datapack is not completely written yet
+        """
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < self.offset:
+                raise ValueError(f"Datapack {self.path} was truncated while being followed.")
+            f.seek(self.offset)
+            content = f.read()
+        complete = content[:content.rfind(b'\n') + 1]
+
+        if self._metadata is None:
+            lines = complete.splitlines(keepends=True)
+            n_header = next((i for i, line in enumerate(lines) if not line.startswith(b'#')),
+                            len(lines))
+            # Column labels and units must follow the header block
+            if len(lines) < n_header + 2:
+                return None
+            preamble = b''.join(lines[:n_header + 2])
+            self._metadata, self._indices = Datapack._read_preamble(
+                io.StringIO(preamble.decode()), self.prefixes)
+            self.offset += len(preamble)
+            complete = complete[len(preamble):]
+
+        self.offset += len(complete)
+        if complete.strip():
+            body = Datapack._read_body(io.StringIO(complete.decode()), self._indices)
+            arrays = Datapack._body_arrays(body, self._indices)
+        else:
+            arrays = {'timestamps': np.empty(0, dtype='datetime64[us]'),
+                      **{f'column_{idx}': np.empty(0) for idx in self._indices}}
+        return Datapack._from_arrays(self.path, {**self._metadata, **arrays}, self.prefixes)
+
+
+class _GrowingArray:
+    """ Array which grows by appending rows, with amortized O(1) cost per row. """
+
+    def __init__(self, row_shape: Tuple[int, ...] = ()) -> None:
+        self._data = np.empty((1024,) + tuple(row_shape))
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, rows: np.ndarray) -> None:
+        end = self._length + len(rows)
+        if end > len(self._data):
+            data = np.empty((max(end, 2 * len(self._data)),) + self._data.shape[1:])
+            data[:self._length] = self._data[:self._length]
+            self._data = data
+        self._data[self._length:end] = rows
+        self._length = end
+
+    @property
+    def view(self) -> np.ndarray:
+        """ Appended rows, as a view without copying. """
+        return self._data[:self._length]
+
+
+def _continue_cumsum(previous: float, values: np.ndarray) -> np.ndarray:
+    """ Cumulative sum continuing from a previous sum, with the same values as a single
+    cumulative sum over all rows. """
+    return np.cumsum(np.concatenate([[previous], values]))[1:]
+
+
+def _check_equally_spaced(times: _GrowingArray, time_h: np.ndarray, time_step_s: float) -> None:
+    """ Raises if new rows, together with the last appended row, are not spaced by the time
+    step. The running sums weight each row by the time step. """
+    if not is_uniform(np.concatenate([times.view[-1:], time_h]), time_step_s):
+        raise ValueError("Live graphs require equally spaced rows.")
+
+
+def _grown_frame(times: _GrowingArray, rows: _GrowingArray, columns: pd.Index) -> pd.DataFrame:
+    """ Dataframe over the rows appended so far, without copying them. """
+    return pd.DataFrame(rows.view, index=pd.Index(times.view, name="Time [h]"),
+                        columns=columns, copy=False)
+
+
+class _LivePlot:
+    """ Live plot of a graph which is refreshed from its datapack. """
+
+    def watch(self, interval_s: float = 10.0, max_refreshes: int = None) -> None:
+        """ Shows the plot, and redraws it whenever new rows are appended to the datapack,
+        until the plot window is closed.
+
+        :param interval_s: Time between checks for new rows, in seconds
+        :param max_refreshes: Maximum number of checks, default unlimited
+        """
+        fig = plt.figure()
+        self._draw(fig)
+        refreshes = 0
+        while plt.fignum_exists(fig.number) and \
+                (max_refreshes is None or refreshes < max_refreshes):
+            plt.pause(interval_s)
+            if self.refresh():
+                fig.clf()
+                self._draw(fig)
+                fig.canvas.draw_idle()
+            refreshes += 1
+
+
+class LivePowerConsumptionGraph(_LivePlot, PowerConsumptionGraph):
+    """ Power consumption graph of a datapack which is still being written. Each refresh
+    parses only the newly appended rows, and updates the cumulative power in O(new rows).
+    The rows of the datapack must be equally spaced.
+    """
+
+    def __init__(self, name: str, CA_timestamp: str, sheet_path: str,
+                 add_HAA: bool = False, power_limit_Wh: float = None,
+                 time_interval_h: Tuple[float, float] = None,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None) -> None:
+        """ Reads the rows written so far. The arguments are the same as for
+        PowerConsumptionGraph, except that the datapack must be given by its path.
+        """
+        self._follower = DatapackFollower(sheet_path, prefixes=("Power ",))
+        datapack = self._follower.read_new()
+        if datapack is None:
+            raise ValueError(f"Header of datapack {sheet_path} is not completely written yet.")
+        super().__init__(name, CA_timestamp, datapack, add_HAA=add_HAA,
+                         power_limit_Wh=power_limit_Wh, time_interval_h=time_interval_h,
+                         synthetic_instruments=synthetic_instruments)
+        self._time_interval_h = time_interval_h
+        self._columns = self.data.columns
+        self._times = _GrowingArray()
+        self._rows = _GrowingArray((len(self._columns),))
+        # Cumulative sum of power samples, and cumulative power in Wh
+        self._power_sums = _GrowingArray()
+        self._power_Wh = _GrowingArray()
+        self._append(self.data)
+
+    def refresh(self) -> int:
+        """ Reads rows appended to the datapack since the last refresh.
+
+        :return: Number of new rows within the analyzed time interval
+        """
+        datapack = self._follower.read_new()
+        if datapack is None or len(datapack) == 0:
+            return 0
+        df = datapack.select("Power ", self.CA)
+        self._add_synthetic_instruments(df, self.synthetic_instruments)
+        if self._time_interval_h is not None:
+            df = df.iloc[interval_slice(df.index.values, *self._time_interval_h)]
+        if len(df) == 0:
+            return 0
+        self._append(df)
+        return len(df)
+
+    def get_power_margin_Wh(self) -> Optional[float]:
+        """ Remaining power until power_limit_Wh is reached, negative if it is exceeded.
+
+        :return: Margin in Wh, or None if there is no limit
+        """
+        if self.power_limit_Wh is None:
+            return None
+        return self.power_limit_Wh - (self._power_Wh.view[-1] if len(self._power_Wh) else 0.0)
+
+    def _append(self, df: pd.DataFrame) -> None:
+        """ Appends new rows and extends the cumulative power by them. """
+        _check_equally_spaced(self._times, df.index.values, self.time_step_s)
+        synthetic_names = [inst.name for inst in self.synthetic_instruments]
+        total_power = df[_instrument_columns(df, synthetic_names)].sum(axis=1).values
+        previous = self._power_sums.view[-1] if len(self._power_sums) else 0.0
+        power_sums = _continue_cumsum(previous, total_power)
+        self._power_sums.append(power_sums)
+        self._power_Wh.append(power_sums / (3600.0 / self.time_step_s))
+        self._times.append(df.index.values)
+        self._rows.append(df[self._columns].values)
+
+        self.data = _grown_frame(self._times, self._rows, self._columns)
+        self._cache_source = self.data
+        self._cumulative_power = pd.Series(self._power_Wh.view, index=self.data.index)
+        self._energy_prefix_sums = None
+        self._summary = None
+        self._pyramid = None
+        self._cumulative_pyramid = None
+
+
+class LiveDataConsumptionGraph(_LivePlot, DataConsumptionGraph):
+    """ Data acquisition graph of a datapack which is still being written. Each refresh
+    parses only the newly appended rows, and updates the accumulated data in O(new rows).
+    The rows of the datapack must be equally spaced.
+    """
+
+    def __init__(self, name: str, CA_timestamp: str, sheet_path: str,
+                 add_HAA: bool = True, data_limit_Mbits: float = None,
+                 time_interval_h: Tuple[float, float] = None,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None) -> None:
+        """ Reads the rows written so far. The arguments are the same as for
+        DataConsumptionGraph, except that the datapack must be given by its path.
+        """
+        self._follower = DatapackFollower(sheet_path, prefixes=("Data Rate ", "Data Accumulated "))
+        datapack = self._follower.read_new()
+        if datapack is None:
+            raise ValueError(f"Header of datapack {sheet_path} is not completely written yet.")
+        super().__init__(name, CA_timestamp, datapack, add_HAA=add_HAA,
+                         data_limit_Mbits=data_limit_Mbits, time_interval_h=time_interval_h,
+                         synthetic_instruments=synthetic_instruments)
+        self._time_interval_h = time_interval_h
+        # Running sums of data rates of the manually added instruments
+        self._rate_sums = {inst.name: _continue_cumsum(0.0, self.data_rate[inst.name].values)[-1]
+                           if len(self.data_rate) else 0.0 for inst in self.synthetic_instruments}
+        self._rate_columns = self.data_rate.columns
+        self._accum_columns = self.data_accum.columns
+        self._times = _GrowingArray()
+        self._rates = _GrowingArray((len(self._rate_columns),))
+        self._accums = _GrowingArray((len(self._accum_columns),))
+        self._totals = _GrowingArray()
+        self._append(self.data_rate, self.data_accum)
+
+    def refresh(self) -> int:
+        """ Reads rows appended to the datapack since the last refresh.
+
+        :return: Number of new rows within the analyzed time interval
+        """
+        datapack = self._follower.read_new()
+        if datapack is None or len(datapack) == 0:
+            return 0
+        data_rate = datapack.select("Data Rate ", self.CA)
+        data_accum = datapack.select("Data Accumulated ", self.CA)
+        if self._time_interval_h is not None:
+            rows = interval_slice(data_rate.index.values, *self._time_interval_h)
+            data_rate, data_accum = data_rate.iloc[rows].copy(), data_accum.iloc[rows].copy()
+        if len(data_rate) == 0:
+            return 0
+        time_h = data_rate.index.values
+        _check_equally_spaced(self._times, time_h, self.time_step_s)
+        for inst in self.synthetic_instruments:
+            rate = inst.data_rate(time_h)
+            rate_cumulative = _continue_cumsum(self._rate_sums[inst.name], rate)
+            self._rate_sums[inst.name] = rate_cumulative[-1]
+            data_rate[inst.name] = rate
+            data_accum[inst.name] = rate_cumulative * self.time_step_s / 1000.0
+        self._append(data_rate, data_accum)
+        return len(data_rate)
+
+    def get_cumulative_data(self) -> pd.Series:
+        """ Get accumulated data total
+        :return: Total accumulated data
+        """
+        return pd.Series(self._totals.view, index=self.data_accum.index)
+
+    def get_data_margin_Mbits(self) -> Optional[float]:
+        """ Remaining data volume until data_limit_Mbits is reached, negative if it is exceeded.
+
+        :return: Margin in Mbits, or None if there is no limit
+        """
+        if self.data_limit_Mbits is None:
+            return None
+        return self.data_limit_Mbits - (self._totals.view[-1] if len(self._totals) else 0.0)
+
+    def _append(self, data_rate: pd.DataFrame, data_accum: pd.DataFrame) -> None:
+        """ Appends new rows and their accumulated data totals. """
+        self._totals.append(data_accum.sum(axis=1).values)
+        self._times.append(data_rate.index.values)
+        self._rates.append(data_rate[self._rate_columns].values)
+        self._accums.append(data_accum[self._accum_columns].values)
+        self.data_rate = _grown_frame(self._times, self._rates, self._rate_columns)
+        self.data_accum = _grown_frame(self._times, self._accums, self._accum_columns)
@@ -0,0 +1,92 @@
+# coding=utf-8
+""" Rolling-window peak power and duty cycle statistics of power timelines.
+
+@author: Marcel Stefko
+"""
+from typing import NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class PowerStatistics(NamedTuple):
+    """ Summary of peak average power and instrument duty cycles. """
+    # Worst average total power for each window length, with columns 'power_W', 'start_h'
+    # and 'end_h' (times of the first and last sample of the window), indexed by window [min]
+    peak_averages: pd.DataFrame
+    # Worst average power of each instrument (columns) for each window length (index) in W
+    instrument_peak_averages: pd.DataFrame
+    # Columns 'on_fraction', 'on_time_h' and 'transitions' (number of switches on or off),
+    # indexed by instrument
+    duty_cycles: pd.DataFrame
+
+
+def max_moving_average(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Maximum of the moving average over a window of rows, calculated from cumulative sums
+    in O(n) regardless of the window length.
+
+    :param values: 1D array, or 2D array with one row for each time
+    :param window: Number of rows in the window
+    :return: Maximum average of each column, and index of the first row of its window.
+    NaN and -1 if the window is longer than the timeline.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        maxima, starts = max_moving_average(values[:, np.newaxis], window)
+        return maxima[0], starts[0]
+    n_columns = values.shape[1]
+    if window < 1 or window > len(values):
+        return np.full(n_columns, np.nan), np.full(n_columns, -1)
+    sums = np.zeros((len(values) + 1, n_columns))
+    np.cumsum(values, axis=0, out=sums[1:])
+    window_sums = sums[window:] - sums[:-window]
+    starts = window_sums.argmax(axis=0)
+    return window_sums[starts, np.arange(n_columns)] / window, starts
+
+
+def duty_cycles(df: pd.DataFrame, time_step_s: float, on_threshold: float = 0.0) -> pd.DataFrame:
+    """ Fraction of time each column is on, i.e. above the threshold, and the number of
+    times it is switched on or off.
+
+    :param df: Timeline indexed by time in hours from CA, e.g. instrument power in W
+    :param time_step_s: Time step of the timeline in seconds
+    :param on_threshold: Value above which a column is considered on
+    :return: Dataframe with columns 'on_fraction', 'on_time_h' and 'transitions',
+    indexed by the columns of df
+    """
+    on = df.values > on_threshold
+    on_rows = on.sum(axis=0)
+    transitions = (on[1:] != on[:-1]).sum(axis=0)
+    return pd.DataFrame({'on_fraction': on_rows / len(on) if len(on) else np.nan,
+                         'on_time_h': on_rows * time_step_s / 3600.0,
+                         'transitions': transitions},
+                        index=pd.Index(df.columns, name="Instrument"))
+
+
+def power_statistics(df: pd.DataFrame, time_step_s: float,
+                     windows_min: Sequence[float] = (1.0, 10.0, 60.0),
+                     on_threshold_W: float = 0.0) -> PowerStatistics:
+    """ Calculates peak average power over windows of given lengths, and duty cycles.
+
+    :param df: Instrument power in W, indexed by time in hours from CA
+    :param time_step_s: Time step of the timeline in seconds
+    :param windows_min: Lengths of the averaging windows in minutes
+    :param on_threshold_W: Power above which an instrument is considered on
+    :return: Statistics summary
+    """
+    time_h = df.index.values
+    values = np.column_stack([df.values.sum(axis=1), df.values])
+    totals, instruments = [], []
+    for window_min in windows_min:
+        window = int(round(window_min * 60.0 / time_step_s))
+        maxima, starts = max_moving_average(values, window)
+        start, end = (time_h[starts[0]], time_h[starts[0] + window - 1]) if starts[0] >= 0 \
+            else (np.nan, np.nan)
+        totals.append({'power_W': maxima[0], 'start_h': start, 'end_h': end})
+        instruments.append(maxima[1:])
+    windows = pd.Index(list(windows_min), name="Window [min]")
+    return PowerStatistics(
+        peak_averages=pd.DataFrame(totals, index=windows, columns=['power_W', 'start_h', 'end_h']),
+        instrument_peak_averages=pd.DataFrame(np.array(instruments).reshape(len(windows), -1),
+                                              index=windows, columns=df.columns),
+        duty_cycles=duty_cycles(df, time_step_s, on_threshold_W))
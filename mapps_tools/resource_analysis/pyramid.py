@@ -0,0 +1,170 @@
+# coding=utf-8
+""" Multi-resolution summaries of resource timelines, for plotting and querying long
+datapacks at any zoom level in time independent of their length.
+
+@author: Marcel Stefko
+"""
+from typing import List, Sequence, Tuple, Union
+
+from matplotlib import pyplot as plt
+import numpy as np
+import pandas as pd
+
+
+def axis_width_px(ax: plt.Axes) -> int:
+    """ Width of the axis in pixels, at least 1, e.g. the number of bins of an envelope. """
+    return max(int(ax.get_window_extent().width), 1)
+
+
+def _extreme_rows(totals: np.ndarray, starts: np.ndarray, size: int,
+                  rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ Rows with the smallest and the largest total in each bin of size consecutive
+    candidates. Bins of the last, partial group are padded so they never win.
+
+    :param totals: Total of each candidate
+    :param starts: Index of the first candidate of each bin
+    :param size: Number of candidates in a bin
+    :param rows: Timeline row of each candidate, default the candidate index
+    :return: Timeline rows of the minima and of the maxima
+    """
+    if rows is None:
+        # Row indices of usual datapacks fit into 32 bits, which halves their memory
+        rows = np.arange(len(totals), dtype=np.int32 if len(totals) < 2 ** 31 else np.int64)
+    extremes = []
+    for pad, arg in ((np.inf, np.argmin), (-np.inf, np.argmax)):
+        padded = np.full(len(starts) * size, pad)
+        padded[:len(totals)] = totals
+        extremes.append(rows[starts + arg(padded.reshape(-1, size), axis=1)])
+    return extremes[0], extremes[1]
+
+
+class TimePyramid:
+    """ Minimum, maximum and sum of each column over bins of 2**level rows, for all levels
+    from min_level up to a single bin, and the rows with the smallest and the largest
+    total of all columns in each bin. Levels finer than min_level are read from the
+    timeline itself, which is referenced without copying it. The levels need about 3/8
+    of the memory of the timeline, plus two row indices for each bin. """
+
+    def __init__(self, time_h: np.ndarray, values: np.ndarray, columns: Sequence[str],
+                 min_level: int = 4) -> None:
+        """ Builds all levels in O(n), each from the previous one.
+
+        :param time_h: Sorted time index in hours from CA
+        :param values: 2D array of values, with one row for each time
+        :param columns: Names of the columns of values
+        :param min_level: Finest level, with bins of 2**min_level rows
+        """
+        self.time_h = np.asarray(time_h)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.columns = list(columns)
+        self.min_level = min_level
+        # Minima, maxima and sums of the bins of each level, starting at min_level
+        self._levels: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        # Rows with the smallest and the largest total in the bins of each level
+        self._extremes: List[Tuple[np.ndarray, np.ndarray]] = []
+        if len(self.values) == 0:
+            return
+        totals = self.values.sum(axis=1)
+        starts = np.arange(0, len(self.values), 2 ** min_level)
+        level = (np.minimum.reduceat(self.values, starts, axis=0),
+                 np.maximum.reduceat(self.values, starts, axis=0),
+                 np.add.reduceat(self.values, starts, axis=0))
+        extremes = _extreme_rows(totals, starts, 2 ** min_level)
+        self._levels.append(level)
+        self._extremes.append(extremes)
+        while len(level[0]) > 1:
+            pairs = np.arange(0, len(level[0]), 2)
+            level = (np.minimum.reduceat(level[0], pairs, axis=0),
+                     np.maximum.reduceat(level[1], pairs, axis=0),
+                     np.add.reduceat(level[2], pairs, axis=0))
+            extremes = (_extreme_rows(totals[extremes[0]], pairs, 2, extremes[0])[0],
+                        _extreme_rows(totals[extremes[1]], pairs, 2, extremes[1])[1])
+            self._levels.append(level)
+            self._extremes.append(extremes)
+
+    @classmethod
+    def from_dataframe(cls, data: Union[pd.DataFrame, pd.Series],
+                       min_level: int = 4) -> 'TimePyramid':
+        """ Builds the pyramid of a dataframe or a series indexed by time in hours. """
+        if isinstance(data, pd.Series):
+            data = data.to_frame()
+        return cls(data.index.values, data.values, data.columns, min_level)
+
+    def __len__(self) -> int:
+        return len(self.time_h)
+
+    @property
+    def nbytes(self) -> int:
+        """ Memory used by the levels in bytes, without the referenced timeline. """
+        return sum(array.nbytes for levels in (self._levels, self._extremes)
+                   for level in levels for array in level)
+
+    def _rows(self, start_h: float = None, end_h: float = None) -> Tuple[int, int]:
+        """ Rows [lo, hi) within the closed interval [start_h, end_h], by binary search. """
+        lo = 0 if start_h is None else int(np.searchsorted(self.time_h, start_h, side='left'))
+        hi = len(self) if end_h is None else int(np.searchsorted(self.time_h, end_h,
+                                                                 side='right'))
+        return lo, max(lo, hi)
+
+    def aggregate(self, start_h: float = None, end_h: float = None) -> pd.DataFrame:
+        """ Minimum, maximum and mean of each column over rows within the closed interval
+        [start_h, end_h], in O(log n) from at most two bins of each level.
+
+        :param start_h: Start of the interval, default from the first row
+        :param end_h: End of the interval, default until the last row
+        :return: Dataframe with rows 'min', 'max' and 'mean', NaN if the interval is empty
+        """
+        lo, hi = self._rows(start_h, end_h)
+        if lo == hi:
+            return pd.DataFrame(np.nan, index=['min', 'max', 'mean'], columns=self.columns)
+        parts = []
+        # Rows before the first and after the last bin of min_level are read directly
+        size = 2 ** self.min_level
+        first, last = -(-lo // size) * size, hi // size * size
+        if first >= last:
+            first = last = hi
+        for a, b in ((lo, first), (last, hi)):
+            if a < b:
+                parts.append((self.values[a:b].min(axis=0), self.values[a:b].max(axis=0),
+                              self.values[a:b].sum(axis=0)))
+        # Aligned bins in between, combined bottom-up from the finest level
+        i, j = first // size, last // size
+        for mins, maxs, sums in self._levels:
+            if i >= j:
+                break
+            if i % 2:
+                parts.append((mins[i], maxs[i], sums[i]))
+                i += 1
+            if j % 2:
+                j -= 1
+                parts.append((mins[j], maxs[j], sums[j]))
+            i, j = i // 2, j // 2
+        mins, maxs, sums = (np.array(part) for part in zip(*parts))
+        return pd.DataFrame([mins.min(axis=0), maxs.max(axis=0), sums.sum(axis=0) / (hi - lo)],
+                            index=['min', 'max', 'mean'], columns=self.columns)
+
+    def envelope(self, start_h: float, end_h: float, n_bins: int) -> pd.DataFrame:
+        """ Timeline within [start_h, end_h] at the coarsest level which still has at least
+        n_bins bins in the interval. Each bin gives its rows with the smallest and the
+        largest total of all columns, so that peaks of the total are not hidden, and
+        stacked columns never exceed the total of any row. The number of rows does not
+        depend on the length of the timeline: at most 2 rows per bin, or the rows
+        themselves if there are less than 2**min_level rows per bin.
+
+        :param start_h: Start of the interval
+        :param end_h: End of the interval
+        :param n_bins: Number of bins, e.g. the width of the plot in pixels
+        :return: Dataframe indexed by time in hours
+        """
+        lo, hi = self._rows(start_h, end_h)
+        level = int(np.floor(np.log2((hi - lo) / max(n_bins, 1)))) if hi - lo > n_bins else 0
+        if level < self.min_level:
+            return pd.DataFrame(self.values[lo:hi], columns=self.columns,
+                                index=pd.Index(self.time_h[lo:hi], name="Time [h]"))
+        level = min(level, self.min_level + len(self._levels) - 1)
+        size = 2 ** level
+        min_rows, max_rows = self._extremes[level - self.min_level]
+        bins = np.arange(lo // size, -(-hi // size))
+        rows = np.unique(np.concatenate([min_rows[bins], max_rows[bins]]))
+        return pd.DataFrame(self.values[rows], columns=self.columns,
+                            index=pd.Index(self.time_h[rows], name="Time [h]"))
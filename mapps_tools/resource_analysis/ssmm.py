@@ -0,0 +1,202 @@
+# coding=utf-8
+""" Simulation of the fill level of the onboard mass memory (SSMM), with instrument data
+stored in packet stores and drained by downlink.
+
+@author: Marcel Stefko
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .limits import _true_runs
+
+
+class PacketStore(NamedTuple):
+    """ Packet store of the mass memory holding the data of one instrument. """
+    instrument: str
+    # Capacity of the store, None for unlimited
+    capacity_Mbits: Optional[float] = None
+
+
+class DownlinkWindow(NamedTuple):
+    """ Time window [start_h, end_h) in hours from CA, in which data is downlinked. """
+    start_h: float
+    end_h: float
+    rate_kbps: float
+
+
+class Overflow(NamedTuple):
+    """ Interval during which a packet store is full and incoming data is lost. """
+    instrument: str
+    start_h: float
+    end_h: float
+    lost_Mbits: float
+
+
+class SSMMFill:
+    """ Result of a mass memory simulation, with one column for each packet store. """
+
+    def __init__(self, fill_Mbits: pd.DataFrame, downlinked_Mbits: pd.DataFrame,
+                 lost_Mbits: pd.DataFrame) -> None:
+        # Fill level of each store at the end of each time step
+        self.fill_Mbits = fill_Mbits
+        # Data downlinked from each store, and data lost by overflow, during each time step
+        self.downlinked_Mbits = downlinked_Mbits
+        self.lost_Mbits = lost_Mbits
+
+    def get_total_fill(self) -> pd.Series:
+        """ Fill level of the whole mass memory in Mbits. """
+        return self.fill_Mbits.sum(axis=1)
+
+    def get_overflows(self) -> List[Overflow]:
+        """ Intervals during which a store overflows, in order of stores and time. """
+        time_h = self.lost_Mbits.index.values
+        overflows = []
+        for instrument in self.lost_Mbits:
+            lost = self.lost_Mbits[instrument].values
+            lost_sums = np.concatenate([[0.0], np.cumsum(lost)])
+            starts, ends = _true_runs(lost > 0)
+            overflows.extend(Overflow(instrument, time_h[start], time_h[end],
+                                      lost_sums[end + 1] - lost_sums[start])
+                             for start, end in zip(starts, ends))
+        return overflows
+
+
+def downlink_rate(time_h: np.ndarray, windows: Sequence[DownlinkWindow]) -> np.ndarray:
+    """ Downlink rate at given times, in kbps. Overlapping windows add up.
+
+    :param time_h: Times in hours from CA
+    :param windows: Downlink windows
+    :return: Array of downlink rates
+    """
+    time_h = np.asarray(time_h)
+    rate = np.zeros(time_h.shape)
+    for window in windows:
+        rate[(time_h >= window.start_h) & (time_h < window.end_h)] += window.rate_kbps
+    return rate
+
+
+# Smallest number of rows evaluated at once between two barrier hits of the fill level,
+# and number of rows stepped one by one when the hits are closer than that
+_MIN_WINDOW = 64
+_SCALAR_ROWS = 256
+
+
+def _lindley(increments: np.ndarray, start: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """ Walk starting at start >= 0 and reflected at 0: f[t] = max(0, f[t-1] + increments[t]).
+
+    :return: Values of the walk, and the amount cut off by the reflection in each step
+    """
+    walk = start + np.cumsum(increments)
+    # Total amount cut off by the reflection until each step
+    regulator = -np.minimum(np.minimum.accumulate(walk), 0.0) if len(walk) else walk
+    return walk + regulator, np.diff(np.concatenate([[0.0], regulator]))
+
+
+def _reflected_fill(increments: np.ndarray,
+                    capacity: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Fill level of a store starting empty: f[t] = min(C, max(0, f[t-1] + increments[t])).
+    The walk is evaluated in segments between hitting the full and the empty barrier,
+    each of them vectorized over a window which grows until the next hit, so that the
+    total work is linear in the number of rows. Rows between hits which are close
+    together are stepped one by one.
+
+    :param increments: Incoming minus downlinked data in each time step
+    :param capacity: Capacity of the store, None for unlimited
+    :return: Fill level at the end of each time step, and data lost in each time step
+    """
+    fill, _ = _lindley(increments)
+    lost = np.zeros(len(increments))
+    if capacity is None or not (fill > capacity).any():
+        return fill, lost
+    n = len(increments)
+    pos, level, window, at_full = 0, 0.0, _MIN_WINDOW, False
+    while pos < n:
+        end = min(n, pos + window)
+        if at_full:
+            # Segment reflected at full: free space is reflected at 0, and what is cut off
+            # by the reflection is lost, until the store is empty
+            space, cut = _lindley(-increments[pos:end], capacity - level)
+            values = capacity - space
+            hits = np.flatnonzero(space > capacity)
+        else:
+            # Segment reflected at empty, until the store is full
+            values, _ = _lindley(increments[pos:end], level)
+            cut = np.zeros(end - pos)
+            hits = np.flatnonzero(values > capacity)
+        if len(hits) == 0:
+            fill[pos:end], lost[pos:end] = values, cut
+            level, pos, window = fill[end - 1], end, 2 * window
+            continue
+        hit = pos + hits[0]
+        fill[pos:hit], lost[pos:hit] = values[:hits[0]], cut[:hits[0]]
+        if at_full:
+            fill[hit], lost[hit] = 0.0, cut[hits[0]]
+        else:
+            fill[hit], lost[hit] = capacity, values[hits[0]] - capacity
+        level, pos, at_full = fill[hit], hit + 1, not at_full
+        window = max(_MIN_WINDOW, 2 * (hits[0] + 1))
+        if hits[0] < _MIN_WINDOW // 8:
+            level, pos = _step_fill(increments, capacity, level, pos,
+                                    min(n, pos + _SCALAR_ROWS), fill, lost)
+            at_full = False
+    return fill, lost
+
+
+def _step_fill(increments: np.ndarray, capacity: float, level: float, start: int, end: int,
+               fill: np.ndarray, lost: np.ndarray) -> Tuple[float, int]:
+    """ Fill level of rows [start, end) stepped one by one, written into fill and lost.
+
+    :return: Fill level at the end, and the next row
+    """
+    levels, overflows = [], []
+    for increment in increments[start:end].tolist():
+        level += increment
+        overflow = 0.0
+        if level > capacity:
+            level, overflow = capacity, level - capacity
+        elif level < 0.0:
+            level = 0.0
+        levels.append(level)
+        overflows.append(overflow)
+    fill[start:end], lost[start:end] = levels, overflows
+    return level, end
+
+
+def simulate_ssmm(data_rate_kbps: pd.DataFrame, time_step_s: Union[float, np.ndarray],
+                  stores: Sequence[PacketStore],
+                  downlink: Sequence[DownlinkWindow]) -> SSMMFill:
+    """ Simulates the fill level of packet stores, drained by downlink in priority order:
+    in each time step, the downlink capacity is used by the first store as much as
+    possible, the rest by the second store, and so on. Data arriving into a full store
+    is lost.
+
+    :param data_rate_kbps: Data rate of each instrument in kbps, indexed by time in hours
+    from CA
+    :param time_step_s: Time step of the timeline in seconds, or the duration of each row
+    if the rows are not equally spaced
+    :param stores: Packet stores in order of downlink priority. Instruments without
+    a packet store are not simulated.
+    :param downlink: Downlink windows
+    :return: Fill levels, downlinked and lost data of each store
+    """
+    time_h = data_rate_kbps.index.values
+    # Downlink capacity in each time step which is not yet used by higher priority stores
+    capacity = downlink_rate(time_h, downlink) * time_step_s / 1000.0
+    fill, downlinked, lost = {}, {}, {}
+    for store in stores:
+        if store.instrument not in data_rate_kbps:
+            raise ValueError(f"No data rate of instrument {store.instrument}.")
+        incoming = data_rate_kbps[store.instrument].values * time_step_s / 1000.0
+        level, lost[store.instrument] = _reflected_fill(incoming - capacity,
+                                                        store.capacity_Mbits)
+        served = np.minimum(np.concatenate([[0.0], level[:-1]]) + incoming, capacity)
+        fill[store.instrument] = level
+        downlinked[store.instrument] = served
+        capacity = capacity - served
+
+    def frame(columns):
+        return pd.DataFrame(columns, index=data_rate_kbps.index,
+                            columns=[store.instrument for store in stores])
+    return SSMMFill(frame(fill), frame(downlinked), frame(lost))
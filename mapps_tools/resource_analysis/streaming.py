@@ -0,0 +1,351 @@
+# coding=utf-8
+""" Analysis of resources in long MAPPS datapacks, which are read in chunks.
+
+@author: Marcel Stefko
+"""
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .datapack import Datapack
+from .graphs import PowerConsumptionGraph, _instrument_columns, _synthetic_instruments, \
+    _check_time_interval, _format_total_power, _format_instrument_power, \
+    _format_total_data, _format_instrument_data, _total
+from .integration import row_durations_s, weighted
+from .intervals import interval_slice
+from .limits import Violation, evaluate_profile, find_violations, find_cumulative_violations, \
+    _extend_violations
+from .summary import ResourceSummary
+from .synthetic import SyntheticInstrument
+from ..timecodec import parse_utc
+
+
+class _CumulativeCurve:
+    """ Downsampled cumulative curve, which keeps the first sample in each time bin
+    and the last sample of the whole curve. """
+
+    def __init__(self, step_h: float) -> None:
+        self.step_h = step_h
+        self._t0: Optional[float] = None
+        self._last_bin: Optional[float] = None
+        self._times: List[np.ndarray] = []
+        self._values: List[np.ndarray] = []
+        self._last: Optional[Tuple[float, float]] = None
+
+    def add(self, time_h: np.ndarray, values: np.ndarray) -> None:
+        if self._t0 is None:
+            self._t0 = time_h[0]
+        bins = np.floor((time_h - self._t0) / self.step_h)
+        previous = np.concatenate([[self._last_bin if self._last_bin is not None else -1.0],
+                                   bins[:-1]])
+        keep = bins != previous
+        self._times.append(time_h[keep])
+        self._values.append(values[keep])
+        self._last_bin = bins[-1]
+        self._last = (time_h[-1], values[-1])
+
+    def to_series(self) -> pd.Series:
+        times = np.concatenate(self._times) if self._times else np.empty(0)
+        values = np.concatenate(self._values) if self._values else np.empty(0)
+        if self._last is not None and times[-1] != self._last[0]:
+            times = np.append(times, self._last[0])
+            values = np.append(values, self._last[1])
+        return pd.Series(values, index=pd.Index(times, name="Time [h]"))
+
+
+def _with_next_row(chunks: Iterable[Datapack], CA: datetime) -> \
+        Iterator[Tuple[Datapack, np.ndarray, Optional[float], Optional[np.datetime64]]]:
+    """ Pairs each chunk with the times of its rows in hours from CA, and with the time of
+    the first row of the next chunk, in hours from CA and as timestamp. Both are None for
+    the last chunk. """
+    previous: Optional[Tuple[Datapack, np.ndarray]] = None
+    for chunk in chunks:
+        time_h = chunk.hours_from_CA(CA)
+        if previous is not None:
+            yield previous[0], previous[1], time_h[0], chunk.timestamps[0]
+        previous = (chunk, time_h)
+    if previous is not None:
+        yield previous[0], previous[1], None, None
+
+
+def _time_step_s(chunk: Datapack, next_timestamp: Optional[np.datetime64]) -> float:
+    """ Time step of the datapack from its 'Output step' header entry, or else the median
+    time between the rows of the chunk and the first row of the next chunk. """
+    if 'Output step' in chunk.header or next_timestamp is None:
+        return chunk.time_step_s
+    return Datapack._median_time_step(np.append(chunk.timestamps, next_timestamp))
+
+
+def _step_weights(time_h: np.ndarray, next_h: Optional[float],
+                  time_step_s: float) -> Optional[np.ndarray]:
+    """ Step-hold durations of rows relative to the time step, continued across the chunk
+    boundary by the time of the next row.
+
+    :param time_h: Times of the rows in hours
+    :param next_h: Time of the row after them, None if the last row counts for the time step
+    :param time_step_s: Nominal time step in seconds
+    :return: Weight of each row, None if the rows are equally spaced by the time step
+    """
+    durations = row_durations_s(time_h if next_h is None else np.append(time_h, next_h),
+                                time_step_s)
+    return None if durations is None else durations[:len(time_h)] / time_step_s
+
+
+def _first_exceeding(time_h: np.ndarray, values: np.ndarray, limit: float) -> Optional[float]:
+    """ Time of the first value exceeding the limit, or None. """
+    exceeding = np.flatnonzero(values > limit)
+    return time_h[exceeding[0]] if len(exceeding) else None
+
+
+class StreamingPowerConsumption:
+    """ Power consumption during a flyby, calculated from a MAPPS resources datapack which is
+    read in chunks. Only the totals, a downsampled cumulative curve and the limit violations
+    are kept in memory, so that datapacks of any length can be analyzed.
+    """
+
+    def __init__(self, name: str, CA_timestamp: str, sheet_path: str,
+                 add_HAA: bool = False, power_limit_Wh: float = None,
+                 time_interval_h: Tuple[float, float] = None,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None,
+                 chunk_size: int = 100000, cumulative_step_h: float = 0.1) -> None:
+        """ Processes the datapack chunk by chunk.
+
+        :param name: Name of analysis (or flyby)
+        :param CA_timestamp: UTC timestamp of closest approach, e.g. '2031-04-25T22:40:47'
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param add_HAA: Whether to manually add HAA data (since MAPPS doesn't output it yet)
+        Default False
+        :param power_limit_Wh: limit on total power consumed during flyby in Watt-hours
+        :param time_interval_h: 2-tuple defining a time interval on which to perform analysis,
+        in hours
+        :param synthetic_instruments: Other instruments not modelled by MAPPS to add manually
+        :param chunk_size: Number of datapack rows processed at once
+        :param cumulative_step_h: Time resolution of the stored cumulative power curve, in hours
+        """
+        self.name = name
+        self.CA = parse_utc(CA_timestamp)
+        self.power_limit_Wh = power_limit_Wh
+        if time_interval_h is not None:
+            _check_time_interval(time_interval_h)
+
+        self.time_step_s: Optional[float] = None
+        # Sums of power samples of each instrument, and cumulative sum of all instruments
+        instrument_sums: Optional[pd.Series] = None
+        cumulative_sum = 0.0
+        curve = _CumulativeCurve(cumulative_step_h)
+        # Intervals when the power profile is exceeded
+        self.profile_violations: List[Violation] = []
+        # Intervals when the cumulative power limit is exceeded
+        self.cumulative_violations: List[Violation] = []
+        # Time when the cumulative power limit is first exceeded [h], or None
+        self.limit_exceeded_at_h: Optional[float] = None
+        previous_violating = False
+
+        self.synthetic_instruments = _synthetic_instruments(add_HAA, synthetic_instruments)
+        synthetic_names = [inst.name for inst in self.synthetic_instruments]
+        profile = PowerConsumptionGraph._get_power_profile()
+        chunks = Datapack.iter_chunks(sheet_path, prefixes=("Power ",), chunk_size=chunk_size)
+        for chunk, chunk_time_h, next_h, next_timestamp in _with_next_row(chunks, self.CA):
+            # Taken once, so that a last chunk of a single row does not change it
+            if self.time_step_s is None:
+                self.time_step_s = _time_step_s(chunk, next_timestamp)
+            df = chunk.select("Power ", self.CA)
+            PowerConsumptionGraph._add_synthetic_instruments(df, self.synthetic_instruments)
+            rows = slice(0, len(df))
+            if time_interval_h is not None:
+                rows = interval_slice(chunk_time_h, *time_interval_h)
+                df = df.iloc[rows]
+            df = df[_instrument_columns(df, synthetic_names)]
+            # As in the graph, the last row of the interval counts for the time step
+            if rows.stop < len(chunk_time_h):
+                next_h = chunk_time_h[rows.stop]
+            if next_h is not None and time_interval_h is not None and \
+                    next_h > time_interval_h[1]:
+                next_h = None
+            weights = _step_weights(df.index.values, next_h, self.time_step_s) \
+                if len(df) else None
+            # Zero for instruments without rows in the analyzed interval, as in the graph
+            chunk_sums = df.sum() if weights is None \
+                else pd.Series(weighted(df.values, weights).sum(axis=0), index=df.columns)
+            instrument_sums = chunk_sums if instrument_sums is None \
+                else instrument_sums + chunk_sums
+            if len(df) == 0:
+                continue
+            time_h = df.index.values
+            scale = 3600.0 / self.time_step_s
+
+            total_power = df.sum(axis=1).values
+            weighted_power = total_power if weights is None else total_power * weights
+            # Continue the running sum in order, to get the same values as a single cumsum
+            cumulative = np.cumsum(np.concatenate([[cumulative_sum], weighted_power]))[1:]
+            cumulative_sum = cumulative[-1]
+            curve.add(time_h, cumulative / scale)
+            if self.power_limit_Wh is not None:
+                # Cumulative power only grows, so the limit stays exceeded until the end
+                _extend_violations(self.cumulative_violations,
+                                   find_cumulative_violations(time_h, cumulative / scale,
+                                                              self.power_limit_Wh),
+                                   continues=bool(self.cumulative_violations), cumulative=True)
+                if self.cumulative_violations:
+                    self.limit_exceeded_at_h = self.cumulative_violations[0].start_h
+
+            limit = evaluate_profile(profile, time_h)
+            _extend_violations(self.profile_violations,
+                               find_violations(time_h, total_power, limit, self.time_step_s
+                                               if weights is None
+                                               else weights * self.time_step_s),
+                               continues=previous_violating)
+            previous_violating = total_power[-1] > limit[-1]
+
+        self.instrument_consumption_Wh: pd.Series = instrument_sums / (3600.0 / self.time_step_s)
+        self._cumulative_power = curve.to_series()
+
+    def get_cumulative_power(self) -> pd.Series:
+        """ Downsampled cumulative power consumption in Wh. The last value is the total.
+
+        :return: Cumulative power consumption
+        """
+        return self._cumulative_power
+
+    def summary(self) -> ResourceSummary:
+        """ Total consumed energy, the energy of each instrument with its percentage of
+        the total, and the margin to power_limit_Wh.
+
+        :return: Summary of energy consumption in Wh
+        """
+        return ResourceSummary.from_totals(self.name, 'Wh', _total(self.get_cumulative_power()),
+                                           self.instrument_consumption_Wh.to_dict(),
+                                           self.power_limit_Wh)
+
+    def print_total_power_consumed(self) -> str:
+        """ Prints the total consumed power during the flyby.
+        """
+        message = _format_total_power(self.summary().total, self.power_limit_Wh)
+        print(message)
+        return message
+
+    def print_individual_instrument_consumption(self) -> str:
+        """ Prints a list of individual instrument power consumptions, and the percentage
+        of the total power consumption for each instrument.
+        """
+        summary = self.summary()
+        message = _format_instrument_power(summary.instrument_totals, summary.total)
+        print(message)
+        return message
+
+
+class StreamingDataConsumption:
+    """ Data acquisition during a flyby, calculated from a MAPPS resources datapack which is
+    read in chunks. Only the totals, a downsampled cumulative curve and the time of exceeding
+    the data limit are kept in memory, so that datapacks of any length can be analyzed.
+    """
+
+    def __init__(self, name: str, CA_timestamp: str, sheet_path: str,
+                 add_HAA: bool = True, data_limit_Mbits: float = None,
+                 time_interval_h: Tuple[float, float] = None,
+                 synthetic_instruments: Sequence[SyntheticInstrument] = None,
+                 chunk_size: int = 100000, cumulative_step_h: float = 0.1) -> None:
+        """ Processes the datapack chunk by chunk.
+
+        :param name: Name of analysis (or flyby)
+        :param CA_timestamp: UTC timestamp of closest approach, e.g. '2031-04-25T22:40:47'
+        :param sheet_path: Path to .csv MAPPS datapack
+        :param add_HAA: whether to manually add HAA data (since MAPPS doesn't output it yet)
+        :param data_limit_Mbits: limit on total data acquired during flyby
+        :param time_interval_h: 2-tuple defining a time interval on which to perform analysis
+        :param synthetic_instruments: Other instruments not modelled by MAPPS to add manually
+        :param chunk_size: Number of datapack rows processed at once
+        :param cumulative_step_h: Time resolution of the stored cumulative data curve, in hours
+        """
+        self.name = name
+        self.CA = parse_utc(CA_timestamp)
+        self.data_limit_Mbits = data_limit_Mbits
+        if time_interval_h is not None:
+            _check_time_interval(time_interval_h)
+
+        self.time_step_s: Optional[float] = None
+        # Data accumulated by each instrument at the end of the analyzed interval [Mbits]
+        self.instrument_data_Mbits: Optional[pd.Series] = None
+        # Time when the data limit is first exceeded [h], or None
+        self.limit_exceeded_at_h: Optional[float] = None
+        self.synthetic_instruments = _synthetic_instruments(add_HAA, synthetic_instruments)
+        synthetic_names = [inst.name for inst in self.synthetic_instruments]
+        # Running sums of data rates of the manually added instruments
+        rate_sums = {name: 0.0 for name in synthetic_names}
+        curve = _CumulativeCurve(cumulative_step_h)
+
+        chunks = Datapack.iter_chunks(sheet_path, prefixes=("Data Rate ", "Data Accumulated "),
+                                      chunk_size=chunk_size)
+        for chunk, chunk_time_h, next_h, next_timestamp in _with_next_row(chunks, self.CA):
+            # Taken once, so that a last chunk of a single row does not change it
+            if self.time_step_s is None:
+                self.time_step_s = _time_step_s(chunk, next_timestamp)
+            data_accum = chunk.select("Data Accumulated ", self.CA)
+            rows = slice(0, len(data_accum))
+            if time_interval_h is not None:
+                rows = interval_slice(chunk_time_h, *time_interval_h)
+                data_accum = data_accum.iloc[rows]
+            if len(data_accum) == 0:
+                if self.instrument_data_Mbits is None:
+                    self.instrument_data_Mbits = pd.Series(
+                        0.0, index=synthetic_names + _instrument_columns(data_accum))
+                continue
+            time_h = data_accum.index.values
+            # As in the graph, the rows count until the next row of the whole datapack
+            weights = _step_weights(time_h, chunk_time_h[rows.stop]
+                                    if rows.stop < len(chunk_time_h) else next_h,
+                                    self.time_step_s)
+            for inst in self.synthetic_instruments:
+                rate = inst.data_rate(time_h)
+                if weights is not None:
+                    rate = rate * weights
+                # Continue the running sum in order, to get the same values as a single cumsum
+                rate_cumulative = np.cumsum(np.concatenate([[rate_sums[inst.name]], rate]))[1:]
+                rate_sums[inst.name] = rate_cumulative[-1]
+                data_accum[inst.name] = rate_cumulative * self.time_step_s / 1000.0
+
+            cumulative = data_accum.sum(axis=1).values
+            curve.add(time_h, cumulative)
+            instrument_columns = _instrument_columns(data_accum, synthetic_names)
+            self.instrument_data_Mbits = data_accum[instrument_columns].iloc[-1]
+            if self.data_limit_Mbits is not None and self.limit_exceeded_at_h is None:
+                self.limit_exceeded_at_h = _first_exceeding(time_h, cumulative,
+                                                            self.data_limit_Mbits)
+
+        self._cumulative_data = curve.to_series()
+
+    def get_cumulative_data(self) -> pd.Series:
+        """ Downsampled accumulated data total in Mbits. The last value is the total.
+
+        :return: Total accumulated data
+        """
+        return self._cumulative_data
+
+    def summary(self) -> ResourceSummary:
+        """ Total acquired data, the data of each instrument with its percentage of
+        the total, and the margin to data_limit_Mbits.
+
+        :return: Summary of data acquisition in Mbits
+        """
+        return ResourceSummary.from_totals(self.name, 'Mbits',
+                                           _total(self.get_cumulative_data()),
+                                           self.instrument_data_Mbits.to_dict(),
+                                           self.data_limit_Mbits)
+
+    def print_total_data_acquired(self) -> str:
+        """ Prints the total acquired data during the flyby.
+        """
+        message = _format_total_data(self.summary().total, self.data_limit_Mbits)
+        print(message)
+        return message
+
+    def print_individual_instrument_data(self) -> str:
+        """ Prints a list of individual instrument data consumptions, and the percentage
+        of the total data consumption for each instrument.
+        """
+        summary = self.summary()
+        message = _format_instrument_data(summary.instrument_totals, summary.total)
+        print(message)
+        return message
@@ -0,0 +1,111 @@
+# coding=utf-8
+""" Structured results of the power and data analyses, which can be serialized
+to JSON or CSV.
+
+@author: Marcel Stefko
+"""
+from typing import Any, Dict, NamedTuple, Optional
+
+import json
+import numpy as np
+import pandas as pd
+
+
+def _percentage(value: float, reference: float) -> float:
+    """ Percentage of a value, NaN if the reference is zero. """
+    return 100 * value / reference if reference != 0 else np.nan
+
+
+class ResourceSummary(NamedTuple):
+    """ Consumption of a resource during a flyby, e.g. energy in Wh or data in Mbits. """
+    name: str
+    unit: str
+    total: float
+    # Limit on the total, and remaining margin (negative if exceeded), None if there is no limit
+    limit: Optional[float]
+    margin: Optional[float]
+    # Total as a percentage of the limit, None if there is no limit
+    limit_percentage: Optional[float]
+    # Consumption of each instrument, and its percentage of the total
+    instrument_totals: Dict[str, float]
+    instrument_percentages: Dict[str, float]
+
+    @classmethod
+    def from_totals(cls, name: str, unit: str, total: float,
+                    instrument_totals: Dict[str, float],
+                    limit: Optional[float] = None) -> 'ResourceSummary':
+        """ Creates a summary, calculating the percentages and the limit margin.
+
+        :param name: Name of analysis (or flyby)
+        :param unit: Unit of the values, e.g. 'Wh' or 'Mbits'
+        :param total: Total consumption
+        :param instrument_totals: Consumption of each instrument
+        :param limit: Limit on the total consumption, None if there is no limit
+        :return: Summary
+        """
+        return cls(name=name, unit=unit, total=total, limit=limit,
+                   margin=None if limit is None else limit - total,
+                   limit_percentage=None if limit is None else _percentage(total, limit),
+                   instrument_totals=dict(instrument_totals),
+                   instrument_percentages={inst: _percentage(value, total)
+                                           for inst, value in instrument_totals.items()})
+
+    def with_limit(self, limit: Optional[float]) -> 'ResourceSummary':
+        """ Same summary with another limit, and the margin to it.
+
+        :param limit: Limit on the total consumption, None if there is no limit
+        :return: Summary
+        """
+        return self.from_totals(self.name, self.unit, self.total, self.instrument_totals, limit)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ Converts the summary to built-in types, with NaN values replaced by None.
+
+        :return: Dictionary of the summary fields
+        """
+        def convert(value):
+            if isinstance(value, dict):
+                return {key: convert(val) for key, val in value.items()}
+            if value is None or isinstance(value, str):
+                return value
+            return None if np.isnan(value) else float(value)
+        return {field: convert(value) for field, value in self._asdict().items()}
+
+    def to_json(self, **kwargs) -> str:
+        """ Serializes the summary to JSON.
+
+        :param kwargs: Keyword arguments of json.dumps, e.g. indent
+        :return: JSON string
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_frame(self) -> pd.DataFrame:
+        """ Table with one row for each instrument and a last row 'Total'. Columns 'total' and
+        'share_%' hold the consumption and percentage of the total, columns 'limit',
+        'margin' and 'limit_%' are only filled in the 'Total' row.
+
+        :return: Dataframe indexed by instrument
+        """
+        instruments = list(self.instrument_totals)
+        n_rows = len(instruments) + 1
+
+        def total_row_only(value: Optional[float]) -> np.ndarray:
+            column = np.full(n_rows, np.nan)
+            column[-1] = np.nan if value is None else value
+            return column
+        return pd.DataFrame(
+            {'total': list(self.instrument_totals.values()) + [self.total],
+             'share_%': list(self.instrument_percentages.values()) + [100.0],
+             'limit': total_row_only(self.limit),
+             'margin': total_row_only(self.margin),
+             'limit_%': total_row_only(self.limit_percentage)},
+            index=pd.Index(instruments + ['Total'], name="Instrument"))
+
+    def to_csv(self, path: str = None, **kwargs) -> Optional[str]:
+        """ Writes the table from to_frame() as CSV.
+
+        :param path: Output file path, default returns the CSV as a string
+        :param kwargs: Keyword arguments of DataFrame.to_csv, e.g. float_format
+        :return: CSV string if no path is given, otherwise None
+        """
+        return self.to_frame().to_csv(path, **kwargs)
@@ -0,0 +1,60 @@
+# coding=utf-8
+""" Instruments whose resources are not (yet) modelled by MAPPS, and are added to the
+analysis manually.
+
+@author: Marcel Stefko
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+class SyntheticInstrument:
+    """ Instrument which is turned on during given time windows relative to CA, and has
+    constant power consumption and data rate while it is on. """
+
+    def __init__(self, name: str, windows_h: Sequence[Tuple[float, float]],
+                 power_W: float = 0.0, data_rate_kbps: float = 0.0) -> None:
+        """ Defines the instrument.
+
+        :param name: Name of the instrument, used as column label
+        :param windows_h: List of (start, end) windows in hours from CA, during which the
+        instrument is on. Start and end times themselves are excluded from the window.
+        :param power_W: Power consumption while on, in Watts
+        :param data_rate_kbps: Data rate while on, in kbps
+        """
+        for window in windows_h:
+            if len(window) != 2 or window[0] > window[1]:
+                raise ValueError(f"Invalid window: {window}")
+        self.name = name
+        self.windows_h = [tuple(window) for window in windows_h]
+        self.power_W = power_W
+        self.data_rate_kbps = data_rate_kbps
+
+    def __repr__(self) -> str:
+        return (f"SyntheticInstrument({self.name!r}, {self.windows_h}, "
+                f"power_W={self.power_W}, data_rate_kbps={self.data_rate_kbps})")
+
+    def is_on(self, time_h: np.ndarray) -> np.ndarray:
+        """ Whether the instrument is on at given times.
+
+        :param time_h: Times in hours from CA
+        :return: Boolean array
+        """
+        time_h = np.asarray(time_h)
+        on = np.zeros(time_h.shape, dtype=bool)
+        for start, end in self.windows_h:
+            on |= (time_h > start) & (time_h < end)
+        return on
+
+    def power(self, time_h: np.ndarray) -> np.ndarray:
+        """ Power consumption at given times in hours from CA, in Watts. """
+        return np.where(self.is_on(time_h), self.power_W, 0.0)
+
+    def data_rate(self, time_h: np.ndarray) -> np.ndarray:
+        """ Data rate at given times in hours from CA, in kbps. """
+        return np.where(self.is_on(time_h), self.data_rate_kbps, 0.0)
+
+
+# High-Accuracy Accelerometer, turned on between (-12h, 12h), consuming 15W and producing 2kbps
+HAA = SyntheticInstrument('HAA', [(-12.0, 12.0)], power_W=15.0, data_rate_kbps=2.0)
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+""" Parsing and formatting of the fixed timestamp formats used by MAPPS, for single
+timestamps and for whole NumPy arrays at once:
+
+- UTC timestamps, e.g. '2031-04-25T22:40:47Z' or '2031-04-25T22:40:47.000'
+- Relative timestamps, e.g. '-01:10:00' or '+01:10:00.00000'
+- Datapack header timestamps, e.g. '03-Oct-2030_00:00:00'
+
+The array functions read the characters of the whole array as a matrix of integers,
+instead of parsing the timestamps one by one.
+
+@author: Marcel Stefko
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Sequence, Tuple, Union
+
+import iso8601
+import numpy as np
+
+_UTC_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?Z?')
+_DELTA_RE = re.compile(r'([+-]?)(\d{2,}):([0-5]\d):([0-5]\d)(?:\.(\d+))?')
+_HEADER_RE = re.compile(r'(\d{2})-([A-Za-z]{3})-(\d{4})_(\d{2}):(\d{2}):(\d{2})')
+_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+_MONTH_NUMBERS = {name.upper(): idx for idx, name in enumerate(_MONTHS, start=1)}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+ArrayLike = Union[np.ndarray, Sequence[str]]
+
+
+def parse_utc(timestamp: str) -> datetime:
+    """ Parse a UTC timestamp 'YYYY-MM-DDTHH:MM:SS[.fff][Z]'. Other ISO 8601 timestamps,
+    e.g. with a timezone offset, are parsed by iso8601.
+
+    :param timestamp: UTC timestamp
+    :return: Timezone-aware datetime, fraction digits beyond microseconds are dropped
+    """
+    match = _UTC_RE.fullmatch(timestamp)
+    if match is None:
+        return iso8601.parse_date(timestamp)
+    year, month, day, hour, minute, second, fraction = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                    int(fraction[:6].ljust(6, '0')) if fraction else 0, tzinfo=timezone.utc)
+
+
+def format_utc(time_utc: datetime, digits: int = None, z: bool = False) -> str:
+    """ Format a datetime as timestamp 'YYYY-MM-DDTHH:MM:SS[.fff][Z]', in its own timezone.
+
+    :param time_utc: Datetime, naive datetimes are taken as UTC
+    :param digits: Number of fraction digits, zero beyond microseconds. By default 6 if
+    the datetime has microseconds and none otherwise, as datetime.isoformat()
+    :param z: Whether to append 'Z'
+    :return: Timestamp
+    """
+    text = f"{time_utc.year:04d}-{time_utc.month:02d}-{time_utc.day:02d}T" \
+           f"{time_utc.hour:02d}:{time_utc.minute:02d}:{time_utc.second:02d}"
+    if digits is None:
+        digits = 6 if time_utc.microsecond else 0
+    if digits:
+        text += f".{time_utc.microsecond:06d}"[:digits + 1].ljust(digits + 1, '0')
+    return text + "Z" if z else text
+
+
+def parse_delta(delta: str, max_hours: int = None) -> float:
+    """ Parse a relative timestamp '[+-]HH:MM:SS[.fff]' with two or more hour digits.
+
+    :param delta: Relative timestamp
+    :param max_hours: If given, the hours have to be less than this
+    :return: Signed time delta in seconds
+    """
+    match = _DELTA_RE.fullmatch(delta)
+    if match is None:
+        raise ValueError(f"Incorrect relative timestamp '{delta}', should be: "
+                         f"'[+-]HH:MM:SS'.")
+    sign, hours, minutes, seconds, fraction = match.groups()
+    if max_hours is not None and int(hours) >= max_hours:
+        raise ValueError(f"Relative timestamp '{delta}' is not under {max_hours} hours.")
+    value = (int(hours) * 60 + int(minutes)) * 60 + int(seconds)
+    if fraction:
+        value += int(fraction[:6].ljust(6, '0')) / 1e6
+    return -value if sign == '-' else float(value)
+
+
+def format_delta(seconds: float, digits: int = 0) -> str:
+    """ Format a time delta as relative timestamp '[+-]HH:MM:SS[.fff]', with as many hour
+    digits as needed.
+
+    :param seconds: Signed time delta in seconds
+    :param digits: Number of fraction digits, up to 6
+    :return: Relative timestamp
+    """
+    value_us = int(round(abs(seconds) * 1e6 / 10 ** (6 - digits))) * 10 ** (6 - digits)
+    whole, fraction = divmod(value_us, 1000000)
+    minutes, second = divmod(whole, 60)
+    hours, minute = divmod(minutes, 60)
+    text = f"{'-' if seconds < 0 else '+'}{hours:02d}:{minute:02d}:{second:02d}"
+    return text + f".{fraction:06d}"[:digits + 1] if digits else text
+
+
+def parse_header_time(header_time: str) -> datetime:
+    """ Parse a datapack header timestamp 'DD-Mon-YYYY_HH:MM:SS'.
+
+    :param header_time: Header timestamp, e.g. '03-Oct-2030_00:00:00'
+    :return: Timezone-aware UTC datetime
+    """
+    match = _HEADER_RE.fullmatch(header_time)
+    month = _MONTH_NUMBERS.get(match.group(2).upper()) if match is not None else None
+    if month is None:
+        raise ValueError(f"Incorrect header timestamp '{header_time}', should be: "
+                         f"'DD-Mon-YYYY_HH:MM:SS'.")
+    day, _, year, hour, minute, second = match.groups()
+    return datetime(int(year), month, int(day), int(hour), int(minute), int(second),
+                    tzinfo=timezone.utc)
+
+
+def format_header_time(time_utc: datetime) -> str:
+    """ Format a datetime as datapack header timestamp 'DD-Mon-YYYY_HH:MM:SS'. """
+    return f"{time_utc.day:02d}-{_MONTHS[time_utc.month - 1]}-{time_utc.year:04d}_" \
+           f"{time_utc.hour:02d}:{time_utc.minute:02d}:{time_utc.second:02d}"
+
+
+def _chars(timestamps: ArrayLike) -> np.ndarray:
+    """ Characters of an array of strings as a column-major matrix of ASCII codes, padded
+    with 0, so that each column is contiguous. Other characters are replaced by 255. """
+    array = np.asarray(timestamps)
+    if array.dtype.kind not in 'SU':
+        array = array.astype(str)
+    array = np.ascontiguousarray(array).ravel()
+    dtype = np.uint8 if array.dtype.kind == 'S' else np.uint32
+    if array.dtype.itemsize == 0:
+        return np.zeros((len(array), 1), dtype=np.uint8, order='F')
+    codes = array.view(dtype).reshape(len(array), array.dtype.itemsize // np.dtype(dtype).itemsize)
+    if dtype is np.uint32:
+        codes = np.minimum(codes, 255)
+    return codes.astype(np.uint8, order='F')
+
+
+def _to_text(chars: np.ndarray) -> np.ndarray:
+    """ Array of strings from a matrix of ASCII character codes, inverse of _chars(). """
+    # Unicode strings are stored as 4 bytes per character
+    codes = np.ascontiguousarray(chars, dtype=np.uint32)
+    return codes.view(f'U{codes.shape[1]}').ravel()
+
+
+def _number(chars: np.ndarray, start: int, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Decimal number of the given fixed columns, and whether they are all digits. """
+    value = np.zeros(len(chars), dtype=np.int64)
+    valid = np.full(len(chars), chars.shape[1] >= start + length)
+    for column in range(start, min(start + length, chars.shape[1])):
+        # Characters below '0' wrap around to large values
+        digit = chars[:, column] - np.uint8(ord('0'))
+        valid &= digit <= 9
+        value = value * 10 + digit
+    return value, valid
+
+
+def _is_char(chars: np.ndarray, column: int, allowed: str) -> np.ndarray:
+    """ Whether the character in the given column is one of the allowed characters. """
+    result = np.zeros(len(chars), dtype=bool)
+    if column < chars.shape[1]:
+        for char in allowed:
+            result |= chars[:, column] == ord(char)
+    return result
+
+
+def _raise_invalid(invalid: np.ndarray, timestamps: ArrayLike, expected: str) -> None:
+    """ Raises a ValueError listing the indices of all invalid timestamps, if any. """
+    if invalid.any():
+        indices = np.flatnonzero(invalid)
+        first = np.asarray(timestamps).ravel()[indices[0]]
+        raise ValueError(f"{len(indices)} timestamps are not in format '{expected}' at "
+                         f"indices {indices[:20].tolist()}"
+                         f"{'...' if len(indices) > 20 else ''} (first: '{first}').")
+
+
+def _fraction(chars: np.ndarray, start: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Optional fraction '.fff' from the given column, in microseconds, and the column
+    after its end (-1 for a point without digits). """
+    n = len(chars)
+    has_fraction = _is_char(chars, start, '.')
+    value_us = np.zeros(n, dtype=np.int64)
+    count = np.zeros(n, dtype=np.int64)
+    # Rows which have only digits after the point so far
+    in_digits = has_fraction.copy()
+    for offset, column in enumerate(range(start + 1, chars.shape[1])):
+        digit = chars[:, column] - np.uint8(ord('0'))
+        in_digits &= digit <= 9
+        if not in_digits.any():
+            break
+        if offset < 6:
+            value_us += np.where(in_digits, digit, 0).astype(np.int64) * 10 ** (5 - offset)
+        count += in_digits
+    end = np.where(has_fraction, np.where(count > 0, start + 1 + count, -1), start)
+    return value_us, end
+
+
+def _is_end(chars: np.ndarray, end: np.ndarray, suffix: str = '') -> np.ndarray:
+    """ Whether the strings end at the given columns, after an optional suffix. """
+    n, width = chars.shape
+    if suffix:
+        at_end = chars[np.arange(n), np.clip(end, 0, width - 1)]
+        end = np.where((end >= 0) & (end < width) & (at_end == ord(suffix)), end + 1, end)
+    valid = end >= 0
+    for column in range(max(int(end.min(initial=width)), 0), width):
+        valid &= (column < end) | (chars[:, column] == 0)
+    return valid
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """ Days since 1970-01-01 of proleptic Gregorian dates. """
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _civil_from_days(days: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Proleptic Gregorian dates of days since 1970-01-01, inverse of _days_from_civil. """
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524
+                   - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    return year_of_era + era * 400 + (month <= 2), month, day
+
+
+def _valid_date(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """ Whether the day exists in the month. """
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days_in_month = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[
+        np.clip(month - 1, 0, 11)] + (leap & (month == 2))
+    return (month >= 1) & (month <= 12) & (day >= 1) & (day <= days_in_month)
+
+
+def _to_datetime64(days: np.ndarray, hour: np.ndarray, minute: np.ndarray,
+                   second: np.ndarray, value_us: np.ndarray) -> np.ndarray:
+    return ((((days * 24 + hour) * 60 + minute) * 60 + second) * 1000000
+            + value_us).view('datetime64[us]')
+
+
+def _put_number(chars: np.ndarray, start: int, length: int, value: np.ndarray) -> None:
+    """ Writes zero-padded decimal numbers into the given fixed columns. """
+    for column in range(start + length - 1, start - 1, -1):
+        value, digit = np.divmod(value, 10)
+        chars[:, column] = digit + ord('0')
+
+
+def parse_utc_array(timestamps: ArrayLike) -> np.ndarray:
+    """ Parse an array of UTC timestamps 'YYYY-MM-DDTHH:MM:SS[.fff][Z]' at once.
+
+    :param timestamps: Array or sequence of timestamps, or an array of datetime64
+    :return: Array of datetime64[us]
+    :raises ValueError: With the indices of all timestamps not in this format
+    """
+    if np.asarray(timestamps).dtype.kind == 'M':
+        return np.asarray(timestamps).astype('datetime64[us]')
+    chars = _chars(timestamps)
+    year, valid_year = _number(chars, 0, 4)
+    month, valid_month = _number(chars, 5, 2)
+    day, valid_day = _number(chars, 8, 2)
+    hour, valid_hour = _number(chars, 11, 2)
+    minute, valid_minute = _number(chars, 14, 2)
+    second, valid_second = _number(chars, 17, 2)
+    value_us, end = _fraction(chars, 19)
+    valid = valid_year & valid_month & valid_day & valid_hour & valid_minute & valid_second \
+        & _is_char(chars, 4, '-') & _is_char(chars, 7, '-') & _is_char(chars, 10, 'T ') \
+        & _is_char(chars, 13, ':') & _is_char(chars, 16, ':') & _is_end(chars, end, 'Z') \
+        & _valid_date(year, month, day) & (hour < 24) & (minute < 60) & (second < 60)
+    _raise_invalid(~valid, timestamps, 'YYYY-MM-DDTHH:MM:SS[.fff][Z]')
+    return _to_datetime64(_days_from_civil(year, month, day), hour, minute, second, value_us)
+
+
+def format_utc_array(times: np.ndarray, digits: int = 0, z: bool = False) -> np.ndarray:
+    """ Format an array of datetime64 as timestamps 'YYYY-MM-DDTHH:MM:SS[.fff][Z]' at once.
+
+    :param times: Array of datetime64, in UTC
+    :param digits: Number of fraction digits, up to 6 (the rest is truncated)
+    :param z: Whether to append 'Z'
+    :return: Array of strings
+    """
+    value_us = np.asarray(times).astype('datetime64[us]').astype(np.int64).ravel()
+    days, value_us = np.divmod(value_us, 86400 * 1000000)
+    seconds, value_us = np.divmod(value_us, 1000000)
+    year, month, day = _civil_from_days(days)
+    width = 19 + (digits + 1 if digits else 0) + (1 if z else 0)
+    chars = np.zeros((len(value_us), width), dtype=np.uint8, order='F')
+    for start, length, value in ((0, 4, year), (5, 2, month), (8, 2, day),
+                                 (11, 2, seconds // 3600), (14, 2, seconds // 60 % 60),
+                                 (17, 2, seconds % 60)):
+        _put_number(chars, start, length, value)
+    for column, char in ((4, '-'), (7, '-'), (10, 'T'), (13, ':'), (16, ':')):
+        chars[:, column] = ord(char)
+    if digits:
+        chars[:, 19] = ord('.')
+        _put_number(chars, 20, digits, value_us // 10 ** (6 - digits))
+    if z:
+        chars[:, -1] = ord('Z')
+    return _to_text(chars)
+
+
+def parse_delta_array(deltas: ArrayLike, max_hours: int = None) -> np.ndarray:
+    """ Parse an array of relative timestamps '[+-]HH:MM:SS[.fff]' at once.
+
+    :param deltas: Array or sequence of relative timestamps
+    :param max_hours: If given, the hours have to be less than this
+    :return: Array of signed time deltas in seconds
+    :raises ValueError: With the indices of all timestamps not in this format
+    """
+    chars = _chars(deltas)
+    signed = _is_char(chars, 0, '+-')
+    negative = _is_char(chars, 0, '-')
+    # Rows with the same sign and number of hour digits have all fields at the same
+    # columns, and are parsed together
+    colon = np.argmax(chars == ord(':'), axis=1)
+    layouts = colon * 2 + signed
+    value = np.zeros(len(chars))
+    valid = np.zeros(len(chars), dtype=bool)
+    for layout in np.unique(layouts):
+        colon_column, start = divmod(int(layout), 2)
+        if not 2 <= colon_column - start <= 9:
+            continue
+        rows = layouts == layout
+        group = chars if rows.all() else np.asfortranarray(chars[rows])
+        hours, valid_hours = _number(group, start, colon_column - start)
+        minute, valid_minute = _number(group, colon_column + 1, 2)
+        second, valid_second = _number(group, colon_column + 4, 2)
+        value_us, end = _fraction(group, colon_column + 6)
+        valid[rows] = valid_hours & valid_minute & valid_second \
+            & _is_char(group, colon_column + 3, ':') & _is_end(group, end) \
+            & (minute < 60) & (second < 60) \
+            & (hours < max_hours if max_hours is not None else True)
+        value[rows] = (hours * 3600 + minute * 60 + second) + value_us / 1e6
+    _raise_invalid(~valid, deltas, '[+-]HH:MM:SS[.fff]' if max_hours is None
+                   else f'[+-]HH:MM:SS[.fff] under {max_hours} hours')
+    return np.where(negative, -value, value)
+
+
+def format_delta_array(seconds: np.ndarray, digits: int = 0) -> np.ndarray:
+    """ Format an array of time deltas as relative timestamps '[+-]HH:MM:SS[.fff]' at once,
+    with as many hour digits as needed.
+
+    :param seconds: Array of signed time deltas in seconds
+    :param digits: Number of fraction digits, up to 6
+    :return: Array of strings
+    """
+    seconds = np.asarray(seconds, dtype=np.float64).ravel()
+    value_us = np.round(np.abs(seconds) * 10 ** digits).astype(np.int64) * 10 ** (6 - digits)
+    whole, value_us = np.divmod(value_us, 1000000)
+    hours = whole // 3600
+    # Number of hour digits of each row, at least two
+    n_hours = np.full(len(hours), 2)
+    for power in range(2, 19):
+        more = hours >= 10 ** power
+        if not more.any():
+            break
+        n_hours += more
+    fraction_width = digits + 1 if digits else 0
+    result = np.empty(len(seconds), dtype=f'U{7 + n_hours.max(initial=2) + fraction_width}')
+    # Rows with the same number of hour digits are formatted together
+    for n in np.unique(n_hours):
+        rows = n_hours == n if n_hours.max() > 2 else slice(None)
+        chars = np.zeros((len(hours[rows]), 7 + n + fraction_width), dtype=np.uint8, order='F')
+        chars[:, 0] = np.where(seconds[rows] < 0, ord('-'), ord('+'))
+        _put_number(chars, 1, n, hours[rows])
+        chars[:, 1 + n] = chars[:, 4 + n] = ord(':')
+        _put_number(chars, 2 + n, 2, whole[rows] // 60 % 60)
+        _put_number(chars, 5 + n, 2, whole[rows] % 60)
+        if digits:
+            chars[:, 7 + n] = ord('.')
+            _put_number(chars, 8 + n, digits, value_us[rows] // 10 ** (6 - digits))
+        result[rows] = _to_text(chars)
+    return result
+
+
+def parse_header_time_array(header_times: ArrayLike) -> np.ndarray:
+    """ Parse an array of datapack header timestamps 'DD-Mon-YYYY_HH:MM:SS' at once.
+
+    :param header_times: Array or sequence of header timestamps
+    :return: Array of datetime64[us]
+    :raises ValueError: With the indices of all timestamps not in this format
+    """
+    chars = _chars(header_times)
+    day, valid_day = _number(chars, 0, 2)
+    year, valid_year = _number(chars, 7, 4)
+    hour, valid_hour = _number(chars, 12, 2)
+    minute, valid_minute = _number(chars, 15, 2)
+    second, valid_second = _number(chars, 18, 2)
+    # Months by the upper case codes of their three letters
+    if chars.shape[1] >= 6:
+        letters = chars[:, 3:6].astype(np.int64)
+        letters = np.where((letters >= ord('a')) & (letters <= ord('z')), letters - 32, letters)
+        codes = (letters[:, 0] << 16) | (letters[:, 1] << 8) | letters[:, 2]
+    else:
+        codes = np.zeros(len(chars), dtype=np.int64)
+    month_codes = np.array([(ord(m[0]) << 16) | (ord(m[1]) << 8) | ord(m[2])
+                            for m in _MONTH_NUMBERS])
+    month = np.isin(codes, month_codes) * (np.argmax(codes[:, None] == month_codes, axis=1) + 1)
+    valid = valid_day & valid_year & valid_hour & valid_minute & valid_second \
+        & _is_char(chars, 2, '-') & _is_char(chars, 6, '-') & _is_char(chars, 11, '_') \
+        & _is_char(chars, 14, ':') & _is_char(chars, 17, ':') \
+        & _is_end(chars, np.full(len(chars), 20)) \
+        & _valid_date(year, month, day) & (hour < 24) & (minute < 60) & (second < 60)
+    _raise_invalid(~valid, header_times, 'DD-Mon-YYYY_HH:MM:SS')
+    return _to_datetime64(_days_from_civil(year, month, day), hour, minute, second,
+                          np.zeros(len(chars), dtype=np.int64))
+
+
+def format_header_time_array(times: np.ndarray) -> np.ndarray:
+    """ Format an array of datetime64 as datapack header timestamps 'DD-Mon-YYYY_HH:MM:SS'. """
+    utc = format_utc_array(times)
+    chars = _chars(utc).astype(np.uint8)
+    months = np.array([[ord(c) for c in m] for m in _MONTHS], dtype=np.uint8)
+    out = np.zeros((len(chars), 20), dtype=np.uint8)
+    out[:, 0:2] = chars[:, 8:10]
+    out[:, 2] = out[:, 6] = ord('-')
+    out[:, 3:6] = months[(chars[:, 5] - ord('0')) * 10 + chars[:, 6] - ord('0') - 1]
+    out[:, 7:11] = chars[:, 0:4]
+    out[:, 11] = ord('_')
+    out[:, 12:20] = chars[:, 11:19]
+    return _to_text(out)
@@ -4,16 +4,24 @@
 @author: Marcel Stefko
 """
 
+import itertools
 import re
 import os
-from datetime import datetime, timedelta
-import iso8601
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, Optional, Sequence, Union
+import numpy as np
+
+from .timecodec import format_delta_array, format_utc, format_utc_array, parse_delta, \
+    parse_delta_array, parse_utc, parse_utc_array
 
 
 class TimestampProcessor:
     """ Contains methods for manipulating relative and absolute UTC timestamps,
      and converting from one to another in ITL files."""
 
+    # Size of the buffer of converted ITL files, so that they are written in few large blocks
+    WRITE_BUFFER_SIZE = 1024 * 1024
+
     def __init__(self, CA_timestamp_UTC: str):
         """ Construct the timestamp processor.
 
@@ -23,36 +31,20 @@ class TimestampProcessor:
         """
         # Timestamp parsing regex
         self.RE = re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}[ Z]')
-        self.CA = iso8601.parse_date(CA_timestamp_UTC)
-
-    @staticmethod
-    def _get_utc_date(initial_date: datetime, delta_seconds: float) -> str:
-        """ Translate given datetime object by a given delta time.
-
-        :param initial_date: Initial datetime.
-        :param delta_seconds: Translation delta.
-        :return: Translated datetime in UTC string isoformat.
-        """
-        final_date = initial_date + timedelta(seconds=delta_seconds)
-        return final_date.isoformat()
+        # Event name and relative timestamp at the start of a command line, parsed in one
+        # match instead of splitting and calling datetime.strptime
+        self.RE_RELATIVE = re.compile(
+            r'(\s*)([A-Za-z_]\w*)\s+([+-]?)(\d{2,}):([0-5]\d):([0-5]\d)(?:\.(\d+))?(?=\s|$)')
+        self.CA = parse_utc(CA_timestamp_UTC)
 
     @staticmethod
     def _parse_delta_input(input_string: str) -> float:
-        """
+        """ Parse a relative timestamp under 24 hours.
 
-        :param input_string:
-        :return:
+        :param input_string: Timestamp in format '[+-]HH:MM:SS[.fffff]'
+        :return: Signed time delta in seconds
         """
-        if len(input_string) == 8:
-            input_string = "+" + input_string
-        t = datetime.strptime(input_string[1:], "%H:%M:%S")
-        if input_string[0] == "+":
-            delta = timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
-        elif input_string[0] == "-":
-            delta = - timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
-        else:
-            raise ValueError("Incorrect input format, should be: '[+-]HH:MM:SS'.")
-        return delta.total_seconds()
+        return parse_delta(input_string, max_hours=24)
 
     def delta2utc(self, relative_timestamp: str) -> str:
         """ Transform relative timestamp to absolute timestamp.
@@ -60,7 +52,7 @@ class TimestampProcessor:
         :param relative_timestamp: Timestamp in format '[+-]%HH:%MM:%SS.00000'
         :return: Absolute timestamp in format '%YYYY-%MM-%DDT%HH:%MM:%SS'
         """
-        return str(self._get_utc_date(self.CA, self._parse_delta_input(relative_timestamp))[:-6])
+        return format_utc(self.CA + timedelta(seconds=self._parse_delta_input(relative_timestamp)))
 
     def utc2delta(self, utc_timestamp: str, enforce_24h: float = True) -> str:
         """ Transform an absolute UTC timestamp into a relative timestamp.
@@ -70,7 +62,7 @@ class TimestampProcessor:
         :param utc_timestamp: Absolute timestamp in UTC format.
         :return: Relative timestamp in format '[+-]HH:MM:DD' if under 24 hours.
         """
-        T = iso8601.parse_date(utc_timestamp)
+        T = parse_utc(utc_timestamp)
         # we will care about sign of relative timestamp later, now we want time amount
         delta = abs(self.CA - T)
         # If we have flag enabled, and time delta is outside 24 hour range, raise
@@ -88,6 +80,75 @@ class TimestampProcessor:
         delta_timestamp = sign + delta_timestamp
         return delta_timestamp
 
+    def utc2delta_array(self, utc_timestamps: Union[np.ndarray, Sequence[str]],
+                        enforce_24h: bool = True, formatted: bool = True,
+                        digits: int = 0) -> np.ndarray:
+        """ Transform an array of absolute UTC timestamps into relative timestamps at once,
+        see utc2delta(). Timestamps more than 24 hours away from CA are formatted with as
+        many hour digits as needed, e.g. '+25:00:00'.
+
+        :param utc_timestamps: Array or sequence of timestamps 'YYYY-MM-DDTHH:MM:SS[.fff][Z]',
+        or an array of datetime64 in UTC
+        :param enforce_24h: Flag to raise an error if any timestamp is more than 24 hours
+        away from CA
+        :param formatted: If True, return relative timestamps '[+-]HH:MM:SS', otherwise
+        signed time deltas in seconds
+        :param digits: Number of fraction digits of the relative timestamps
+        :return: Array of relative timestamps, or of time deltas in seconds
+        :raises ValueError: With the indices of all timestamps which can't be parsed, or
+        which are more than 24 hours away from CA
+        """
+        delta_us = (parse_utc_array(utc_timestamps) - self._CA_datetime64()).astype(np.int64)
+        if enforce_24h:
+            self._check_24h(np.abs(delta_us) >= 86400 * 1000000)
+        seconds = delta_us / 1e6
+        return format_delta_array(seconds, digits) if formatted else seconds
+
+    def delta2utc_array(self, relative_timestamps: Union[np.ndarray, Sequence[str]],
+                        enforce_24h: bool = True, formatted: bool = True,
+                        digits: int = None) -> np.ndarray:
+        """ Transform an array of relative timestamps into absolute UTC timestamps at once,
+        see delta2utc().
+
+        :param relative_timestamps: Array or sequence of timestamps '[+-]HH:MM:SS[.fffff]',
+        or an array of signed time deltas from CA in seconds
+        :param enforce_24h: Flag to raise an error if any timestamp is more than 24 hours
+        away from CA, as delta2utc() does
+        :param formatted: If True, return timestamps 'YYYY-MM-DDTHH:MM:SS', otherwise
+        datetime64 in UTC
+        :param digits: Number of fraction digits of the timestamps, by default 6 if any
+        of them has a fraction of a second and none otherwise
+        :return: Array of absolute timestamps, or of datetime64
+        :raises ValueError: With the indices of all timestamps which can't be parsed, or
+        which are more than 24 hours away from CA
+        """
+        deltas = np.asarray(relative_timestamps)
+        if deltas.dtype.kind in 'SUO':
+            seconds = parse_delta_array(deltas, max_hours=24 if enforce_24h else None)
+        else:
+            seconds = deltas.astype(np.float64).ravel()
+            if enforce_24h:
+                self._check_24h(np.abs(seconds) >= 86400)
+        times = self._CA_datetime64() + np.round(seconds * 1e6).astype('timedelta64[us]')
+        if not formatted:
+            return times
+        if digits is None:
+            digits = 6 if (times.astype(np.int64) % 1000000).any() else 0
+        return format_utc_array(times, digits)
+
+    def _CA_datetime64(self) -> np.datetime64:
+        """ CA time as naive UTC datetime64. """
+        return np.datetime64(self.CA.astimezone(timezone.utc).replace(tzinfo=None), 'us')
+
+    @staticmethod
+    def _check_24h(too_far: np.ndarray) -> None:
+        """ Raises a ValueError listing the indices of all timestamps too far from CA. """
+        if too_far.any():
+            indices = np.flatnonzero(too_far)
+            raise ValueError(f"{len(indices)} timestamps are more than 24 hours away from CA "
+                             f"and flag 'enforce_24h' is set to True, at indices "
+                             f"{indices[:20].tolist()}{'...' if len(indices) > 20 else ''}.")
+
     def absolute_to_relative_timestamps_itl(
             self, in_filepath: str, out_filepath: str,
             event_name: str, overwrite: bool = False) -> None:
@@ -104,45 +165,129 @@ class TimestampProcessor:
         :param event_name: Name of event in EVT file (e.g. 'CLS_APP_CAL').
         :param overwrite: If False, an exception is raised in case out_filepath already exists.
         """
+        self._convert_itl(in_filepath, out_filepath, overwrite,
+                          lambda line, idx: self._absolute_to_relative_line(line, idx, event_name),
+                          header=f'# {event_name} time used: {self.CA}\n')
+
+    def relative_to_absolute_timestamps_itl(
+            self, in_filepath: str, out_filepath: str,
+            event_times: Dict[str, Union[str, datetime]] = None, overwrite: bool = False) -> None:
+        """ Take ITL file as input, and transform all timestamps relative to an event
+        ('EVENT [+-]HH:MM:SS[.fffff]') into absolute UTC timestamps.
+
+        - Only the relative timestamp is replaced, the rest of the line is kept as it is.
+        - Fractional seconds are kept with the same number of digits.
+        - Commented out lines are kept as they are.
+        - Lines with events missing from event_times are kept as they are.
+
+        :param in_filepath: Path to input ITL file
+        :param out_filepath: Path to transformed output ITL file
+        :param event_times: UTC timestamps of the events by name (e.g.
+        {'CLS_APP_CAL': '2031-04-25T22:40:47'}). By default all events are at the CA time
+        given to the constructor of this class.
+        :param overwrite: If False, an exception is raised in case out_filepath already exists.
+        """
+        event_dates = None if event_times is None else {
+            name: time if isinstance(time, datetime) else parse_utc(time)
+            for name, time in event_times.items()}
+        self._convert_itl(in_filepath, out_filepath, overwrite,
+                          lambda line, idx: self._relative_to_absolute_line(line, idx,
+                                                                            event_dates))
+
+    def _convert_itl(self, in_filepath: str, out_filepath: str, overwrite: bool,
+                     convert: Callable[[str, int], str], header: Optional[str] = None) -> None:
+        """ Converts an ITL file line by line in a single pass, writing the output in
+        large blocks. If the input file is empty, no output file is written.
+
+        :param in_filepath: Path to input ITL file
+        :param out_filepath: Path to transformed output ITL file
+        :param overwrite: If False, an exception is raised in case out_filepath already exists.
+        :param convert: Function of a line and its index, returning the output line
+        :param header: Text written before the converted lines
+        """
         if not overwrite:
             if os.path.isfile(out_filepath):
                 raise RuntimeError(f"File {out_filepath} already exists. If you want " +
                                    f"to overwrite it, set flag 'overwrite=True'.")
-        with open(in_filepath) as f:
-            lines = f.readlines()
-
-        new_lines = []
-        # First comment line of original timestamp
-        new_lines.append(f'# {event_name} time used: {self.CA}\n')
-        for idx, line in enumerate(lines):
-            # strip all whitespace and linebreak characters from the right
-            x = line[:]
-            x = x.rstrip()
-            # search for absolute timestamp
-            if self.RE.findall(x):
-                # if more than 1 timestamp on the line, skip it
-                if len(self.RE.findall(x)) > 1:
-                    print(f"Multiple timestamps found on line {idx}. Skipping...")
-                    new_lines.append(x + '\n')
-                    continue
-                # Find the timestamp, and split rest of line to part before and after
-                abs_timestamp = self.RE.findall(x)[0]
-                sp = x.split(abs_timestamp)
-                # If part before timestamp contains #, it means it is in a comment
-                if "#" in sp[0]:
-                    print(f"Timestamp on line {idx} is a comment. Skipping...")
-                    new_lines.append(x + '\n')
-                    continue
-
-                # Properly format the relative timestamp
-                rel_timestamp = self.utc2delta(abs_timestamp)
-                # Join the two parts of split string together, with relative timestamp
-                # inbetween, and the original absolute appended at the end in comment
-                x = sp[0] + f" {event_name} {rel_timestamp} " + sp[1] + f" # {abs_timestamp} "
-            new_lines.append(x + '\n')
-
-            with open(os.path.abspath(out_filepath), 'w') as f:
-                f.writelines(new_lines)
+        out_filepath = os.path.abspath(out_filepath)
+        with open(in_filepath) as f_in:
+            # Converting a file in place requires reading it before the output is opened
+            lines: Iterator[str] = iter(f_in.readlines() if os.path.isfile(out_filepath) and
+                                        os.path.samefile(in_filepath, out_filepath) else f_in)
+            # No output file is written for an empty input file
+            first_line = next(lines, None)
+            if first_line is None:
+                return
+            with open(out_filepath, 'w', buffering=self.WRITE_BUFFER_SIZE) as f_out:
+                if header is not None:
+                    f_out.write(header)
+                for idx, line in enumerate(itertools.chain([first_line], lines)):
+                    f_out.write(convert(line, idx))
+
+    def _absolute_to_relative_line(self, line: str, idx: int, event_name: str) -> str:
+        """ Converts the absolute timestamp on a line of an ITL file, see
+        absolute_to_relative_timestamps_itl().
+
+        :param line: Line of the input ITL file
+        :param idx: Index of the line in the file, for messages
+        :param event_name: Name of event in EVT file (e.g. 'CLS_APP_CAL').
+        :return: Line of the output ITL file, including the line break
+        """
+        # strip all whitespace and linebreak characters from the right
+        x = line.rstrip()
+        # search for absolute timestamps, matching the line only once
+        matches = list(self.RE.finditer(x))
+        if not matches:
+            return x + '\n'
+        # if more than 1 timestamp on the line, skip it
+        if len(matches) > 1:
+            print(f"Multiple timestamps found on line {idx}. Skipping...")
+            return x + '\n'
+        # Find the timestamp, and split rest of line to part before and after
+        abs_timestamp = matches[0].group()
+        before, after = x[:matches[0].start()], x[matches[0].end():]
+        # If part before timestamp contains #, it means it is in a comment
+        if "#" in before:
+            print(f"Timestamp on line {idx} is a comment. Skipping...")
+            return x + '\n'
+
+        # Properly format the relative timestamp
+        rel_timestamp = self.utc2delta(abs_timestamp)
+        # Join the two parts of split string together, with relative timestamp
+        # inbetween, and the original absolute appended at the end in comment
+        return before + f" {event_name} {rel_timestamp} " + after + f" # {abs_timestamp} \n"
+
+    def _relative_to_absolute_line(self, line: str, idx: int,
+                                   event_dates: Optional[Dict[str, datetime]]) -> str:
+        """ Converts the relative timestamp on a line of an ITL file, see
+        relative_to_absolute_timestamps_itl().
+
+        :param line: Line of the input ITL file
+        :param idx: Index of the line in the file, for messages
+        :param event_dates: Times of the events by name, None if all events are at CA
+        :return: Line of the output ITL file, including the line break
+        """
+        match = self.RE_RELATIVE.match(line)
+        if match is None:
+            return line
+        indent, event, sign, hours, minutes, seconds, fraction = match.groups()
+        if event_dates is None:
+            event_date = self.CA
+        elif event in event_dates:
+            event_date = event_dates[event]
+        else:
+            print(f"Unknown event {event} on line {idx}. Skipping...")
+            return line
+        # Integer arithmetic in microseconds, fraction digits beyond microseconds are dropped
+        delta_us = ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000000
+        if fraction:
+            delta_us += int(fraction[:6].ljust(6, '0'))
+        date = event_date + timedelta(microseconds=-delta_us if sign == '-' else delta_us)
+        # Times with a timezone offset are written in UTC, as the 'Z' suffix states
+        if date.tzinfo is not None:
+            date = date.astimezone(timezone.utc)
+        return indent + format_utc(date, digits=len(fraction or ''), z=True) \
+            + line[match.end():]
 
 
 if __name__ == '__main__':
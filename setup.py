@@ -4,7 +4,8 @@ setup(
     name='mapps_tools',
     version='1.0',
     packages=['mapps_tools',
-              'mapps_tools.mosaics'],
+              'mapps_tools.mosaics',
+              'mapps_tools.resource_analysis'],
     url='https://gitlab.esa.int/MarcelStefko/MappsTools/',
     license='Proprietary ESA internal code - reuse outside ESA not allowed without explicit permission.',
     author='Marcel Stefko',
@@ -0,0 +1,80 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+import tempfile
+
+import numpy as np
+
+from mapps_tools.resource_analysis import CommandAttribution, PowerConsumptionGraph, \
+    DataConsumptionGraph, Datapack
+from mapps_tools.resource_analysis.attribution import ITLCommand, read_itl_commands, \
+    command_intervals
+
+
+class TestReadITLCommands(TestCase):
+    CA = '2031-04-25T22:40:00'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = join(self.tmp_dir.name, 'test.itl')
+        with open(self.path, 'w') as f:
+            f.write("# JANUS\n"
+                    " # 2031-04-25T20:00:00Z JANUS  * SWITCH_MODE  (CURRENT_MODE=OFF  [ENG])\n"
+                    " 2031-04-25T22:10:00Z JANUS  * SWITCH_MODE  (CURRENT_MODE=STBY  [ENG])\n"
+                    "\n"
+                    " CLS_APP  -00:20:30.5 JANUS  * IMAGE_ACQ  (N_IMAGES=4)  # images\n"
+                    " CLS_APP  +00:10:00 MAJIS  * SWITCH_MODE  (CURRENT_MODE=SCI  [ENG])\n"
+                    " CLS_APP  00:30:00 JANUS  * SWITCH_MODE  (CURRENT_MODE=OFF  [ENG])\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read(self):
+        commands = read_itl_commands(self.path, self.CA)
+        self.assertEqual(commands, [
+            ITLCommand(-0.5, 'JANUS', 'SWITCH_MODE', 'STBY', 3),
+            ITLCommand(-(20.0 / 60 + 30.5 / 3600), 'JANUS', 'IMAGE_ACQ', 'STBY', 5),
+            ITLCommand(10.0 / 60, 'MAJIS', 'SWITCH_MODE', 'SCI', 6),
+            ITLCommand(0.5, 'JANUS', 'SWITCH_MODE', 'OFF', 7)])
+
+    def test_event_times(self):
+        commands = read_itl_commands(self.path, self.CA, event_times_h={'CLS_APP': 1.0})
+        self.assertAlmostEqual(commands[3].time_h, 1.5)
+        self.assertRaises(ValueError, read_itl_commands, self.path, self.CA,
+                          event_times_h={'OTHER': 1.0})
+
+    def test_intervals(self):
+        intervals = command_intervals(read_itl_commands(self.path, self.CA))
+        self.assertEqual(list(intervals.index), [3, 5, 7, 6])
+        np.testing.assert_allclose(intervals['end_h'],
+                                   [intervals['start_h'][5], 0.5, np.inf, np.inf])
+
+
+class TestCommandAttribution(TestCase):
+    CA = '2031-04-25T22:40:47'
+
+    def setUp(self):
+        directory = split(abspath(__file__))[0]
+        self.itl_path = join(directory, 'itl_file_in.itl')
+        self.datapack = Datapack(join(directory, 'flyby_test_power_and_data.csv'),
+                                 use_cache=False)
+        self.attribution = CommandAttribution(self.CA, self.itl_path, self.datapack)
+
+    def test_command_table(self):
+        table = self.attribution.get_command_table()
+        df = PowerConsumptionGraph("test", self.CA, self.datapack)._get_only_instrument_dataframe()
+        rates = DataConsumptionGraph("test", self.CA, self.datapack, add_HAA=False).data_rate
+        for _, row in table.iterrows():
+            rows = (df.index >= row['start_h']) & (df.index < row['end_h'])
+            self.assertAlmostEqual(row['energy_Wh'], df[row['instrument']][rows].sum() / 60.0)
+            self.assertAlmostEqual(row['data_Mbits'],
+                                   rates[row['instrument']][rows].sum() * 60.0 / 1000.0)
+
+    def test_totals(self):
+        table = self.attribution.get_command_table()
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack)
+        self.assertAlmostEqual(table['energy_Wh'].sum(),
+                               pcg.get_energy_Wh(table['start_h'].min(), instrument='MAJIS'))
+        modes = self.attribution.get_mode_table()
+        self.assertAlmostEqual(modes['energy_Wh'].sum(), table['energy_Wh'].sum())
+        self.assertAlmostEqual(modes.loc[('MAJIS', 'OFF'), 'energy_Wh'],
+                               table[table['mode'] == 'OFF']['energy_Wh'].sum())
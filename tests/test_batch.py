@@ -0,0 +1,105 @@
+from unittest import TestCase
+from concurrent.futures.process import BrokenProcessPool
+from os.path import split, join, abspath
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from mapps_tools.resource_analysis import Flyby, analyze_flybys, render_flybys, \
+    PowerConsumptionGraph, DataConsumptionGraph
+from mapps_tools.resource_analysis.batch import main, _map_parallel
+
+
+def _exit_process(item: int) -> int:
+    os._exit(1)
+
+
+class TestAnalyzeFlybys(TestCase):
+    def setUp(self):
+        test_dir = split(__file__)[0]
+        self.flybys = [
+            Flyby("6E1", '2030-10-05T02:24:00', abspath(join(test_dir, '6e1_test_power.csv')),
+                  power_limit_Wh=4000.0),
+            Flyby("T", '2031-04-25T22:40:00',
+                  abspath(join(test_dir, 'flyby_test_power_and_data.csv')),
+                  power_limit_Wh=3000.0, data_limit_Mbits=12000.0)]
+
+    def test_serial_and_parallel_match(self):
+        serial = analyze_flybys(self.flybys, processes=1)
+        parallel = analyze_flybys(self.flybys, processes=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_values(self):
+        table = analyze_flybys(self.flybys, processes=1, add_HAA=True)
+        self.assertEqual(list(table.index), ["6E1", "T"])
+        pcg = PowerConsumptionGraph("T", '2031-04-25T22:40:00', self.flybys[1].sheet_path,
+                                    add_HAA=True)
+        dcg = DataConsumptionGraph("T", '2031-04-25T22:40:00', self.flybys[1].sheet_path,
+                                   add_HAA=True)
+        self.assertAlmostEqual(table.loc["T", 'energy_Wh'], pcg.get_cumulative_power().values[-1])
+        self.assertAlmostEqual(table.loc["T", 'data_Mbits'], dcg.get_cumulative_data().values[-1])
+        self.assertAlmostEqual(table.loc["T", 'power_margin_Wh'], -44.0)
+        self.assertAlmostEqual(table.loc["T", 'data_share_MAJIS_%'], 41.484, places=3)
+        energy_shares = table.loc["T", [c for c in table if c.startswith('energy_share_')]]
+        self.assertAlmostEqual(energy_shares.sum(), 100.0)
+        # 6E1 datapack contains only power columns
+        self.assertTrue(np.isnan(table.loc["6E1", 'data_Mbits']))
+        self.assertTrue(np.isnan(table.loc["6E1", 'data_margin_Mbits']))
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            list_path = join(tmp_dir, 'flybys.csv')
+            pd.DataFrame([{'name': f.name, 'CA': f.CA_timestamp, 'datapack': f.sheet_path,
+                           'power_limit_Wh': f.power_limit_Wh, 'data_limit_Mbits': f.data_limit_Mbits}
+                          for f in self.flybys]).to_csv(list_path, index=False)
+            output_path = join(tmp_dir, 'out.csv')
+            main([list_path, '-o', output_path, '-p', '1'])
+            self.assertTrue(os.path.isfile(output_path))
+            table = pd.read_csv(output_path, index_col=0)
+        self.assertNotIn('energy_share_HAA_%', table)
+        self.assertAlmostEqual(table.loc["T", 'power_limit_Wh'], 3000.0)
+
+    def test_crashed_process(self):
+        self.assertRaises(BrokenProcessPool, _map_parallel, _exit_process, [1, 2], 2)
+        # Exceptions of the analysis are raised, not hidden by a serial retry
+        missing = [flyby._replace(sheet_path=flyby.sheet_path + '.missing')
+                   for flyby in self.flybys]
+        self.assertRaises(OSError, analyze_flybys, missing, processes=2)
+
+
+class TestRenderFlybys(TestCase):
+    def setUp(self):
+        test_dir = split(__file__)[0]
+        self.flybys = [
+            Flyby("6E1", '2030-10-05T02:24:00', abspath(join(test_dir, '6e1_test_power.csv')),
+                  power_limit_Wh=4000.0),
+            Flyby("T", '2031-04-25T22:40:00',
+                  abspath(join(test_dir, 'flyby_test_power_and_data.csv')),
+                  data_limit_Mbits=12000.0)]
+
+    def test_render_formats(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_dir = join(tmp_dir, 'plots')
+            paths = render_flybys(self.flybys, out_dir, formats=('png', 'svg', 'pdf'),
+                                  processes=2)
+            # 6E1 datapack contains only power columns
+            self.assertEqual(sorted(os.listdir(out_dir)), sorted(
+                ['6E1_power.png', '6E1_power.svg', '6E1_power.pdf',
+                 'T_power.png', 'T_power.svg', 'T_power.pdf',
+                 'T_data.png', 'T_data.svg', 'T_data.pdf']))
+            self.assertEqual(len(paths), 9)
+            with open(join(out_dir, 'T_data.png'), 'rb') as f:
+                self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+            with open(join(out_dir, 'T_power.pdf'), 'rb') as f:
+                self.assertEqual(f.read(4), b'%PDF')
+
+    def test_render_does_not_touch_pyplot(self):
+        from matplotlib import pyplot as plt
+        figures = plt.get_fignums()
+        pcg = PowerConsumptionGraph("6E1", '2030-10-05T02:24:00', self.flybys[0].sheet_path)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pcg.render(join(tmp_dir, 'power.svg'))
+            self.assertTrue(os.path.isfile(join(tmp_dir, 'power.svg')))
+        self.assertEqual(plt.get_fignums(), figures)
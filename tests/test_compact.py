@@ -0,0 +1,77 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+
+import numpy as np
+import pandas as pd
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph
+from mapps_tools.resource_analysis.compact import RunLengthTimeline
+from mapps_tools.resource_analysis.intervals import PrefixSums
+
+
+class TestRunLengthTimeline(TestCase):
+    def setUp(self):
+        self.time_h = np.arange(8) / 60.0
+        self.values = np.array([[0.0, 5.0], [0.0, 5.0], [2.0, 5.0], [2.0, 1.0],
+                                [2.0, 1.0], [0.0, 1.0], [0.0, 1.0], [3.0, 1.0]])
+        self.timeline = RunLengthTimeline(self.time_h, self.values, ['A', 'B'])
+
+    def test_roundtrip(self):
+        df = self.timeline.to_dataframe()
+        np.testing.assert_array_equal(df.values, self.values)
+        np.testing.assert_array_equal(df.index.values, self.time_h)
+        self.assertEqual(list(df.columns), ['A', 'B'])
+
+    def test_sums_match_prefix_sums(self):
+        prefix_sums = PrefixSums(self.time_h, self.values, ['A', 'B'])
+        for start_h, end_h in [(None, None), (1 / 60, 4 / 60), (2.5 / 60, 7 / 60),
+                               (3 / 60, 3 / 60), (-1.0, 0.5 / 60), (5.0, 6.0)]:
+            np.testing.assert_array_equal(self.timeline.sum(start_h, end_h),
+                                          prefix_sums.sum(start_h, end_h))
+        self.assertEqual(self.timeline.column_sum('A', 2 / 60, 7 / 60), 9.0)
+
+    def test_cumulative_sum(self):
+        cumulative = self.timeline.cumulative_sum()
+        reference = pd.Series(self.values.sum(axis=1).cumsum(), index=self.time_h)
+        np.testing.assert_array_equal(cumulative.values, reference.loc[cumulative.index].values)
+        self.assertEqual(cumulative.index[0], self.time_h[0])
+        self.assertEqual(cumulative.index[-1], self.time_h[-1])
+
+    def test_non_uniform_time(self):
+        time_h = np.array([0.0, 1.0, 1.5, 3.0, 3.2, 4.0, 6.0, 7.0])
+        timeline = RunLengthTimeline(time_h, self.values, ['A', 'B'])
+        prefix_sums = PrefixSums(time_h, self.values, ['A', 'B'])
+        np.testing.assert_array_equal(timeline.time_h, time_h)
+        for start_h, end_h in [(None, None), (1.2, 3.2), (3.0, 6.5)]:
+            np.testing.assert_array_equal(timeline.sum(start_h, end_h),
+                                          prefix_sums.sum(start_h, end_h))
+
+    def test_float32(self):
+        timeline = RunLengthTimeline(self.time_h, self.values + 0.1, ['A', 'B'], dtype=np.float32)
+        np.testing.assert_allclose(timeline.sum(), (self.values + 0.1).sum(axis=0), rtol=1e-6)
+
+
+class TestCompactPowerConsumptionGraph(TestCase):
+    def setUp(self):
+        path = abspath(join(split(__file__)[0], '6e1_test_power.csv'))
+        kwargs = dict(add_HAA=True, power_limit_Wh=4000.0, time_interval_h=(-9.0, 11.0))
+        self.pcg = PowerConsumptionGraph("6E1", '2030-10-05T02:24:00', path, **kwargs)
+        self.compact = PowerConsumptionGraph("6E1", '2030-10-05T02:24:00', path, compact=True,
+                                             **kwargs)
+
+    def test_same_printed_results(self):
+        self.assertIsNone(self.compact.data)
+        self.assertEqual(self.compact.print_total_power_consumed(),
+                         self.pcg.print_total_power_consumed())
+        self.assertEqual(self.compact.print_individual_instrument_consumption(),
+                         self.pcg.print_individual_instrument_consumption())
+
+    def test_interval_queries(self):
+        self.assertAlmostEqual(self.compact.get_energy_Wh(-2.0, 3.0, instrument='JANUS'),
+                               self.pcg.get_energy_Wh(-2.0, 3.0, instrument='JANUS'))
+        self.assertAlmostEqual(self.compact.get_energy_Wh(-2.5, 3.3),
+                               self.pcg.get_energy_Wh(-2.5, 3.3))
+
+    def test_memory(self):
+        self.assertLess(self.compact.timeline.nbytes * 10,
+                        self.pcg._get_only_instrument_dataframe().values.nbytes)
@@ -30,3 +30,37 @@ class TestDataConsumptionGraph(TestCase):
  - UVS  :  1544.9 Mbits -  4.2%
 """
         self.assertEqual(self.dcg.print_individual_instrument_data(), ref)
+
+
+class TestDataConsumptionGraphFlyby(TestCase):
+    def setUp(self):
+        self.dcg = DataConsumptionGraph("T", '2031-04-25T22:40:00',
+            abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv')),
+            data_limit_Mbits=12000.0)
+
+    def test_print_total_data_acquired(self):
+        ref = "Total data acquired: 12149.2 Mbits (101.2% of limit)."
+        self.assertEqual(self.dcg.print_total_data_acquired(), ref)
+
+    def test_print_individual_instrument_data(self):
+        ref = \
+"""Consumption by instrument:
+ - HAA  :   172.7 Mbits -  1.4%
+ - JMAG :   172.8 Mbits -  1.4%
+ - PEP  :   720.0 Mbits -  5.9%
+ - 3GM  :     2.9 Mbits -  0.0%
+ - RPWI :  1152.0 Mbits -  9.5%
+ - SWI  :    28.8 Mbits -  0.2%
+ - RIME :   180.0 Mbits -  1.5%
+ - JANUS:  3780.0 Mbits - 31.1%
+ - MAJIS:  5040.0 Mbits - 41.5%
+ - GALA :    36.0 Mbits -  0.3%
+ - UVS  :   864.0 Mbits -  7.1%
+"""
+        self.assertEqual(self.dcg.print_individual_instrument_data(), ref)
+
+    def test_get_data_volume_Mbits(self):
+        self.assertAlmostEqual(self.dcg.get_data_volume_Mbits(-1.0, 1.0, 'JANUS'), 558.0)
+        self.assertAlmostEqual(self.dcg.get_data_volume_Mbits(instrument='MAJIS'), 5040.0)
+        self.assertAlmostEqual(self.dcg.get_data_volume_Mbits(),
+                               self.dcg.get_cumulative_data().values[-1])
@@ -0,0 +1,132 @@
+from unittest import TestCase
+from unittest.mock import patch
+from datetime import datetime, timezone
+from os.path import split, join, abspath
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from mapps_tools.resource_analysis import Datapack, DatapackCache, \
+    PowerConsumptionGraph, DataConsumptionGraph
+
+
+class TestDatapack(TestCase):
+    def setUp(self):
+        self.path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        self.datapack = Datapack(self.path)
+
+    def test_header(self):
+        self.assertEqual(self.datapack.time_step_s, 60.0)
+        self.assertEqual(self.datapack.header['Datapack name'], 'Payload Resources')
+        self.assertEqual(self.datapack.start_time, datetime(2031, 4, 25, 9, 40, tzinfo=timezone.utc))
+        self.assertEqual(self.datapack.end_time, datetime(2031, 4, 26, 11, 40, tzinfo=timezone.utc))
+        self.assertEqual(self.datapack.sources['Timeline data source'],
+                         '../PLANNING/Europa_flyby_CDR/Europa_flyby_Timeline.itl')
+
+    def test_body(self):
+        self.assertEqual(len(self.datapack), 1561)
+        self.assertEqual(self.datapack.values.shape, (1561, 32))
+        self.assertEqual(self.datapack.columns[0], 'Power All Instruments')
+        self.assertEqual(self.datapack.units['Data Accumulated JANUS'], '(Mbits)')
+        self.assertEqual(self.datapack.timestamps[0], np.datetime64('2031-04-25T09:40:00'))
+
+    def test_select(self):
+        df = self.datapack.select("Data Rate ", datetime(2031, 4, 25, 22, 40, tzinfo=timezone.utc))
+        self.assertEqual(list(df.columns), ['3GM', 'GALA', 'JANUS', 'JMAG', 'MAJIS',
+                                            'PEP', 'RIME', 'RPWI', 'SWI', 'UVS'])
+        self.assertEqual(df.index[0], -13.0)
+        self.assertEqual(df.index[-1], 13.0)
+        self.assertEqual(df.loc[0.0, 'GALA'], 5.0)
+
+    def test_graphs_share_datapack_without_reading_disk(self):
+        with patch('builtins.open', side_effect=AssertionError("Datapack was read again")):
+            pcg = PowerConsumptionGraph("T", '2031-04-25T22:40:00', self.datapack)
+            dcg = DataConsumptionGraph("T", '2031-04-25T22:40:00', self.datapack)
+        ref_pcg = PowerConsumptionGraph("T", '2031-04-25T22:40:00', self.path)
+        ref_dcg = DataConsumptionGraph("T", '2031-04-25T22:40:00', self.path)
+        self.assertTrue(pcg.data.equals(ref_pcg.data))
+        self.assertTrue(dcg.data_accum.equals(ref_dcg.data_accum))
+
+    def test_column_projection(self):
+        datapack = Datapack(self.path, prefixes=("Power ",), use_cache=False)
+        self.assertEqual(len(datapack.columns), 12)
+        self.assertTrue(all(col.startswith("Power ") for col in datapack.columns))
+        self.assertEqual(datapack.values.dtype, np.float64)
+        full_values = self.datapack.values[:, :12]
+        self.assertTrue(np.array_equal(datapack.values, full_values))
+
+    def test_wrong_time_step(self):
+        self.assertRaises(ValueError, Datapack._parse_time_step, '1 Minutes')
+        self.assertRaises(ValueError, Datapack._parse_time_step, '1.00 Days')
+        self.assertEqual(Datapack._parse_time_step('0.50 Hours'), 1800.0)
+
+
+class TestDatapackCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = join(self.tmp_dir, 'flyby.csv')
+        shutil.copy(abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv')), self.path)
+        self.cache = DatapackCache(join(self.tmp_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_cached_contents_match(self):
+        parsed = Datapack(self.path, cache=self.cache)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 1)
+        with patch.object(Datapack, '_read_arrays', side_effect=AssertionError("Parsed again")):
+            cached = Datapack(self.path, cache=self.cache)
+        self.assertTrue(np.array_equal(parsed.values, cached.values))
+        self.assertTrue(np.array_equal(parsed.timestamps, cached.timestamps))
+        self.assertEqual(parsed.columns, cached.columns)
+        self.assertEqual(parsed.header, cached.header)
+        self.assertEqual(parsed.time_step_s, cached.time_step_s)
+
+    def test_modified_datapack_invalidates_entry(self):
+        Datapack(self.path, cache=self.cache)
+        old_entries = os.listdir(self.cache.cache_dir)
+        with open(self.path, 'a') as f:
+            f.write('\n2031-04-26T11:41:00Z' + ',1.00' * 32 + ',')
+        datapack = Datapack(self.path, cache=self.cache)
+        self.assertEqual(len(datapack), 1562)
+        new_entries = os.listdir(self.cache.cache_dir)
+        self.assertEqual(len(new_entries), 1)
+        self.assertNotEqual(old_entries, new_entries)
+
+    def test_cache_merges_projected_columns(self):
+        Datapack(self.path, prefixes=("Power ",), cache=self.cache)
+        Datapack(self.path, prefixes=("Data Rate ",), cache=self.cache)
+        with patch.object(Datapack, '_read_arrays', side_effect=AssertionError("Parsed again")):
+            datapack = Datapack(self.path, prefixes=("Power ", "Data Rate "), cache=self.cache)
+        self.assertEqual(len(datapack.columns), 22)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 1)
+
+    def test_eviction(self):
+        other_path = join(self.tmp_dir, 'other.csv')
+        shutil.copy(self.path, other_path)
+        cache = DatapackCache(self.cache.cache_dir, max_size_bytes=1)
+        Datapack(self.path, cache=cache)
+        Datapack(other_path, cache=cache)
+        entries = os.listdir(cache.cache_dir)
+        self.assertEqual(len(entries), 1)
+        self.assertTrue(entries[0].startswith('other.csv'))
+
+    def test_disabled_cache(self):
+        Datapack(self.path)
+        Datapack(self.path, use_cache=False)
+        self.assertFalse(os.path.exists(join(self.tmp_dir, DatapackCache.default_dir_name)))
+
+    def test_default_cache_directory(self):
+        Datapack(self.path, use_cache=True)
+        self.assertEqual(len(os.listdir(join(self.tmp_dir, DatapackCache.default_dir_name))), 1)
+
+    def test_entries_removed_by_other_process(self):
+        Datapack(self.path, cache=self.cache)
+        listdir = os.listdir
+        with patch('os.utime', side_effect=FileNotFoundError), \
+                patch('os.listdir', side_effect=lambda path: listdir(path) + ['removed.npz']):
+            Datapack(self.path, cache=self.cache)
+            Datapack(self.path, prefixes=("Power ",), cache=self.cache)
+        self.assertEqual(len(listdir(self.cache.cache_dir)), 1)
@@ -0,0 +1,79 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+import tempfile
+
+import numpy as np
+
+from mapps_tools.resource_analysis import DatapackDiff
+
+
+class TestDatapackDiff(TestCase):
+    CA = '2031-04-25T22:40:00'
+
+    def setUp(self):
+        self.path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        with open(self.path) as f:
+            self.lines = f.read().splitlines(keepends=True)
+        self.n_preamble = next(i for i, line in enumerate(self.lines)
+                               if not line.startswith('#')) + 2
+        labels = self.lines[self.n_preamble - 2].split(',')
+        self.janus_power = labels.index('Power JANUS')
+        self.janus_rate = labels.index('Data Rate JANUS')
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, lines):
+        path = join(self.tmp_dir.name, name)
+        with open(path, 'w') as f:
+            f.writelines(lines)
+        return path
+
+    def modified(self):
+        """ JANUS consumes 50 W and produces 10 kbps more during the hour after CA. """
+        lines = list(self.lines)
+        for i in range(self.n_preamble, len(lines)):
+            fields = lines[i].split(',')
+            if '2031-04-25T22:40:00Z' <= fields[0] <= '2031-04-25T23:39:00Z':
+                fields[self.janus_power] = f'{float(fields[self.janus_power]) + 50.0:.2f}'
+                fields[self.janus_rate] = f'{float(fields[self.janus_rate]) + 10.0:.2f}'
+                lines[i] = ','.join(fields)
+        return lines
+
+    def test_identical(self):
+        diff = DatapackDiff(self.CA, self.path, self.path, add_HAA=True)
+        self.assertTrue((diff.get_energy_delta_Wh() == 0.0).all())
+        self.assertTrue((diff.get_data_delta_Mbits() == 0.0).all())
+        self.assertEqual(diff.get_changed_intervals(), [])
+        self.assertEqual(diff.get_changed_rows()['power_changed_rows'].sum(), 0)
+
+    def test_changed(self):
+        diff = DatapackDiff(self.CA, self.path, self.write('new.csv', self.modified()))
+        energy = diff.get_energy_delta_Wh()
+        self.assertAlmostEqual(energy['JANUS'], 50.0)
+        self.assertAlmostEqual(energy.drop('JANUS').abs().sum(), 0.0)
+        self.assertAlmostEqual(diff.get_data_delta_Mbits()['JANUS'], 36.0)
+
+        intervals = diff.get_changed_intervals()
+        self.assertEqual(len(intervals), 1)
+        self.assertEqual(intervals[0].start_h, 0.0)
+        self.assertAlmostEqual(intervals[0].end_h, 59 / 60)
+        self.assertAlmostEqual(intervals[0].peak_change_W, 50.0)
+        self.assertAlmostEqual(intervals[0].energy_change_Wh, 50.0)
+
+        rows = diff.get_changed_rows()
+        self.assertEqual(rows.loc['JANUS', 'power_changed_rows'], 60)
+        self.assertEqual(rows.loc['JANUS', 'data_rate_changed_rows'], 60)
+        self.assertAlmostEqual(rows.loc['JANUS', 'power_last_change_h'], 59 / 60)
+        self.assertTrue(np.isnan(rows.loc['PEP', 'power_first_change_h']))
+
+    def test_different_time_steps(self):
+        # Every other row, with a 2 minute output step
+        preamble = [line.replace('1.00 Minutes', '2.00 Minutes')
+                    for line in self.lines[:self.n_preamble]]
+        coarse = self.write('coarse.csv', preamble + self.lines[self.n_preamble::2])
+        diff = DatapackDiff(self.CA, coarse, self.path)
+        self.assertEqual(diff.time_step_s, 120.0)
+        self.assertEqual(len(diff.time_h), 781)
+        np.testing.assert_array_equal(diff.old_power_W, diff.new_power_W)
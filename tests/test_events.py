@@ -0,0 +1,86 @@
+from unittest import TestCase
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from mapps_tools.events import EventIndex, Event, read_evf
+
+EVF = """# Test event file
+Ref_date: 01-Jan-2031
+ 2031-04-25T22:40:47.000Z  CLS_APP_CAL  (COUNT = 1)
+ 2031-04-25T20:00:00Z  AOS_MAL  (COUNT =  1)
+25-Apr-2031_23:30:00  LOS_MAL  (COUNT = 1)
+ 2031-04-26T20:00:00.5Z  AOS_MAL  (COUNT =  2)
+ # 2031-04-26T21:00:00Z  LOS_MAL  (COUNT = 2)
+ 2031-05-01T00:00:00Z  PERI
+ 2031-05-05T00:00:00Z  PERI
+"""
+
+
+class TestEventIndex(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.evf = os.path.join(cls.tmp_dir.name, 'events.evf')
+        with open(cls.evf, 'w') as f:
+            f.write(EVF)
+        cls.index = EventIndex.from_evf(cls.evf)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_read(self):
+        events = read_evf(self.evf)
+        self.assertEqual([(event.name, event.count) for event in events],
+                         [('CLS_APP_CAL', 1), ('AOS_MAL', 1), ('LOS_MAL', 1), ('AOS_MAL', 2),
+                          ('PERI', 1), ('PERI', 2)])
+        self.assertEqual(events[2].time, datetime(2031, 4, 25, 23, 30, tzinfo=timezone.utc))
+        self.assertEqual(events[3].time.microsecond, 500000)
+
+    def test_sorted(self):
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.index.events[0].name, 'AOS_MAL')
+        self.assertEqual(self.index.names, ['AOS_MAL', 'CLS_APP_CAL', 'LOS_MAL', 'PERI'])
+        self.assertEqual(self.index.get_times('PERI'),
+                         [datetime(2031, 5, d, tzinfo=timezone.utc) for d in (1, 5)])
+
+    def test_get_event(self):
+        self.assertEqual(self.index.get_event('AOS_MAL', 2).time.day, 26)
+        self.assertRaises(KeyError, self.index.get_event, 'LOS_MAL', 2)
+
+    def test_preceding(self):
+        self.assertEqual(self.index.preceding('2031-04-25T22:40:47Z').name, 'CLS_APP_CAL')
+        self.assertEqual(self.index.preceding('2031-04-25T22:40:46Z').name, 'AOS_MAL')
+        self.assertEqual(self.index.preceding('2031-04-27T00:00:00Z', 'LOS_MAL').count, 1)
+        self.assertIsNone(self.index.preceding('2031-04-25T19:00:00Z'))
+        self.assertIsNone(self.index.preceding('2031-04-25T23:00:00Z', 'PERI'))
+
+    def test_relative(self):
+        self.assertEqual(self.index.relative('2031-04-25T23:00:00Z'),
+                         (self.index.get_event('CLS_APP_CAL'), '+00:19:13'))
+        self.assertEqual(self.index.relative('2031-04-25T21:00:00Z', 'CLS_APP_CAL')[1],
+                         '-01:40:47')
+        self.assertEqual(self.index.relative('2031-04-27T20:00:00Z', 'AOS_MAL', count=1)[1],
+                         '+48:00:00')
+        self.assertEqual(self.index.relative('2031-04-26T20:00:01Z', 'AOS_MAL')[1],
+                         '+00:00:00.500000')
+        self.assertRaises(KeyError, self.index.relative, '2031-04-25T21:00:00Z', 'NONE')
+
+    def test_processor(self):
+        processor = self.index.processor('CLS_APP_CAL')
+        self.assertEqual(processor.utc2delta('2031-04-25T23:42:50'), '+01:02:03')
+        self.assertEqual(self.index.get_event_times()['AOS_MAL'].hour, 20)
+
+    def test_relative_before_event(self):
+        self.assertEqual(self.index.relative('2031-04-24T22:40:46Z', 'CLS_APP_CAL', count=1)[1],
+                         '-24:00:01')
+
+    def test_large_index(self):
+        start = datetime(2031, 1, 1, tzinfo=timezone.utc).timestamp()
+        events = [Event('PERI' if i % 2 else 'APO', i // 2 + 1,
+                        datetime.fromtimestamp(start + 3600 * i, timezone.utc))
+                  for i in range(200000)]
+        index = EventIndex(reversed(events))
+        self.assertEqual(index.preceding(events[150001].time), events[150001])
+        self.assertEqual(index.preceding(events[150001].time, 'APO'), events[150000])
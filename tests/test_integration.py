@@ -0,0 +1,168 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+import tempfile
+
+import numpy as np
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph, DataConsumptionGraph, Datapack, \
+    DatapackDiff, StreamingPowerConsumption, StreamingDataConsumption
+from mapps_tools.resource_analysis.integration import row_durations_s, weighted
+from mapps_tools.resource_analysis.limits import Violation, find_violations
+
+
+class TestRowDurations(TestCase):
+    def test_uniform(self):
+        self.assertIsNone(row_durations_s(np.arange(5) / 60.0, 60.0))
+        np.testing.assert_allclose(row_durations_s(np.arange(5) / 60.0, 60.0, 'trapezoid'),
+                                   [30.0, 60.0, 60.0, 60.0, 30.0])
+
+    def test_non_uniform(self):
+        time_h = np.array([0.0, 1.0, 3.0]) / 60.0
+        np.testing.assert_allclose(row_durations_s(time_h, 60.0), [60.0, 120.0, 60.0])
+        np.testing.assert_allclose(row_durations_s(time_h, 60.0, 'trapezoid'),
+                                   [30.0, 90.0, 60.0])
+
+    def test_invalid_method(self):
+        self.assertRaises(ValueError, row_durations_s, np.arange(5), 60.0, 'simpson')
+
+    def test_violations(self):
+        time_h = np.array([0.0, 1.0, 3.0, 4.0])
+        violations = find_violations(time_h, np.array([0.0, 2.0, 3.0, 0.0]), 1.0,
+                                     row_durations_s(time_h, 3600.0))
+        self.assertEqual(violations, [Violation(1.0, 3.0, 2.0, 4.0)])
+
+    def test_weighted(self):
+        durations = np.array([1.0, 2.0])
+        np.testing.assert_array_equal(weighted(np.array([3.0, 4.0]), durations), [3.0, 8.0])
+        np.testing.assert_array_equal(weighted(np.ones((2, 3)), durations),
+                                      [[1.0] * 3, [2.0] * 3])
+
+
+class TestSparseDatapack(TestCase):
+    CA = '2031-04-25T22:40:00'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        with open(cls.path) as f:
+            lines = f.read().splitlines(keepends=True)
+        n_preamble = next(i for i, line in enumerate(lines) if not line.startswith('#')) + 2
+        # Event-driven datapack: only rows in which a power or data rate value changes,
+        # and the last row
+        labels = lines[n_preamble - 2].split(',')
+        fields = [idx for idx, label in enumerate(labels)
+                  if label.startswith('Power ') or label.startswith('Data Rate ')]
+        body = lines[n_preamble:]
+        kept = [body[0]]
+        for previous, line in zip(body[:-1], body[1:]):
+            values = line.split(',')
+            if [values[idx] for idx in fields] != [previous.split(',')[idx] for idx in fields]:
+                kept.append(line)
+        if kept[-1] is not body[-1]:
+            kept.append(body[-1])
+        cls.n_rows, cls.n_sparse_rows = len(body), len(kept)
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.sparse_path = join(cls.tmp_dir.name, 'sparse.csv')
+        with open(cls.sparse_path, 'w') as f:
+            f.writelines(lines[:n_preamble] + kept)
+        # Same rows, with twice the JANUS power and data rate
+        doubled = [labels.index(label) for label in ('Power JANUS', 'Data Rate JANUS')]
+        cls.doubled_path = join(cls.tmp_dir.name, 'doubled.csv')
+        with open(cls.doubled_path, 'w') as f:
+            f.writelines(lines[:n_preamble])
+            for line in kept:
+                values = line.split(',')
+                for idx in doubled:
+                    values[idx] = f'{2 * float(values[idx]):.2f}'
+                f.write(','.join(values))
+        cls.no_step_path = join(cls.tmp_dir.name, 'no_step.csv')
+        with open(cls.no_step_path, 'w') as f:
+            f.writelines([line for line in lines[:n_preamble] if 'Output step' not in line]
+                         + body[:5] + body[6:])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_sparse(self):
+        self.assertLess(self.n_sparse_rows, self.n_rows / 5)
+
+    def test_power_step_hold(self):
+        full = PowerConsumptionGraph("full", self.CA, Datapack(self.path, use_cache=False))
+        sparse = PowerConsumptionGraph("sparse", self.CA,
+                                       Datapack(self.sparse_path, use_cache=False))
+        self.assertAlmostEqual(sparse.summary().total, full.summary().total)
+        self.assertAlmostEqual(sparse.get_cumulative_power().values[-1],
+                               full.get_cumulative_power().values[-1])
+        for inst, value in full.summary().instrument_totals.items():
+            self.assertAlmostEqual(sparse.summary().instrument_totals[inst], value)
+            self.assertAlmostEqual(sparse.get_energy_Wh(instrument=inst), value)
+        # Interval from a row until the row before another one
+        time_h = sparse.data.index.values
+        self.assertAlmostEqual(sparse.get_energy_Wh(time_h[5], time_h[12]),
+                               full.get_energy_Wh(time_h[5], time_h[13] - 1e-6))
+
+    def test_power_trapezoid(self):
+        datapack = Datapack(self.path, use_cache=False)
+        step = PowerConsumptionGraph("step", self.CA, datapack)
+        trapezoid = PowerConsumptionGraph("trapezoid", self.CA, datapack, integration='trapezoid')
+        df = step._get_only_instrument_dataframe()
+        total = np.trapz(df.sum(axis=1).values, df.index.values)
+        self.assertAlmostEqual(trapezoid.summary().total, total)
+        self.assertAlmostEqual(trapezoid.get_energy_Wh(), total)
+
+    def test_missing_output_step(self):
+        # The typical step between rows is used instead
+        self.assertEqual(Datapack(self.no_step_path, use_cache=False).time_step_s, 60.0)
+
+    def test_compact_requires_uniform(self):
+        self.assertRaises(ValueError, PowerConsumptionGraph, "sparse", self.CA,
+                          Datapack(self.sparse_path, use_cache=False), compact=True)
+
+    def test_data_step_hold(self):
+        full = DataConsumptionGraph("full", self.CA, Datapack(self.path, use_cache=False),
+                                    add_HAA=False)
+        sparse = DataConsumptionGraph("sparse", self.CA,
+                                      Datapack(self.sparse_path, use_cache=False), add_HAA=False)
+        self.assertAlmostEqual(sparse.get_data_volume_Mbits(), full.get_data_volume_Mbits())
+        self.assertAlmostEqual(sparse.get_data_volume_Mbits(instrument='JANUS'),
+                               full.get_data_volume_Mbits(instrument='JANUS'))
+
+    def test_power_statistics_require_uniform(self):
+        self.assertRaises(ValueError, PowerConsumptionGraph("sparse", self.CA, Datapack(
+            self.sparse_path, use_cache=False)).get_power_statistics)
+
+    def test_diff_step_hold(self):
+        full = Datapack(self.path, use_cache=False)
+        diff = DatapackDiff(self.CA, Datapack(self.sparse_path, use_cache=False),
+                            Datapack(self.doubled_path, use_cache=False))
+        self.assertAlmostEqual(diff.get_energy_delta_Wh()['JANUS'],
+                               PowerConsumptionGraph("full", self.CA, full).get_energy_Wh(
+                                   instrument='JANUS'))
+        self.assertAlmostEqual(diff.get_data_delta_Mbits()['JANUS'],
+                               DataConsumptionGraph("full", self.CA, full).get_data_volume_Mbits(
+                                   instrument='JANUS'))
+        self.assertAlmostEqual(sum(interval.energy_change_Wh
+                                   for interval in diff.get_changed_intervals()),
+                               diff.get_energy_delta_Wh().sum())
+
+    def test_streaming_step_hold(self):
+        datapack = Datapack(self.sparse_path, use_cache=False)
+        for time_interval_h in (None, (-3.0, 4.0)):
+            power = PowerConsumptionGraph("sparse", self.CA, datapack, power_limit_Wh=2000.0,
+                                          time_interval_h=time_interval_h)
+            data = DataConsumptionGraph("sparse", self.CA, datapack,
+                                        time_interval_h=time_interval_h)
+            # Chunks end between rows of different durations
+            for chunk_size in (7, 1000):
+                stream = StreamingPowerConsumption(
+                    "sparse", self.CA, self.sparse_path, power_limit_Wh=2000.0,
+                    time_interval_h=time_interval_h, chunk_size=chunk_size)
+                self.assertAlmostEqual(stream.summary().total, power.summary().total)
+                for inst, value in power.summary().instrument_totals.items():
+                    self.assertAlmostEqual(stream.summary().instrument_totals[inst], value)
+                self.assertEqual(stream.profile_violations, power.get_profile_violations())
+                stream = StreamingDataConsumption("sparse", self.CA, self.sparse_path,
+                                                  time_interval_h=time_interval_h,
+                                                  chunk_size=chunk_size)
+                self.assertAlmostEqual(stream.summary().total, data.summary().total)
@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+import numpy as np
+
+from mapps_tools.resource_analysis.intervals import PrefixSums, interval_slice
+
+
+class TestIntervalSlice(TestCase):
+    def test_closed_interval(self):
+        time_h = np.array([-1.0, -0.5, 0.0, 0.5, 1.0])
+        self.assertEqual(interval_slice(time_h, -0.5, 0.5), slice(1, 4))
+        self.assertEqual(interval_slice(time_h, -0.7, 0.7), slice(1, 4))
+        self.assertEqual(interval_slice(time_h), slice(0, 5))
+        self.assertEqual(interval_slice(time_h, 2.0, 3.0), slice(5, 5))
+        self.assertEqual(interval_slice(time_h, 0.7, 0.2), slice(4, 4))
+
+
+class TestPrefixSums(TestCase):
+    def setUp(self):
+        self.time_h = np.arange(-5.0, 5.5, 0.5)
+        self.values = np.column_stack([np.ones(len(self.time_h)), self.time_h ** 2])
+        self.sums = PrefixSums(self.time_h, self.values, ['A', 'B'])
+
+    def test_sum(self):
+        mask = (self.time_h >= -2.0) & (self.time_h <= 1.2)
+        np.testing.assert_allclose(self.sums.sum(-2.0, 1.2), self.values[mask].sum(axis=0))
+        np.testing.assert_allclose(self.sums.sum(), self.values.sum(axis=0))
+
+    def test_column_sum(self):
+        self.assertEqual(self.sums.column_sum('A', 0.0, 1.0), 3.0)
+        self.assertEqual(self.sums.column_sum('B', 10.0, 20.0), 0.0)
@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+import numpy as np
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph
+from mapps_tools.resource_analysis.limits import evaluate_profile, find_violations, \
+    find_cumulative_violations, violates_limits, Violation
+
+
+class TestEvaluateProfile(TestCase):
+    def test_power_profile(self):
+        times = np.array([-13.0, -12.0, -10.0, -8.0, -1.0, -0.25, 0.0, 0.25, 8.0, 11.9, 12.0, 12.5])
+        ref = np.array([0.0, 80.0, 80.0, 230.0, 230.0, 360.0, 360.0, 360.0, 230.0, 80.0, 80.0, 0.0])
+        np.testing.assert_array_equal(
+            evaluate_profile(PowerConsumptionGraph._get_power_profile(), times), ref)
+
+    def test_linear_profile(self):
+        profile = (np.array([0.0, 2.0]), np.array([10.0, 20.0]))
+        np.testing.assert_array_equal(evaluate_profile(profile, np.array([-1.0, 0.0, 1.0, 2.0])),
+                                      np.array([0.0, 10.0, 15.0, 20.0]))
+
+
+class TestFindViolations(TestCase):
+    def setUp(self):
+        self.time_h = np.arange(10) / 60.0
+        self.power = np.array([0.0, 120.0, 150.0, 90.0, 100.0, 130.0, 130.0, 0.0, 0.0, 110.0])
+
+    def test_constant_limit(self):
+        violations = find_violations(self.time_h, self.power, 100.0, time_step_s=60.0)
+        self.assertEqual(len(violations), 3)
+        self.assertEqual(violations[0].start_h, 1 / 60)
+        self.assertEqual(violations[0].end_h, 2 / 60)
+        self.assertEqual(violations[0].peak_excess, 50.0)
+        self.assertAlmostEqual(violations[0].excess_energy_Wh, 70.0 / 60)
+        self.assertEqual(violations[1][:3], (5 / 60, 6 / 60, 30.0))
+        self.assertEqual(violations[2][:3], (9 / 60, 9 / 60, 10.0))
+
+    def test_varying_limit(self):
+        limit = np.full(10, 200.0)
+        limit[5:7] = 125.0
+        violations = find_violations(self.time_h, self.power, limit, time_step_s=60.0)
+        self.assertEqual(violations, [Violation(5 / 60, 6 / 60, 5.0, 10.0 / 60)])
+
+    def test_no_violations(self):
+        self.assertEqual(find_violations(self.time_h, self.power, 200.0, 60.0), [])
+
+    def test_cumulative(self):
+        cumulative = np.cumsum(self.power) / 60.0
+        violations = find_cumulative_violations(self.time_h, cumulative, 10.0)
+        self.assertEqual(len(violations), 1)
+        self.assertEqual(violations[0].start_h, 6 / 60)
+        self.assertEqual(violations[0].end_h, 9 / 60)
+        self.assertAlmostEqual(violations[0].peak_excess, 830.0 / 60 - 10.0)
+        self.assertEqual(violations[0].excess_energy_Wh, violations[0].peak_excess)
+
+    def test_violates_limits(self):
+        profile = (np.array([0.0, 1.0]), np.array([140.0, 140.0]))
+        candidates = np.vstack([self.power, np.minimum(self.power, 140.0), self.power / 10])
+        np.testing.assert_array_equal(
+            violates_limits(self.time_h, candidates, 60.0, profile=profile),
+            [True, False, False])
+        np.testing.assert_array_equal(
+            violates_limits(self.time_h, candidates, 60.0, profile=profile,
+                            power_limit_Wh=10.0), [True, True, False])
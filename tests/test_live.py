@@ -0,0 +1,95 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+import os
+import tempfile
+
+import numpy as np
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph, DataConsumptionGraph, \
+    LivePowerConsumptionGraph, LiveDataConsumptionGraph
+from mapps_tools.resource_analysis.live import DatapackFollower
+
+
+class TestLiveGraphs(TestCase):
+    CA = '2031-04-25T22:40:00'
+
+    def setUp(self):
+        self.path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        with open(self.path, 'rb') as f:
+            self.lines = f.read().splitlines(keepends=True)
+        # Header block, column labels and units
+        self.n_preamble = next(i for i, line in enumerate(self.lines)
+                               if not line.startswith(b'#')) + 2
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.live_path = join(self.tmp_dir.name, 'live.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, content: bytes, mode: str = 'ab'):
+        with open(self.live_path, mode) as f:
+            f.write(content)
+
+    def test_follower(self):
+        self.write(self.lines[0], 'wb')
+        follower = DatapackFollower(self.live_path, prefixes=("Power ",))
+        self.assertIsNone(follower.read_new())
+        self.write(b''.join(self.lines[1:self.n_preamble]))
+        self.assertEqual(len(follower.read_new()), 0)
+        # Partially written line is left for the next read
+        row = self.lines[self.n_preamble]
+        self.write(row[:10])
+        self.assertEqual(len(follower.read_new()), 0)
+        self.write(row[10:] + b''.join(self.lines[self.n_preamble + 1:self.n_preamble + 5]))
+        datapack = follower.read_new()
+        self.assertEqual(len(datapack), 5)
+        self.assertEqual(follower.offset, os.path.getsize(self.live_path))
+        self.assertEqual(datapack.columns[0], 'Power All Instruments')
+
+    def test_power_matches_full_read(self):
+        kwargs = dict(add_HAA=True, power_limit_Wh=2000.0, time_interval_h=(-10.0, 10.0))
+        self.write(b''.join(self.lines[:self.n_preamble + 100]), 'wb')
+        live = LivePowerConsumptionGraph("T", self.CA, self.live_path, **kwargs)
+        self.assertAlmostEqual(live.get_power_margin_Wh(), 2000.0)
+        n_rows = 0
+        for start in range(self.n_preamble + 100, len(self.lines), 250):
+            self.write(b''.join(self.lines[start:start + 250]))
+            n_rows += live.refresh()
+        self.assertEqual(live.refresh(), 0)
+        self.assertEqual(n_rows, 1201)
+
+        full = PowerConsumptionGraph("T", self.CA, self.path, **kwargs)
+        np.testing.assert_array_equal(live.data.values, full.data.values)
+        np.testing.assert_array_equal(live.get_cumulative_power().values,
+                                      full.get_cumulative_power().values)
+        self.assertEqual(live.print_individual_instrument_consumption(),
+                         full.print_individual_instrument_consumption())
+        self.assertEqual(live.get_power_margin_Wh(),
+                         2000.0 - full.get_cumulative_power().values[-1])
+        self.assertEqual(live.get_energy_Wh(-1.0, 2.0), full.get_energy_Wh(-1.0, 2.0))
+
+    def test_data_matches_full_read(self):
+        kwargs = dict(data_limit_Mbits=10000.0, time_interval_h=(-3.0, 12.5))
+        self.write(b''.join(self.lines[:self.n_preamble + 700]), 'wb')
+        live = LiveDataConsumptionGraph("T", self.CA, self.live_path, **kwargs)
+        for start in range(self.n_preamble + 700, len(self.lines), 77):
+            self.write(b''.join(self.lines[start:start + 77]))
+            live.refresh()
+
+        full = DataConsumptionGraph("T", self.CA, self.path, **kwargs)
+        np.testing.assert_array_equal(live.data_accum.values, full.data_accum.values)
+        np.testing.assert_array_equal(live.data_rate.values, full.data_rate.values)
+        self.assertEqual(live.print_total_data_acquired(), full.print_total_data_acquired())
+        self.assertEqual(live.get_data_margin_Mbits(),
+                         10000.0 - full.get_cumulative_data().values[-1])
+        self.assertEqual(live.get_data_volume_Mbits(-1.0, 2.0),
+                         full.get_data_volume_Mbits(-1.0, 2.0))
+
+    def test_requires_equally_spaced_rows(self):
+        self.write(b''.join(self.lines[:self.n_preamble + 100]), 'wb')
+        power = LivePowerConsumptionGraph("T", self.CA, self.live_path)
+        data = LiveDataConsumptionGraph("T", self.CA, self.live_path)
+        # Row after a gap
+        self.write(self.lines[self.n_preamble + 101])
+        self.assertRaises(ValueError, power.refresh)
+        self.assertRaises(ValueError, data.refresh)
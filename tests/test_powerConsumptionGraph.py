@@ -56,3 +56,19 @@ class TestPowerConsumptionGraph6E1(TestCase):
  - UVS  :   118.4 Wh -  3.0%
 """
         self.assertEqual(self.pcg.print_individual_instrument_consumption(), ref)
+
+    def test_time_index_matches_iso8601(self):
+        import iso8601
+        CA = iso8601.parse_date('2030-10-05T02:24:00')
+        for T in ['2030-10-04T18:24:00Z', '2030-10-05T02:24:00Z', '2030-10-05T14:23:00Z']:
+            ref = (iso8601.parse_date(T) - CA).total_seconds() / 3600.0
+            self.assertIn(ref, self.pcg.data.index)
+        self.assertEqual(self.pcg.data.index[0], -8.0)
+        self.assertEqual(self.pcg.data.index[-1], 12.0)
+
+    def test_get_energy_Wh(self):
+        self.assertAlmostEqual(self.pcg.get_energy_Wh(), self.pcg.get_cumulative_power().values[-1])
+        df = self.pcg.data
+        ref = df.loc[(df.index >= -2.0) & (df.index <= 1.5), 'JANUS'].sum() / 60.0
+        self.assertAlmostEqual(self.pcg.get_energy_Wh(-2.0, 1.5, 'JANUS'), ref)
+        self.assertEqual(self.pcg.get_energy_Wh(20.0, 30.0), 0.0)
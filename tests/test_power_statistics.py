@@ -0,0 +1,54 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+
+import numpy as np
+import pandas as pd
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph
+from mapps_tools.resource_analysis.power_statistics import max_moving_average, duty_cycles
+
+
+class TestMaxMovingAverage(TestCase):
+    def test_matches_rolling_mean(self):
+        values = np.random.RandomState(0).rand(1000, 3) * 100
+        for window in [1, 7, 60, 1000]:
+            maxima, starts = max_moving_average(values, window)
+            reference = pd.DataFrame(values).rolling(window).mean()
+            np.testing.assert_allclose(maxima, reference.max().values)
+            np.testing.assert_array_equal(starts, np.nanargmax(reference.values, axis=0) - window + 1)
+
+    def test_window_too_long(self):
+        maximum, start = max_moving_average(np.ones(10), 11)
+        self.assertTrue(np.isnan(maximum))
+        self.assertEqual(start, -1)
+
+
+class TestDutyCycles(TestCase):
+    def test_duty_cycles(self):
+        df = pd.DataFrame({'A': [0.0, 5.0, 5.0, 0.0, 0.0, 5.0], 'B': [1.0] * 6,
+                           'C': [0.0] * 6})
+        cycles = duty_cycles(df, time_step_s=60.0)
+        self.assertEqual(list(cycles['transitions']), [3, 0, 0])
+        self.assertEqual(list(cycles['on_fraction']), [0.5, 1.0, 0.0])
+        self.assertEqual(cycles.loc['A', 'on_time_h'], 3 / 60)
+        self.assertEqual(list(duty_cycles(df, 60.0, on_threshold=2.0)['transitions']), [3, 0, 0])
+
+
+class TestPowerConsumptionGraphStatistics(TestCase):
+    def setUp(self):
+        path = abspath(join(split(__file__)[0], '6e1_test_power.csv'))
+        self.pcg = PowerConsumptionGraph("6E1", '2030-10-05T02:24:00', path, add_HAA=True)
+
+    def test_statistics(self):
+        stats = self.pcg.get_power_statistics(windows_min=(1.0, 30.0))
+        df = self.pcg._get_only_instrument_dataframe()
+        total = df.sum(axis=1)
+        self.assertAlmostEqual(stats.peak_averages.loc[1.0, 'power_W'], total.max())
+        self.assertAlmostEqual(stats.peak_averages.loc[30.0, 'power_W'],
+                               total.rolling(30).mean().max())
+        peak = stats.peak_averages.loc[30.0]
+        self.assertAlmostEqual(total.loc[peak.start_h:peak.end_h].mean(), peak.power_W)
+        self.assertAlmostEqual(stats.instrument_peak_averages.loc[30.0, 'JANUS'],
+                               df['JANUS'].rolling(30).mean().max())
+        self.assertEqual(stats.duty_cycles.loc['HAA', 'transitions'], 2)
+        self.assertAlmostEqual(stats.duty_cycles.loc['HAA', 'on_time_h'], 24.0 - 1 / 60)
@@ -0,0 +1,99 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph, DataConsumptionGraph, Datapack
+from mapps_tools.resource_analysis.pyramid import TimePyramid
+
+
+class TestTimePyramid(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        time_h = np.arange(100003) / 3600.0
+        self.df = pd.DataFrame({'A': rng.rand(100003), 'B': np.zeros(100003)},
+                               index=pd.Index(time_h, name="Time [h]"))
+        # Single-sample peak, which must survive at every level
+        self.df.iloc[54321, 1] = 500.0
+        self.pyramid = TimePyramid.from_dataframe(self.df)
+
+    def test_aggregate(self):
+        rng = np.random.RandomState(1)
+        time_h = self.df.index.values
+        for lo, hi in [(0, 100002), (54321, 54321), (15, 17), (16, 47)] + \
+                [sorted(rng.randint(0, 100003, 2)) for _ in range(50)]:
+            aggregate = self.pyramid.aggregate(time_h[lo], time_h[hi])
+            rows = self.df.iloc[lo:hi + 1]
+            np.testing.assert_array_equal(aggregate.loc['min'], rows.min())
+            np.testing.assert_array_equal(aggregate.loc['max'], rows.max())
+            np.testing.assert_allclose(aggregate.loc['mean'], rows.mean())
+
+    def test_empty_interval(self):
+        self.assertTrue(self.pyramid.aggregate(-2.0, -1.0).isna().all().all())
+
+    def test_envelope(self):
+        for start_h, end_h in [(0.0, 30.0), (10.0, 20.0), (15.0, 15.2)]:
+            envelope = self.pyramid.envelope(start_h, end_h, 500)
+            self.assertLessEqual(len(envelope), 4 * 500 + 4)
+            # Bins are at most as long as the interval divided by the number of bins
+            bin_h = (end_h - start_h) / 500
+            self.assertLess(envelope.index[0], start_h + bin_h)
+            self.assertGreater(envelope.index[-1], min(end_h, self.df.index[-1]) - bin_h)
+            # Envelope consists of whole rows of the timeline
+            pd.testing.assert_frame_equal(envelope, self.df.loc[envelope.index])
+            rows = self.df[(self.df.index >= start_h) & (self.df.index <= end_h)]
+            self.assertEqual(envelope.sum(axis=1).max(), rows.sum(axis=1).max())
+            self.assertEqual(envelope.sum(axis=1).min(), rows.sum(axis=1).min())
+            self.assertEqual(envelope['B'].max(), rows['B'].max())
+
+    def test_stacked_envelope(self):
+        # Instruments which are never on at the same time
+        n_rows = 100000
+        df = pd.DataFrame({'A': np.zeros(n_rows), 'B': np.zeros(n_rows)},
+                          index=pd.Index(np.arange(n_rows) / 3600.0, name="Time [h]"))
+        df.iloc[0::64, 0] = 100.0
+        df.iloc[32::64, 1] = 100.0
+        envelope = TimePyramid.from_dataframe(df).envelope(0.0, 30.0, 500)
+        self.assertEqual(envelope.sum(axis=1).max(), 100.0)
+        self.assertTrue(np.all(np.diff(envelope.index.values) > 0))
+
+    def test_envelope_raw_rows(self):
+        # Less than 2**min_level rows per bin are plotted without reduction
+        envelope = self.pyramid.envelope(10.0, 10.5, 1000)
+        rows = self.df[(self.df.index >= 10.0) & (self.df.index <= 10.5)]
+        pd.testing.assert_frame_equal(envelope, rows)
+
+    def test_memory(self):
+        self.assertLess(self.pyramid.nbytes, self.df.values.nbytes / 2)
+
+
+class TestGraphPyramid(TestCase):
+    CA = '2031-04-25T22:40:00'
+
+    def setUp(self):
+        self.datapack = Datapack(abspath(join(split(__file__)[0],
+                                              'flyby_test_power_and_data.csv')), use_cache=False)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_power(self):
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack)
+        self.assertIs(pcg.get_pyramid(), pcg.get_pyramid())
+        df = pcg._get_only_instrument_dataframe()
+        rows = df[(df.index >= -1.0) & (df.index <= 2.0)]
+        np.testing.assert_array_equal(pcg.get_pyramid().aggregate(-1.0, 2.0).loc['max'],
+                                      rows.max())
+        pcg.data = pcg.data.iloc[:100]
+        self.assertEqual(len(pcg.get_pyramid()), 100)
+
+    def test_render_zoomed(self):
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack)
+        dcg = DataConsumptionGraph("test", self.CA, self.datapack)
+        pcg.render(join(self.tmp_dir.name, 'power.png'), x_limits_h=(-1.0, 1.0))
+        dcg.render(join(self.tmp_dir.name, 'data.png'), x_limits_h=(-1.0, 1.0))
+        self.assertEqual(dcg.get_pyramid().columns,
+                         list(dcg._get_only_instrument_dataframe(dcg.data_accum).columns))
@@ -0,0 +1,106 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+import time
+
+import numpy as np
+import pandas as pd
+
+from mapps_tools.resource_analysis import DataConsumptionGraph, PacketStore, DownlinkWindow
+from mapps_tools.resource_analysis.ssmm import simulate_ssmm, downlink_rate, Overflow, \
+    _reflected_fill
+
+
+def reference_fill(incoming, capacities, downlink):
+    """ Step-by-step simulation of stores drained in priority order. """
+    fill = np.zeros(len(capacities))
+    levels, lost = [], []
+    for step_in, step_down in zip(incoming, downlink):
+        step_lost = np.zeros(len(capacities))
+        for i, capacity in enumerate(capacities):
+            available = fill[i] + step_in[i]
+            served = min(available, step_down)
+            step_down -= served
+            fill[i] = available - served
+            if capacity is not None and fill[i] > capacity:
+                step_lost[i] = fill[i] - capacity
+                fill[i] = capacity
+        levels.append(fill.copy())
+        lost.append(step_lost)
+    return np.array(levels), np.array(lost)
+
+
+class TestSimulateSSMM(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.time_h = np.arange(2000) / 60.0
+        self.rates = pd.DataFrame({'A': rng.rand(2000) * 100.0,
+                                   'B': np.where(rng.rand(2000) > 0.7, 300.0, 0.0),
+                                   'C': np.full(2000, 20.0)}, index=self.time_h)
+        self.downlink = [DownlinkWindow(2.0, 6.0, 150.0), DownlinkWindow(10.0, 20.0, 500.0),
+                         DownlinkWindow(15.0, 16.0, 100.0)]
+
+    def test_matches_step_by_step_simulation(self):
+        stores = [PacketStore('B', 100.0), PacketStore('A'), PacketStore('C', 30.0)]
+        result = simulate_ssmm(self.rates, 60.0, stores, self.downlink)
+        incoming = self.rates[['B', 'A', 'C']].values * 60.0 / 1000.0
+        down = downlink_rate(self.time_h, self.downlink) * 60.0 / 1000.0
+        levels, lost = reference_fill(incoming, [100.0, None, 30.0], down)
+        np.testing.assert_allclose(result.fill_Mbits.values, levels, atol=1e-9)
+        np.testing.assert_allclose(result.lost_Mbits.values, lost, atol=1e-9)
+        # Data is conserved
+        np.testing.assert_allclose(
+            incoming.sum(axis=0),
+            result.fill_Mbits.values[-1] + result.downlinked_Mbits.sum().values +
+            result.lost_Mbits.sum().values)
+        self.assertEqual(list(result.fill_Mbits.columns), ['B', 'A', 'C'])
+
+    def test_overflows(self):
+        stores = [PacketStore('C', 30.0)]
+        result = simulate_ssmm(self.rates, 60.0, stores, [DownlinkWindow(30.0, 31.0, 50.0)])
+        overflows = result.get_overflows()
+        # 1.2 Mbits per minute fill 30 Mbits in 25 minutes
+        self.assertEqual(overflows[0][:3], ('C', 25 / 60, 30.0 - 1 / 60))
+        self.assertAlmostEqual(overflows[0].lost_Mbits, 1.2 * 1775)
+        self.assertIsInstance(overflows[0], Overflow)
+        self.assertEqual(result.get_total_fill().max(), 30.0)
+
+    def test_downlink_rate(self):
+        np.testing.assert_array_equal(downlink_rate([1.0, 2.0, 5.9, 6.0, 15.5], self.downlink),
+                                      [0.0, 150.0, 150.0, 0.0, 600.0])
+
+
+class TestReflectedFill(TestCase):
+    def test_matches_step_by_step(self):
+        rng = np.random.RandomState(1)
+        for increments in [rng.randn(3000) * 10.0, np.where(rng.rand(3000) < 0.5, 15.0, -15.0),
+                           np.repeat(rng.randn(60) * 5.0, 50) + rng.randn(3000) * 0.1]:
+            fill, lost = _reflected_fill(increments, 10.0)
+            levels, reference_lost = reference_fill(increments[:, None], [10.0],
+                                                    np.zeros(len(increments)))
+            np.testing.assert_allclose(fill, levels[:, 0], atol=1e-9)
+            np.testing.assert_allclose(lost, reference_lost[:, 0], atol=1e-9)
+
+    def test_linear_time(self):
+        # Store filled and emptied in every other step, and in long cycles
+        n = 1000000
+        for increments, capacity in [(np.where(np.arange(n) % 2, -10.0, 10.0), 5.0),
+                                     (np.tile(np.repeat([1.0, -1.0], 500), n // 1000), 100.0)]:
+            start = time.perf_counter()
+            fill, lost = _reflected_fill(increments, capacity)
+            self.assertLess(time.perf_counter() - start, 5.0)
+            self.assertEqual(fill.max(), capacity)
+            self.assertEqual(fill.min(), 0.0)
+
+
+class TestDataConsumptionGraphSSMM(TestCase):
+    def test_without_downlink_matches_accumulated_data(self):
+        path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        dcg = DataConsumptionGraph("T", '2031-04-25T22:40:00', path)
+        result = dcg.simulate_ssmm([])
+        # Accumulated data in the datapack is rounded
+        np.testing.assert_allclose(result.get_total_fill().values,
+                                   dcg.get_cumulative_data().values, atol=0.01)
+        self.assertEqual(result.get_overflows(), [])
+
+        drained = dcg.simulate_ssmm([DownlinkWindow(0.0, 13.0, 1e6)])
+        self.assertEqual(drained.get_total_fill().values[-1], 0.0)
@@ -0,0 +1,106 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+import tempfile
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph, DataConsumptionGraph, \
+    StreamingPowerConsumption, StreamingDataConsumption
+
+
+class TestStreamingPowerConsumption(TestCase):
+    def setUp(self):
+        path = abspath(join(split(__file__)[0], '6e1_test_power.csv'))
+        kwargs = dict(power_limit_Wh=4000.0, time_interval_h=(-8.0, 12.0))
+        self.pcg = PowerConsumptionGraph("6E1", '2030-10-05T02:24:00', path, **kwargs)
+        self.stream = StreamingPowerConsumption("6E1", '2030-10-05T02:24:00', path,
+                                                chunk_size=1000, **kwargs)
+
+    def test_print_total_power_consumed(self):
+        self.assertEqual(self.stream.print_total_power_consumed(),
+                         self.pcg.print_total_power_consumed())
+
+    def test_print_individual_instrument_consumption(self):
+        self.assertEqual(self.stream.print_individual_instrument_consumption(),
+                         self.pcg.print_individual_instrument_consumption())
+
+    def test_cumulative_power_is_downsampled(self):
+        cumulative = self.stream.get_cumulative_power()
+        self.assertEqual(len(cumulative), 201)
+        self.assertEqual(cumulative.values[-1], self.pcg.get_cumulative_power().values[-1])
+        self.assertEqual(cumulative.index[-1], 12.0)
+
+    def test_violations_independent_of_chunk_size(self):
+        path = abspath(join(split(__file__)[0], '6e1_test_power.csv'))
+        stream = StreamingPowerConsumption("6E1", '2030-10-05T02:24:00', path,
+                                           time_interval_h=(-8.0, 12.0))
+        self.assertEqual(len(stream.profile_violations), len(self.stream.profile_violations))
+        for whole, chunked in zip(stream.profile_violations, self.stream.profile_violations):
+            self.assertEqual(whole[:3], chunked[:3])
+            self.assertAlmostEqual(whole.excess_energy_Wh, chunked.excess_energy_Wh)
+        self.assertEqual(self.stream.profile_violations[0][:2], (-6.316666666666666, -4.583333333333333))
+        self.assertIsNone(self.stream.limit_exceeded_at_h)
+        self.assertEqual(self.stream.cumulative_violations, [])
+
+    def test_violations_match_graph(self):
+        violations = self.pcg.get_profile_violations()
+        self.assertEqual([v[:3] for v in violations],
+                         [v[:3] for v in self.stream.profile_violations])
+
+
+class TestStreamingDataConsumption(TestCase):
+    def setUp(self):
+        path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        kwargs = dict(data_limit_Mbits=5000.0, time_interval_h=(-2.0, 3.5))
+        self.dcg = DataConsumptionGraph("T", '2031-04-25T22:40:00', path, **kwargs)
+        self.stream = StreamingDataConsumption("T", '2031-04-25T22:40:00', path,
+                                               chunk_size=100, **kwargs)
+
+    def test_print_total_data_acquired(self):
+        self.assertEqual(self.stream.print_total_data_acquired(),
+                         self.dcg.print_total_data_acquired())
+
+    def test_print_individual_instrument_data(self):
+        self.assertEqual(self.stream.print_individual_instrument_data(),
+                         self.dcg.print_individual_instrument_data())
+
+    def test_limit_exceeded(self):
+        self.assertAlmostEqual(self.stream.limit_exceeded_at_h, -56 / 60)
+
+
+class TestStreamingTimeInterval(TestCase):
+    def setUp(self):
+        self.path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+
+    def test_matches_graph(self):
+        # The second interval contains no rows of the datapack
+        for time_interval_h in ((-3.0, 4.0), (40.0, 50.0)):
+            for stream_class, graph_class in ((StreamingPowerConsumption, PowerConsumptionGraph),
+                                              (StreamingDataConsumption, DataConsumptionGraph)):
+                stream = stream_class("T", '2031-04-25T22:40:00', self.path, chunk_size=100,
+                                      time_interval_h=time_interval_h).summary()
+                graph = graph_class("T", '2031-04-25T22:40:00', self.path,
+                                    time_interval_h=time_interval_h).summary()
+                self.assertAlmostEqual(stream.total, graph.total)
+                self.assertEqual(list(stream.instrument_totals), list(graph.instrument_totals))
+                for inst, value in graph.instrument_totals.items():
+                    self.assertAlmostEqual(stream.instrument_totals[inst], value)
+
+    def test_missing_output_step(self):
+        with open(self.path) as f:
+            lines = f.read().splitlines(keepends=True)
+        n_preamble = next(i for i, line in enumerate(lines) if not line.startswith('#')) + 2
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, 'no_step.csv')
+            with open(path, 'w') as f:
+                f.writelines([line for line in lines[:n_preamble] if 'Output step' not in line]
+                             + lines[n_preamble:])
+            # The last chunk has a single row, whose median step is undefined
+            n_rows = len(lines) - n_preamble
+            power = StreamingPowerConsumption("T", '2031-04-25T22:40:00', path,
+                                              chunk_size=n_rows - 1)
+            data = StreamingDataConsumption("T", '2031-04-25T22:40:00', path,
+                                            chunk_size=n_rows - 1)
+            self.assertEqual(power.time_step_s, 60.0)
+            self.assertAlmostEqual(power.summary().total, PowerConsumptionGraph(
+                "T", '2031-04-25T22:40:00', path).summary().total)
+            self.assertAlmostEqual(data.summary().total, DataConsumptionGraph(
+                "T", '2031-04-25T22:40:00', path).summary().total)
@@ -0,0 +1,110 @@
+from unittest import TestCase
+from unittest.mock import patch
+from os.path import split, join, abspath
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from mapps_tools.resource_analysis import PowerConsumptionGraph, DataConsumptionGraph, \
+    StreamingPowerConsumption, ResourceSummary, Datapack
+
+
+class TestResourceSummary(TestCase):
+    def setUp(self):
+        self.summary = ResourceSummary.from_totals('flyby', 'Wh', 200.0,
+                                                   {'JANUS': 150.0, 'MAJIS': 50.0}, limit=250.0)
+
+    def test_from_totals(self):
+        self.assertEqual(self.summary.margin, 50.0)
+        self.assertEqual(self.summary.limit_percentage, 80.0)
+        self.assertEqual(self.summary.instrument_percentages, {'JANUS': 75.0, 'MAJIS': 25.0})
+
+    def test_with_limit(self):
+        summary = self.summary.with_limit(None)
+        self.assertIsNone(summary.margin)
+        self.assertEqual(summary.instrument_totals, self.summary.instrument_totals)
+        self.assertEqual(summary.with_limit(self.summary.limit), self.summary)
+
+    def test_no_limit(self):
+        summary = ResourceSummary.from_totals('flyby', 'Mbits', 0.0, {'JANUS': 0.0})
+        self.assertIsNone(summary.margin)
+        self.assertIsNone(summary.limit_percentage)
+        self.assertTrue(np.isnan(summary.instrument_percentages['JANUS']))
+        # NaN is not valid JSON, so it is written as null
+        self.assertIsNone(json.loads(summary.to_json())['instrument_percentages']['JANUS'])
+
+    def test_json(self):
+        loaded = json.loads(self.summary.to_json())
+        self.assertEqual(loaded, {'name': 'flyby', 'unit': 'Wh', 'total': 200.0,
+                                  'limit': 250.0, 'margin': 50.0, 'limit_percentage': 80.0,
+                                  'instrument_totals': {'JANUS': 150.0, 'MAJIS': 50.0},
+                                  'instrument_percentages': {'JANUS': 75.0, 'MAJIS': 25.0}})
+
+    def test_csv(self):
+        table = pd.read_csv(io.StringIO(self.summary.to_csv()), index_col=0)
+        self.assertEqual(list(table.index), ['JANUS', 'MAJIS', 'Total'])
+        self.assertEqual(list(table['total']), [150.0, 50.0, 200.0])
+        self.assertEqual(table.loc['Total', 'margin'], 50.0)
+        self.assertTrue(np.isnan(table.loc['JANUS', 'limit']))
+
+
+class TestGraphSummary(TestCase):
+    CA = '2031-04-25T22:40:00'
+
+    def setUp(self):
+        self.path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        self.datapack = Datapack(self.path, use_cache=False)
+
+    def test_power(self):
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack, power_limit_Wh=5000.0)
+        summary = pcg.summary()
+        self.assertEqual(summary.total, pcg.get_cumulative_power().values[-1])
+        self.assertAlmostEqual(summary.margin, 5000.0 - summary.total)
+        for inst, value in summary.instrument_totals.items():
+            self.assertAlmostEqual(value, pcg.get_energy_Wh(instrument=inst))
+        self.assertAlmostEqual(sum(summary.instrument_percentages.values()), 100.0)
+
+    def test_cached(self):
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack)
+        self.assertIs(pcg.summary(), pcg.summary())
+        with patch('sys.stdout'):
+            pcg.print_total_power_consumed()
+        self.assertIs(pcg.summary(), pcg.summary())
+        # Replacing the data invalidates the cached summary
+        pcg.data = pcg.data.iloc[:100]
+        self.assertEqual(pcg.summary().total, pcg.get_cumulative_power().values[-1])
+
+    def test_changed_limit(self):
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack)
+        dcg = DataConsumptionGraph("test", self.CA, self.datapack)
+        self.assertIsNone(pcg.summary().margin)
+        self.assertIsNone(dcg.summary().margin)
+        pcg.power_limit_Wh = 5000.0
+        dcg.data_limit_Mbits = 1000.0
+        self.assertAlmostEqual(pcg.summary().margin, 5000.0 - pcg.summary().total)
+        self.assertAlmostEqual(dcg.summary().margin, 1000.0 - dcg.summary().total)
+        self.assertIs(pcg.summary(), pcg.summary())
+
+    def test_compact(self):
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack)
+        compact = PowerConsumptionGraph("test", self.CA, self.datapack, compact=True)
+        for inst, value in pcg.summary().instrument_totals.items():
+            self.assertAlmostEqual(compact.summary().instrument_totals[inst], value)
+
+    def test_data(self):
+        dcg = DataConsumptionGraph("test", self.CA, self.datapack, data_limit_Mbits=1000.0)
+        summary = dcg.summary()
+        self.assertEqual(summary.unit, 'Mbits')
+        self.assertEqual(summary.total, dcg.get_cumulative_data().values[-1])
+        self.assertEqual(summary.instrument_totals['HAA'], dcg.data_accum['HAA'].values[-1])
+        self.assertAlmostEqual(summary.limit_percentage, summary.total / 10.0)
+
+    def test_streaming(self):
+        pcg = PowerConsumptionGraph("test", self.CA, self.datapack, power_limit_Wh=5000.0)
+        streaming = StreamingPowerConsumption("test", self.CA, self.path,
+                                              power_limit_Wh=5000.0, chunk_size=100)
+        self.assertAlmostEqual(streaming.summary().total, pcg.summary().total)
+        for inst, value in pcg.summary().instrument_totals.items():
+            self.assertAlmostEqual(streaming.summary().instrument_totals[inst], value)
@@ -0,0 +1,41 @@
+from unittest import TestCase
+from os.path import split, join, abspath
+
+import numpy as np
+
+from mapps_tools.resource_analysis import SyntheticInstrument, HAA, \
+    PowerConsumptionGraph, DataConsumptionGraph
+
+
+class TestSyntheticInstrument(TestCase):
+    def test_HAA(self):
+        times = np.array([-13.0, -12.0, -11.99, 0.0, 11.99, 12.0])
+        np.testing.assert_array_equal(HAA.power(times), [0.0, 0.0, 15.0, 15.0, 15.0, 0.0])
+        np.testing.assert_array_equal(HAA.data_rate(times), [0.0, 0.0, 2.0, 2.0, 2.0, 0.0])
+
+    def test_multiple_windows(self):
+        inst = SyntheticInstrument('X', [(-2.0, -1.0), (1.0, 2.0)], power_W=5.0)
+        np.testing.assert_array_equal(inst.is_on(np.array([-1.5, 0.0, 1.5])), [True, False, True])
+        np.testing.assert_array_equal(inst.data_rate(np.array([-1.5])), [0.0])
+
+    def test_invalid_window(self):
+        self.assertRaises(ValueError, SyntheticInstrument, 'X', [(2.0, 1.0)])
+
+
+class TestSyntheticInstrumentsInGraphs(TestCase):
+    def setUp(self):
+        self.path = abspath(join(split(__file__)[0], 'flyby_test_power_and_data.csv'))
+        self.extra = SyntheticInstrument('RADEM', [(-10.0, 10.0)], power_W=6.0, data_rate_kbps=1.0)
+
+    def test_power(self):
+        pcg = PowerConsumptionGraph("T", '2031-04-25T22:40:00', self.path, add_HAA=True,
+                                    synthetic_instruments=[self.extra])
+        df = pcg._get_only_instrument_dataframe()
+        self.assertEqual(list(df.columns[:3]), ['HAA', 'RADEM', 'JMAG'])
+        self.assertAlmostEqual(pcg.get_energy_Wh(instrument='RADEM'), 6.0 * 1199 / 60)
+
+    def test_data(self):
+        dcg = DataConsumptionGraph("T", '2031-04-25T22:40:00', self.path, add_HAA=False,
+                                   synthetic_instruments=[self.extra])
+        self.assertNotIn('HAA', dcg.data_rate)
+        self.assertAlmostEqual(dcg.data_accum['RADEM'].values[-1], 1199 * 60 / 1000.0)
@@ -0,0 +1,96 @@
+from unittest import TestCase
+from datetime import datetime, timedelta, timezone
+
+import iso8601
+import numpy as np
+
+from mapps_tools.timecodec import parse_utc, format_utc, parse_delta, format_delta, \
+    parse_header_time, format_header_time, parse_utc_array, format_utc_array, \
+    parse_delta_array, format_delta_array, parse_header_time_array, format_header_time_array
+
+
+class TestScalar(TestCase):
+    def test_utc(self):
+        for timestamp in ['2031-04-25T22:40:47', '2031-04-25T22:40:47Z', '2000-02-29 00:00:00',
+                          '2031-04-25T22:40:47.123456Z', '2031-04-25T22:40:47.5',
+                          '2031-04-25T22:40:47+02:00']:
+            self.assertEqual(parse_utc(timestamp), iso8601.parse_date(timestamp))
+        self.assertEqual(parse_utc('2031-04-25T22:40:47.1234567').microsecond, 123456)
+        self.assertRaises(iso8601.ParseError, parse_utc, 'aaa')
+        self.assertRaises(ValueError, parse_utc, '2031-02-29T00:00:00')
+
+    def test_format_utc(self):
+        time = datetime(2031, 4, 25, 22, 40, 47, 500000, tzinfo=timezone.utc)
+        self.assertEqual(format_utc(time), time.isoformat()[:-6])
+        self.assertEqual(format_utc(time.replace(microsecond=0)), '2031-04-25T22:40:47')
+        self.assertEqual(format_utc(time, digits=3, z=True), '2031-04-25T22:40:47.500Z')
+        self.assertEqual(format_utc(time, digits=8), '2031-04-25T22:40:47.50000000')
+
+    def test_delta(self):
+        self.assertEqual(parse_delta('+01:02:03'), 3723.0)
+        self.assertEqual(parse_delta('-01:02:03.50000'), -3723.5)
+        self.assertEqual(parse_delta('123:00:00'), 442800.0)
+        self.assertRaises(ValueError, parse_delta, '24:00:00', max_hours=24)
+        for wrong in ['00:60:00', '--1:31:01', '1:00:00', '+1 day, 0:00:00', '']:
+            self.assertRaises(ValueError, parse_delta, wrong)
+        self.assertEqual(format_delta(-3723.5), '-01:02:04')
+        self.assertEqual(format_delta(-3723.5, digits=5), '-01:02:03.50000')
+        self.assertEqual(format_delta(442800), '+123:00:00')
+
+    def test_header_time(self):
+        time = parse_header_time('03-Oct-2030_00:00:00')
+        self.assertEqual(time, datetime(2030, 10, 3, tzinfo=timezone.utc))
+        self.assertEqual(format_header_time(time), '03-Oct-2030_00:00:00')
+        self.assertRaises(ValueError, parse_header_time, '03-Oxt-2030_00:00:00')
+
+
+class TestArrays(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        start = np.datetime64('1960-01-01T00:00:00', 'us')
+        self.times = start + rng.randint(0, 100 * 365 * 86400, 10000) * 1000000 \
+            + rng.randint(0, 1000000, 10000)
+
+    def test_utc_round_trip(self):
+        timestamps = format_utc_array(self.times, digits=6, z=True)
+        np.testing.assert_array_equal(parse_utc_array(timestamps), self.times)
+        reference = [iso8601.parse_date(t) for t in timestamps[:500]]
+        np.testing.assert_array_equal(
+            parse_utc_array(timestamps[:500]),
+            [np.datetime64(t.replace(tzinfo=None), 'us') for t in reference])
+        np.testing.assert_array_equal(format_utc_array(self.times[:500]),
+                                      [format_utc(t, digits=0) for t in reference])
+
+    def test_utc_variants(self):
+        parsed = parse_utc_array(np.array([b'2031-04-25T22:40:47Z', b'2031-04-25 22:40:47.5']))
+        np.testing.assert_array_equal(parsed - parsed[0], np.array([0, 500000],
+                                                                   dtype='timedelta64[us]'))
+        np.testing.assert_array_equal(parse_utc_array(['2031-04-25T22:40:47.123']),
+                                      parse_utc_array(['2031-04-25T22:40:47.123000Z']))
+
+    def test_invalid_indices(self):
+        with self.assertRaises(ValueError) as context:
+            parse_utc_array(['2031-04-25T22:40:47Z', '2031-02-29T00:00:00', 'aaa',
+                             '2031-04-25T22:40:47ZZ', '2031-04-25T22:40:47.', ''])
+        self.assertIn('[1, 2, 3, 4, 5]', str(context.exception))
+
+    def test_delta(self):
+        seconds = np.array([3723, -1.5, 442800, 0, -0.25])
+        formatted = format_delta_array(seconds, digits=2)
+        np.testing.assert_array_equal(formatted, [format_delta(s, 2) for s in seconds])
+        np.testing.assert_array_equal(parse_delta_array(formatted), seconds)
+        np.testing.assert_array_equal(parse_delta_array(['01:00:00', '-00:00:01.00000']),
+                                      [3600.0, -1.0])
+        with self.assertRaises(ValueError) as context:
+            parse_delta_array(['+23:59:59', '24:00:00', '00:60:00', '--1:31:01', '1:00:00',
+                               '+01:00:00.', '01:00:00Z'], max_hours=24)
+        self.assertIn('[1, 2, 3, 4, 5, 6]', str(context.exception))
+
+    def test_header_time(self):
+        times = self.times.astype('datetime64[s]').astype('datetime64[us]')
+        formatted = format_header_time_array(times)
+        self.assertEqual(formatted[0], format_header_time(
+            datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(
+                microseconds=int(times[0].astype(np.int64)))))
+        np.testing.assert_array_equal(parse_header_time_array(formatted), times)
+        self.assertRaises(ValueError, parse_header_time_array, ['31-Apr-2031_00:00:00'])
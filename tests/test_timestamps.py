@@ -1,8 +1,12 @@
 from unittest import TestCase
 import filecmp
+import shutil
+import tempfile
 
 import os
 
+import numpy as np
+
 from mapps_tools.timestamps import TimestampProcessor
 from iso8601 import ParseError
 
@@ -86,4 +90,141 @@ class TestItlParser(TestCase):
         self.processor.absolute_to_relative_timestamps_itl(input_itl,
                        output_itl, "CLS_APP_CAL", overwrite=True)
         self.assertTrue(filecmp.cmp(output_itl, reference_output_itl, shallow=False),
-            f"Files '{output_itl}' does not match reference '{reference_output_itl}'.")
\ No newline at end of file
+            f"Files '{output_itl}' does not match reference '{reference_output_itl}'.")
+
+    def test_convert_in_place(self):
+        input_itl = os.path.join(os.path.split(__file__)[0],'itl_file_in.itl')
+        reference_output_itl = os.path.join(os.path.split(__file__)[0],'itl_file_ref.itl')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            itl = os.path.join(tmp_dir, 'itl_file.itl')
+            shutil.copy(input_itl, itl)
+            self.processor.absolute_to_relative_timestamps_itl(itl, itl, "CLS_APP_CAL",
+                                                               overwrite=True)
+            self.assertTrue(filecmp.cmp(itl, reference_output_itl, shallow=False))
+
+    def test_skipped_lines(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_itl = os.path.join(tmp_dir, 'in.itl')
+            output_itl = os.path.join(tmp_dir, 'out.itl')
+            with open(input_itl, 'w') as f:
+                f.write(" 2031-04-25T20:50:47Z MAJIS * A (T=2031-04-25T20:50:48Z)\n"
+                        " # 2031-04-25T20:50:47Z MAJIS * A  \n"
+                        " 2031-04-25T22:50:47Z MAJIS * B")
+            self.processor.absolute_to_relative_timestamps_itl(input_itl, output_itl, "CAL")
+            with open(output_itl) as f:
+                self.assertEqual(f.read(), "# CAL time used: 2031-04-25 22:40:47+00:00\n"
+                                           " 2031-04-25T20:50:47Z MAJIS * A (T=2031-04-25T20:50:48Z)\n"
+                                           " # 2031-04-25T20:50:47Z MAJIS * A\n"
+                                           "  CAL +00:10:00  MAJIS * B # 2031-04-25T22:50:47Z \n")
+
+    def test_empty_input(self):
+        # As before, no output file is written for an empty input file
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_itl = os.path.join(tmp_dir, 'in.itl')
+            output_itl = os.path.join(tmp_dir, 'out.itl')
+            open(input_itl, 'w').close()
+            self.processor.absolute_to_relative_timestamps_itl(input_itl, output_itl, "CAL")
+            self.assertFalse(os.path.exists(output_itl))
+
+
+class TestItlRelativeToAbsolute(TestCase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.processor = TimestampProcessor('2031-04-25T22:40:47Z')
+
+    def convert(self, text, event_times=None):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_itl = os.path.join(tmp_dir, 'in.itl')
+            output_itl = os.path.join(tmp_dir, 'out.itl')
+            with open(input_itl, 'w') as f:
+                f.write(text)
+            self.processor.relative_to_absolute_timestamps_itl(input_itl, output_itl,
+                                                               event_times)
+            with open(output_itl) as f:
+                return f.read()
+
+    def test_round_trip(self):
+        # Converted lines keep the original absolute timestamp in the comment at the end
+        reference_output_itl = os.path.join(os.path.split(__file__)[0], 'itl_file_ref.itl')
+        with open(reference_output_itl) as f:
+            reference = f.read()
+        converted = self.convert(reference, {'CLS_APP_CAL': '2031-04-25T22:40:47Z'})
+        self.assertNotIn('CLS_APP_CAL -', converted)
+        lines = [line for line in converted.splitlines() if line.endswith('Z ')]
+        self.assertGreaterEqual(len(lines), 3)
+        for line in lines:
+            self.assertEqual(line.split()[0], line.split()[-1])
+        self.assertEqual(len(converted.splitlines()), len(reference.splitlines()))
+
+    def test_events_and_fractions(self):
+        self.assertEqual(
+            self.convert(" CAL  -01:10:00.50000 MAJIS * A (T=1)  # CAL +00:00:01\n"
+                         "\tSTART +25:00:00 MAJIS * B\n"
+                         "# CAL -01:00:00 MAJIS * C\n"
+                         " OTHER +00:00:01 MAJIS * D\n",
+                         {'CAL': '2031-04-25T22:40:47Z', 'START': '2031-04-24T00:00:00.25'}),
+            " 2031-04-25T21:30:46.50000Z MAJIS * A (T=1)  # CAL +00:00:01\n"
+            "\t2031-04-25T01:00:00Z MAJIS * B\n"
+            "# CAL -01:00:00 MAJIS * C\n"
+            " OTHER +00:00:01 MAJIS * D\n")
+
+    def test_timezone_offset(self):
+        self.assertEqual(self.convert(" EV +00:00:10 MAJIS * A\n",
+                                      {'EV': '2031-04-25T23:40:47+01:00'}),
+                         " 2031-04-25T22:40:57Z MAJIS * A\n")
+        self.processor = TimestampProcessor('2031-04-25T23:40:47+01:00')
+        self.assertEqual(self.convert(" CAL -00:00:10 MAJIS * A\n"),
+                         " 2031-04-25T22:40:37Z MAJIS * A\n")
+
+    def test_default_event_time(self):
+        self.assertEqual(self.convert(" ANY 00:00:13 MAJIS * A"),
+                         " 2031-04-25T22:41:00Z MAJIS * A")
+
+
+class TestBulk(TestCase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.processor = TimestampProcessor('2031-04-25T22:40:47Z')
+        self.timestamps = ['2031-04-25T23:42:50', '2031-04-26T22:40:46Z', '2031-04-25T10:35:40Z',
+                           '2031-04-24T22:40:48', '2031-04-25T22:40:47Z']
+
+    def test_utc2delta_array(self):
+        np.testing.assert_array_equal(self.processor.utc2delta_array(self.timestamps),
+                                      [self.processor.utc2delta(t) for t in self.timestamps])
+        np.testing.assert_array_equal(
+            self.processor.utc2delta_array(np.array(self.timestamps[::3], dtype='datetime64[s]'),
+                                           formatted=False), [3723.0, -86399.0])
+        np.testing.assert_array_equal(
+            self.processor.utc2delta_array(['2031-04-26T22:40:47.5Z'], enforce_24h=False,
+                                           digits=1), ['+24:00:00.5'])
+
+    def test_delta2utc_array(self):
+        deltas = ['+01:02:03', '+23:59:59', '-12:05:07', '-23:59:59', '00:00:00']
+        np.testing.assert_array_equal(self.processor.delta2utc_array(deltas),
+                                      [self.processor.delta2utc(d) for d in deltas])
+        np.testing.assert_array_equal(self.processor.delta2utc_array(np.array([3723, -0.5])),
+                                      ['2031-04-25T23:42:50.000000',
+                                       '2031-04-25T22:40:46.500000'])
+        self.assertEqual(self.processor.delta2utc_array(['+25:00:00'], enforce_24h=False,
+                                                        formatted=False)[0],
+                         np.datetime64('2031-04-26T23:40:47', 'us'))
+
+    def test_round_trip(self):
+        seconds = np.arange(-86399, 86400, 7.5)
+        times = self.processor.delta2utc_array(seconds, formatted=False)
+        np.testing.assert_array_equal(self.processor.utc2delta_array(times, formatted=False),
+                                      seconds)
+        deltas = self.processor.utc2delta_array(self.processor.delta2utc_array(seconds), digits=1)
+        np.testing.assert_array_equal(self.processor.delta2utc_array(deltas, formatted=False),
+                                      times)
+
+    def test_errors_with_indices(self):
+        with self.assertRaisesRegex(ValueError, r'indices \[1, 3\]'):
+            self.processor.utc2delta_array(['2031-04-25T23:42:50', '2031-04-26T22:40:47Z',
+                                            '2031-04-25T10:35:40Z', '2031-04-24T22:40:47Z'])
+        with self.assertRaisesRegex(ValueError, r'indices \[0, 2\]'):
+            self.processor.utc2delta_array(['aaa', '2031-04-25T23:42:50', ''])
+        with self.assertRaisesRegex(ValueError, r'indices \[1, 2\]'):
+            self.processor.delta2utc_array(np.array([0.0, 86400.0, -86400.0]))
+        with self.assertRaisesRegex(ValueError, r'indices \[0, 1, 2, 3\]'):
+            self.processor.delta2utc_array(unparseable_inputs[:4] + ['-23:59:59'])